@@ -2,111 +2,143 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 import altair as alt
-import pyodbc
-import plotly.express as px
-from datetime import timedelta
+import api
+import armazenamento
+import conexao
+import configuracao
+import dimensoes
+import exportacao
+import graficos
+import precalculo
+import instrumentacao
+import memoria_compartilhada
+import cache_compartilhado
+import metricas
+import sincronizacao
 
 # Configurações da página
 st.set_page_config(page_title="Dashboard de Chamados", layout="wide")
 
-# Configurar a conexão com o SQL Server
-server = 'SFZ-MSQL-003'
-database = 'QualitorProd'
-conn_str = (
-    f'DRIVER=ODBC Driver 17 for SQL Server;'
-    f'SERVER={server};'
-    f'DATABASE={database};'
-    f'Trusted_Connection=yes;'
-)
+# Pool de conexões compartilhado (sincronização e tabelas de dimensão)
+@st.cache_resource
+def obter_pool():
+    return conexao.PoolConexoes(configuracao.conectar_bd, tamanho_maximo=4)
+
+# Sincronizador compartilhado entre as sessões: mantém um snapshot local e
+# busca no banco apenas o delta desde a última sincronização, numa thread em
+# segundo plano. No modo compartilhado, o estado vem do processo carregador
+# (carregador.py), mapeado em memória sem cópia
+@st.cache_resource
+def obter_sincronizador():
+    if configuracao.MODO_DADOS == 'compartilhado':
+        return memoria_compartilhada.LeitorEstado(configuracao.DIRETORIO_COMPARTILHADO)
+    sincronizador = sincronizacao.Sincronizador(
+        obter_pool(),
+        codigos_equipes=list(EQUIPES.keys()),
+        operadores=list(OPERADORES.keys()),
+        intervalo=configuracao.INTERVALO_ATUALIZACAO,
+        armazenamento=armazenamento.ArmazenamentoSnapshot(configuracao.DIRETORIO_SNAPSHOT),
+        meses_historico=configuracao.MESES_HISTORICO,
+        meses_reconciliacao=configuracao.MESES_RECONCILIACAO
+    )
+    sincronizador.iniciar_em_segundo_plano()
+    return sincronizador
+
+# Tabelas de dimensão, recarregadas quando o arquivo (ou o cadastro) muda. No
+# modo compartilhado, só o carregador acessa o banco: as réplicas usam as
+# tabelas que ele publica com o estado, as mesmas dos filtros e dos cubos
+@st.cache_resource
+def obter_dimensoes():
+    if configuracao.MODO_DADOS == 'compartilhado':
+        return memoria_compartilhada.DimensoesPublicadas(obter_sincronizador())
+    return dimensoes.CarregadorDimensoes(configuracao.ARQUIVO_DIMENSOES, obter_pool())
 
 # Dicionários de mapeamento
-EQUIPES = {
-    1.0: "Service Desk",
-    3.0: "Suporte Técnico"
-}
-
-OPERADORES = {
-    497: "Bryan Hudson do Nascimento Silva",
-    462: "Maria Priscila Barros Pinheiro",
-    122: "Anderlan Davi dos Santos Pontes",
-    63: "Victor Salvador de Araújo",
-    206: "João Saulo da costa Almeida",
-    133: "Pedro Henrique Pereira da Rocha",
-    240: "Alan Mendonça dos Santos",
-    258: "Bayron Rafael Pires de Lima",
-    103: "Flávio Oliveira de Morais Sarmento",
-    229: "João Marcos Correia da Silva",
-    158: "Thiago Ferreira Silva"
-}
-
-# Função para conectar ao banco de dados
-def conectar_bd():
-    try:
-        conn = pyodbc.connect(conn_str)
-        return conn
-    except Exception as e:
-        st.error(f"Erro na conexão com o banco de dados: {str(e)}")
-        return None
-
-# Função para carregar dados
-@st.cache_data(ttl=3600)  # Cache de 1 hora
-def carregar_dados():
-    conn = conectar_bd()
-    if conn is None:
-        return pd.DataFrame(), pd.DataFrame()
-    
+tabelas_dimensao = obter_dimensoes().atual()
+EQUIPES = tabelas_dimensao.equipes
+OPERADORES = tabelas_dimensao.operadores
+EQUIPES_POR_OPERADOR = tabelas_dimensao.equipes_por_operador
+mapeamento_origem = tabelas_dimensao.meios_origem
+
+# Cache de filtros e agregados compartilhado por todas as sessões do processo:
+# cabe todo o pré-cálculo dos períodos padrão e mais 512 entradas para os
+# demais filtros das sessões
+@st.cache_resource
+def obter_cache():
+    return cache_compartilhado.CacheCompartilhado(
+        max_entradas=precalculo.entradas_precalculadas(EQUIPES) + 512)
+
+# Links de exportação de linhas emitidos pelas sessões e atendidos pela API
+@st.cache_resource
+def obter_exportacoes():
+    return exportacao.PedidosExportacao()
+
+# API JSON com os mesmos agregados, servida por este processo a partir do
+# estado e do cache acima (uma única instância, mesmo com várias sessões)
+@st.cache_resource
+def iniciar_api():
+    sincronizador = obter_sincronizador()
+    app = api.criar_app(sincronizador, obter_cache(), obter_dimensoes(),
+                        situacao=lambda: sincronizador.situacao, exportacoes=obter_exportacoes())
     try:
-        # Carregar dados de hd_chamado
-        query_chamados = """
-        SELECT cdchamado, dtchamado, dttermino, cdequipe, cdusuario, cdorigem, cdsituacao, cdresponsavel
-        FROM [dbo].[hd_chamado]
-        """
-        df_chamados = pd.read_sql(query_chamados, conn)
-        df_chamados['dtchamado'] = pd.to_datetime(df_chamados['dtchamado'])
-        df_chamados['dttermino'] = pd.to_datetime(df_chamados['dttermino'])
-        
-        # Carregar dados de hd_acompanhamento
-        query_acompanhamentos = """
-        SELECT dsacompanhamento, cdchamado, dtacompanhamento, cdusuario, cdtipoacompanhamento
-        FROM [dbo].[hd_acompanhamento]
-        """
-        df_acompanhamentos = pd.read_sql(query_acompanhamentos, conn)
-        df_acompanhamentos['dsacompanhamento'] = df_acompanhamentos['dsacompanhamento'].astype(str)
-        df_acompanhamentos['dtacompanhamento'] = pd.to_datetime(df_acompanhamentos['dtacompanhamento'], errors='coerce')
-        df_acompanhamentos['cdtipoacompanhamento'] = pd.to_numeric(df_acompanhamentos['cdtipoacompanhamento'], errors='coerce')
-        
-        return df_chamados, df_acompanhamentos
-        
-    except Exception as e:
-        st.error(f"Erro ao carregar dados: {str(e)}")
-        return pd.DataFrame(), pd.DataFrame()
-    finally:
-        conn.close()
-
-# Carregar os dados
-df, df_acompanhamentos = carregar_dados()
+        return api.iniciar_em_segundo_plano(app, host=configuracao.HOST_API, porta=configuracao.PORTA_API)
+    except OSError:
+        return None  # porta em uso (outra instância do painel já serve a API)
+
+# Agregados do mês atual, do mês anterior e do ano até hoje, recalculados a
+# cada nova versão dos dados numa thread do processo (ver precalculo.py)
+@st.cache_resource
+def iniciar_precalculo():
+    precalculador = precalculo.Precalculador(obter_sincronizador(), obter_cache(), obter_dimensoes())
+    precalculador.iniciar_em_segundo_plano()
+    return precalculador
+
+# Os dados são atualizados em segundo plano; só a primeira sessão após a
+# partida espera pela carga inicial
+sincronizador = obter_sincronizador()
+iniciar_api()
+iniciar_precalculo()
+# Operadores e equipes entram como filtros das consultas; se as tabelas de
+# dimensão mudarem, a próxima sincronização é uma carga completa
+sincronizador.definir_filtros(list(EQUIPES.keys()), list(OPERADORES.keys()))
+if sincronizador.versao == 0:
+    with st.spinner("Carregando dados..."):
+        sincronizador.aguardar_primeira_carga()
+
+situacao = sincronizador.situacao
+if situacao.get('erro'):
+    st.error(f"Erro na conexão com o banco de dados: {situacao['erro']}")
+if obter_dimensoes().erro:
+    st.warning(f"Não foi possível recarregar operadores e equipes ({obter_dimensoes().erro}); "
+               "usando os últimos carregados.")
+
+# Frames, cubos e eventos de uma mesma versão dos dados
+estado = sincronizador.estado()
+df_base, df_acompanhamentos_base = estado.chamados, estado.acompanhamentos
+
+# Resultados de versões anteriores (dos dados ou das dimensões) deixam de valer
+versao_cache = (estado.versao, tabelas_dimensao.versao)
+cache_graficos = obter_cache()
+cache_graficos.invalidar(versao_cache)
 
 # Verificar se os dados foram carregados corretamente
-if df.empty or df_acompanhamentos.empty:
+if df_base.empty or df_acompanhamentos_base.empty:
     st.warning("Não foi possível carregar os dados. Verifique a conexão com o banco de dados.")
     st.stop()
 
-# from datetime import datetime, timedelta
-
 # ======================================
 # FILTROS
 # ======================================
 st.sidebar.header("Filtros")
 
 # Filtro de data
-min_date = df['dtchamado'].min().date()
-max_date = df['dtchamado'].max().date()
+min_date = df_base['dtchamado'].min().date()
+max_date = df_base['dtchamado'].max().date()
 
-# Calcular mês atual como padrão
+# Calcular mês atual como padrão (limitado a max_date), o mesmo período
+# pré-calculado a cada atualização dos dados
 hoje = datetime.now()
-primeiro_dia_mes = hoje.replace(day=1).date()
-ultimo_dia_mes_real = (hoje.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
-ultimo_dia_mes = min(ultimo_dia_mes_real.date(), max_date)  # ✅ Garante que o valor esteja dentro do limite
+primeiro_dia_mes, ultimo_dia_mes = precalculo.periodos_padrao(hoje.date(), max_date)['mes_atual']
 
 # Usar mês atual como padrão
 data_inicio = st.sidebar.date_input("Data inicial", 
@@ -128,472 +160,652 @@ equipes_selecionadas = st.sidebar.multiselect("Selecione as equipes:",
 # Converter seleções para códigos
 codigos_equipes = [k for k, v in EQUIPES.items() if v in equipes_selecionadas]
 
-# Aplicar filtros
-df_filtrado = df[
-    (df['dtchamado'].dt.date >= data_inicio) & 
-    (df['dtchamado'].dt.date <= data_fim) & 
-    (df['cdequipe'].isin(codigos_equipes))
-]
+# Quando os dados foram atualizados pela última vez
+if situacao.get('atualizado_em') is not None:
+    atualizado_em = datetime.fromtimestamp(situacao['atualizado_em'])
+    idade = (datetime.now() - atualizado_em).total_seconds()
+    st.sidebar.caption(
+        f"Dados atualizados às {atualizado_em:%H:%M:%S} (há {idade:,.0f} s), "
+        f"em {situacao['duracao']:,.1f} s: {situacao['linhas_chamados']:,} chamados, "
+        f"{situacao['linhas_acompanhamentos']:,} acompanhamentos"
+    )
+
+
+codigos_selecionados = tuple(sorted(int(c) for c in codigos_equipes))
+
+# Opções de administração (abrir o painel com ?admin=1)
+modo_admin = st.query_params.get('admin') == '1'
+perfil = None
+if modo_admin:
+    st.sidebar.subheader("Administração")
+    if st.sidebar.checkbox("Perfilar esta execução", key="perfilar_execucao"):
+        perfil = instrumentacao.Perfil()
+
+
+# Tempo, linhas e memória de cada etapa desta execução
+medidor = instrumentacao.Medidor()
+
+# Resultados memorizados por (versão dos dados, período, equipes, nome); com
+# por_filtros=False, apenas por (versão dos dados, nome)
+filtro = precalculo.Filtro(estado, tabelas_dimensao, data_inicio, data_fim, codigos_selecionados)
+
+def em_cache(nome, calcular, linhas_entrada=None, por_filtros=True):
+    with medidor.etapa(nome, linhas_entrada) as registro:
+        registro['calculado'] = False
+
+        def calcular_medido():
+            registro['calculado'] = True
+            return calcular()
+
+        valor = cache_graficos.obter(versao_cache, precalculo.chave(filtro, nome, por_filtros), calcular_medido)
+        registro['linhas_saida'] = instrumentacao.contar_linhas(valor)
+    return valor
+
+# Agregado definido em precalculo.AGREGADOS (no período padrão, já calculado
+# em segundo plano); as dependências passam pelo cache do mesmo modo
+def agregado(nome, linhas_entrada=None):
+    calcular, por_filtros = precalculo.AGREGADOS[nome]
+    return em_cache(nome, lambda: calcular(filtro, agregado), linhas_entrada, por_filtros)
+
+# Download do agregado de um gráfico no formato escolhido (tabelas pequenas,
+# montadas em memória e memorizadas; o CSV dos períodos padrão é
+# pré-calculado). As linhas completas saem pela barra lateral (abaixo)
+def botao_exportacao(dados, nome):
+    with st.popover("Exportar dados"):
+        formato = st.radio("Formato", list(exportacao.FORMATOS), horizontal=True, key=f"formato_{nome}")
+        st.download_button(
+            f"Baixar {formato.upper()}",
+            em_cache(precalculo.nome_exportacao(nome, formato), lambda: exportacao.em_bytes(dados, formato)),
+            file_name=exportacao.nome_arquivo(nome, data_inicio, data_fim, formato),
+            mime=exportacao.FORMATOS[formato],
+            key=f"baixar_{nome}"
+        )
 
-EQUIPES_POR_OPERADOR = {
-    497: "Service Desk", 462: "Service Desk", 122: "Service Desk", 63: "Service Desk",
-    206: "Suporte Técnico", 133: "Suporte Técnico", 240: "Suporte Técnico",
-    258: "Suporte Técnico", 103: "Suporte Técnico", 229: "Suporte Técnico", 158: "Suporte Técnico"}
+# Aplicar filtros: frames, cubos e eventos recortados no período (busca
+# binária sobre os dados ordenados por data) e nas equipes selecionadas
+recorte = agregado('recorte', linhas_entrada=len(df_base) + len(df_acompanhamentos_base))
+df_filtrado, df_acompanhamentos = recorte.chamados, recorte.acompanhamentos
+
+# Linhas completas do recorte (chamados e acompanhamentos). Com a API exposta
+# (configuracao.URL_API), o botão emite um link temporário e a API envia o
+# arquivo em partes; sem ela, o download_button precisa do arquivo pronto em
+# memória, então ele só é gerado quando pedido, some na execução seguinte e
+# é limitado a exportacao.LINHAS_POR_DOWNLOAD linhas
+if codigos_selecionados:
+    st.sidebar.subheader("Exportar dados filtrados")
+    formato_exportacao = st.sidebar.selectbox("Formato do arquivo", list(exportacao.FORMATOS),
+                                              key="formato_exportacao")
+    if not configuracao.URL_API:
+        st.sidebar.caption(f"Até {exportacao.LINHAS_POR_DOWNLOAD:,} linhas por arquivo; "
+                           "para mais, reduza o período ou as equipes.")
+    for tabela, linhas in (('chamados', df_filtrado), ('acompanhamentos', df_acompanhamentos)):
+        acima_do_limite = not configuracao.URL_API and len(linhas) > exportacao.LINHAS_POR_DOWNLOAD
+        if not st.sidebar.button(f"Gerar arquivo de {tabela} ({len(linhas):,} linhas)", key=f"gerar_{tabela}",
+                                 disabled=acima_do_limite):
+            continue
+        if configuracao.URL_API:
+            token = obter_exportacoes().emitir({
+                'data_inicio': data_inicio, 'data_fim': data_fim, 'codigos_equipes': codigos_selecionados,
+                'tabela': tabela, 'formato': formato_exportacao,
+            })
+            st.sidebar.link_button(f"Baixar {tabela} ({formato_exportacao.upper()})",
+                                   f"{configuracao.URL_API.rstrip('/')}/api/exportar/{token}")
+            continue
+        try:
+            with st.sidebar, st.spinner(f"Gerando {tabela}..."):
+                arquivo = exportacao.juntar_partes(exportacao.exportar(linhas, formato_exportacao))
+        except exportacao.ExportacaoInvalida as erro:
+            st.sidebar.error(str(erro))
+            continue
+        st.sidebar.download_button(
+            f"Baixar {tabela} ({formato_exportacao.upper()})",
+            arquivo,
+            file_name=exportacao.nome_arquivo(tabela, data_inicio, data_fim, formato_exportacao),
+            mime=exportacao.FORMATOS[formato_exportacao],
+            key=f"baixar_{tabela}"
+        )
 
 # ======================================
 # GRÁFICO 1 - Chamados por Equipe/Mês (Versão Simplificada)
 # ======================================
-st.header("Chamados por Atendido Equipe")
+def secao_grafico1():
+    if not df_filtrado.empty:
+        # Contagens por mês e equipe (cubo), com os nomes das equipes
+        dados_equipe = agregado('grafico1', linhas_entrada=len(recorte.cubo_chamados))
+
+        # Criar o gráfico (dados e especificação memorizados por filtro)
+        dados_grafico1, spec_grafico1 = agregado('grafico1:spec', linhas_entrada=len(dados_equipe))
+        with medidor.etapa('grafico1:render', len(dados_grafico1)):
+            st.vega_lite_chart(dados_grafico1, spec_grafico1, use_container_width=True)
+        botao_exportacao(dados_equipe, 'chamados_por_equipe')
+
+        # Exibir estatísticas de validação
+        st.write(f"Total de chamados: {int(dados_equipe['total'].sum())}")
+
+        # ✅ Checkbox para exibir ou ocultar detalhes
+        if st.checkbox("Mostrar detalhes de validação"):
+            with st.expander("Detalhes de validação"):
+                # Linhas brutas só são lidas quando os detalhes são exibidos
+                df_equipes = df_filtrado[df_filtrado['cdequipe'].isin(list(EQUIPES.keys()))]
+
+                st.write("### Dados processados (amostra)")
+                # Exibir somente colunas relevantes
+                amostra = df_equipes[['dtchamado', 'cdequipe']].head().copy()
+                amostra['mes'] = amostra['dtchamado'].dt.strftime('%Y-%m')
+                amostra['equipe'] = amostra['cdequipe'].map(EQUIPES)
+                st.write(amostra)
+
+                st.write("### Valores únicos em cdequipe:")
+                st.write(df_equipes['cdequipe'].value_counts())
+
+                st.write("### Soma total por mês:")
+                st.write(dados_equipe.groupby('mes')['total'].sum().astype(int))
 
-# Mapeamento direto dos códigos de equipe
-MAPEAMENTO_EQUIPES = {
-    1: "Service Desk",
-    3: "Suporte Técnico"
-}
+    else:
+        st.warning("Nenhum dado disponível para o período selecionado")
 
-if not df_filtrado.empty:
-    # Criar cópia do DataFrame
-    df_equipes = df_filtrado.copy()
-    
-    # PASSO 1: Aplicar filtro de equipes
-    df_equipes = df_equipes[df_equipes['cdequipe'].isin([1, 3])]
-    
-    # PASSO 2: Verificar colunas essenciais
-    colunas_essenciais = ['dtchamado', 'cdequipe']
-    for col in colunas_essenciais:
-        if col not in df_equipes.columns:
-            st.error(f"Coluna essencial faltante: {col}")
-            st.stop()
-    
-    # PASSO 3: Processar os dados
-    df_equipes['mes'] = df_equipes['dtchamado'].dt.strftime('%Y-%m')
-    df_equipes['equipe'] = df_equipes['cdequipe'].map(MAPEAMENTO_EQUIPES)
-    
-    # PASSO 4: Agrupamento
-    dados_equipe = df_equipes.groupby(['mes', 'equipe']).size().reset_index(name='total')
-    
-    # PASSO 5: Criar o gráfico
-    grafico1 = alt.Chart(dados_equipe).mark_bar(
-        cornerRadius=5,
-        size=25
-    ).encode(
-        x=alt.X('mes:N', title='Mês', axis=alt.Axis(labelAngle=0)),
-        y=alt.Y('total:Q', title='Total de Chamados'),
-        color=alt.Color('equipe:N', 
-                       scale=alt.Scale(range=['#1f77b4', '#ff7f0e']),
-                       legend=alt.Legend(title="Equipe")),
-        xOffset=alt.XOffset('equipe:N')
-    ).properties(
-        width=alt.Step(40)
-    )
 
-    st.altair_chart(grafico1, use_container_width=True)
-    
-    # Exibir estatísticas de validação
-    st.write(f"Total de chamados: {len(df_equipes)}")
-
-    # ✅ Checkbox para exibir ou ocultar detalhes
-    if st.checkbox("Mostrar detalhes de validação"):
-        with st.expander("Detalhes de validação"):
-            st.write("### Dados processados (amostra)")
-            # Exibir somente colunas relevantes
-            st.write(df_equipes[['dtchamado', 'cdequipe', 'mes', 'equipe']].head())
-            
-            st.write("### Valores únicos em cdequipe:")
-            st.write(df_equipes['cdequipe'].value_counts())
-            
-            st.write("### Soma total por mês:")
-            st.write(dados_equipe.groupby('mes')['total'].sum().astype(int))
-
-else:
-    st.warning("Nenhum dado disponível para o período selecionado")
 # ======================================
 # GRÁFICO 2 - Chamados Abertos por Operador por Mês
 # ======================================
-st.header("Chamados Abertos por Operador")
-
-if not df_filtrado.empty:
-    # Adicionar coluna de mês/ano formatado
-    df_filtrado['mes'] = df_filtrado['dtchamado'].dt.strftime('%Y-%m')
-    
-    # Mapear código do operador para nome
-    df_filtrado['operador'] = df_filtrado['cdusuario'].map(OPERADORES)
-    
-    # Filtrar apenas operadores válidos (excluir nulos)
-    df_operadores = df_filtrado[df_filtrado['cdusuario'].isin(OPERADORES.keys())]
-    
-    if not df_operadores.empty:
-        # Agrupar por mês e operador
-        chamados_por_operador = df_operadores.groupby(['mes', 'operador']).size().reset_index(name='total')
-        
-        # Criar gráfico de barras agrupadas
-        grafico2 = alt.Chart(chamados_por_operador).mark_bar(
-            cornerRadius=3,
-            size=20
-        ).encode(
-            x=alt.X('mes:N', title='Mês', axis=alt.Axis(labelAngle=0)),
-            y=alt.Y('total:Q', title='Chamados Abertos'),
-            color=alt.Color('operador:N', title='Operador', 
-                           scale=alt.Scale(scheme='category20')),
-            tooltip=['mes', 'operador', 'total']
-        ).properties(
-            width=alt.Step(40)
-        )
-        st.altair_chart(grafico2, use_container_width=True)
-        
-        # Tabela detalhada (opcional)
-        mostrar_tabela = st.checkbox("Mostrar dados detalhados", key="tabela_operador_mes")
-        if mostrar_tabela:
-            st.subheader("Detalhamento por Operador e Mês")
-            # Formatar tabela com pivot
-            tabela_detalhes = chamados_por_operador.pivot(
-                index='operador', 
-                columns='mes', 
-                values='total'
-            ).fillna(0).astype(int)
-            
-            # Adicionar total por operador
-            tabela_detalhes['Total'] = tabela_detalhes.sum(axis=1)
-            
-            # Ordenar pelo total
-            tabela_detalhes = tabela_detalhes.sort_values('Total', ascending=False)
-            
-            st.dataframe(
-                tabela_detalhes.style
-                    .background_gradient(subset=tabela_detalhes.columns[:-1], cmap='Blues')
-                    .background_gradient(subset=['Total'], cmap='Purples'),
-                height=500,
-                use_container_width=True
-            )
+def secao_grafico2():
+    if not df_filtrado.empty:
+        # Agrupar por mês e operador (apenas operadores válidos, direto do cubo)
+        chamados_por_operador = agregado('grafico2', linhas_entrada=len(recorte.cubo_chamados))
+
+        if not chamados_por_operador.empty:
+
+            # Criar gráfico de barras agrupadas: até MAXIMO_SERIES operadores
+            # (uma cor por operador), os demais somados em "Outros"
+            dados_grafico2, spec_grafico2 = agregado('grafico2:spec', linhas_entrada=len(chamados_por_operador))
+            with medidor.etapa('grafico2:render', len(dados_grafico2)):
+                st.vega_lite_chart(dados_grafico2, spec_grafico2, use_container_width=True)
+            if chamados_por_operador['operador'].nunique() > graficos.MAXIMO_SERIES:
+                st.caption(f"Exibindo os {graficos.MAXIMO_SERIES - 1} operadores com mais chamados; "
+                           f"os demais estão somados em \"{graficos.ROTULO_OUTROS}\"")
+            botao_exportacao(chamados_por_operador, 'chamados_abertos_por_operador')
+
+            # Tabela detalhada (opcional)
+            mostrar_tabela = st.checkbox("Mostrar dados detalhados", key="tabela_operador_mes")
+            if mostrar_tabela:
+                st.subheader("Detalhamento por Operador e Mês")
+                # Formatar tabela com pivot
+                tabela_detalhes = chamados_por_operador.pivot(
+                    index='operador', 
+                    columns='mes', 
+                    values='total'
+                ).fillna(0).astype(int)
+
+                # Adicionar total por operador
+                tabela_detalhes['Total'] = tabela_detalhes.sum(axis=1)
+
+                # Ordenar pelo total
+                tabela_detalhes = tabela_detalhes.sort_values('Total', ascending=False)
+
+                with medidor.etapa('grafico2:tabela', len(tabela_detalhes)):
+                    st.dataframe(
+                        tabela_detalhes.style
+                            .background_gradient(subset=tabela_detalhes.columns[:-1], cmap='Blues')
+                            .background_gradient(subset=['Total'], cmap='Purples'),
+                        height=500,
+                        use_container_width=True
+                    )
+        else:
+            st.warning("Nenhum chamado encontrado para os operadores selecionados")
     else:
-        st.warning("Nenhum chamado encontrado para os operadores selecionados")
-else:
-    st.warning("Nenhum dado disponível para o período selecionado")
+        st.warning("Nenhum dado disponível para o período selecionado")
+
 
 # ======================================
 # GRÁFICO 3 - Chamados Atendidos por Operador (SOLUÇÃO DEFINITIVA)
 # ======================================
-st.header("Chamado Iniciado - Por Operador (Validar dados - inconsistencias entre 2 a 4 chamados)")
-
-if not df_acompanhamentos.empty:
-    # 1. Identificar automaticamente a coluna de descrição
-    desc_columns = [col for col in df_acompanhamentos.columns 
-                   if 'acompanhamento' in col.lower() or 'desc' in col.lower()]
-    
-    if not desc_columns:
-        st.error("Não foi possível encontrar a coluna de descrição de acompanhamentos!")
-        st.info("Colunas disponíveis:")
-        st.write(df_acompanhamentos.columns.tolist())
-        st.stop()
-    
-    COLUNA_DESCRICAO = desc_columns[0]
-    st.info(f"Usando coluna: '{COLUNA_DESCRICAO}' para descrição de acompanhamentos")
-
-    # 2. Verificar se as outras colunas existem
-    colunas_necessarias = ['dtacompanhamento', 'cdusuario', 'cdchamado', COLUNA_DESCRICAO]
-    colunas_faltantes = [col for col in colunas_necessarias if col not in df_acompanhamentos.columns]
-    
-    if colunas_faltantes:
-        st.error(f"Colunas faltantes: {', '.join(colunas_faltantes)}")
-        st.info(f"Colunas disponíveis: {', '.join(df_acompanhamentos.columns)}")
-        st.stop()
-
-    # 3. Converter datas se necessário
-    if not pd.api.types.is_datetime64_any_dtype(df_acompanhamentos['dtacompanhamento']):
-        df_acompanhamentos['dtacompanhamento'] = pd.to_datetime(
-            df_acompanhamentos['dtacompanhamento'], errors='coerce')
-    
-    # 4. Filtro por data e conteúdo da descrição
-    df_acomp_filtrado = df_acompanhamentos[
-        (df_acompanhamentos['dtacompanhamento'].dt.date >= data_inicio) &
-        (df_acompanhamentos['dtacompanhamento'].dt.date <= data_fim) &
-        (df_acompanhamentos[COLUNA_DESCRICAO].str.contains('Chamado em atendimento', case=False, na=False))
-    ]
-
-    # 5. Contar chamados distintos por operador
-    contagem_chamados = (
-        df_acomp_filtrado
-        .groupby('cdusuario')['cdchamado']
-        .nunique()
-        .reset_index(name='total_chamados')
-        .sort_values('total_chamados', ascending=False)
-    )
+def secao_grafico3():
+    if not df_acompanhamentos.empty:
+        # 1-4. Chamados distintos com "Chamado em atendimento" no período, por
+        # operador válido (eventos classificados na ingestão)
+        contagem_chamados = agregado('grafico3', linhas_entrada=len(recorte.eventos_atendimento))
+
+        # 5. Gráfico de barras
+        if not contagem_chamados.empty:
+            # Usar Plotly Express para melhor visualização
+            try:
+                # Figura memorizada por filtro; até MAXIMO_BARRAS operadores,
+                # os demais somados em "Outros"
+                fig = agregado('grafico3:figura', linhas_entrada=len(contagem_chamados))
+                with medidor.etapa('grafico3:render', len(contagem_chamados)):
+                    st.plotly_chart(fig, use_container_width=True)
+                botao_exportacao(contagem_chamados, 'chamados_iniciados_por_operador')
+            except:
+                # Fallback para gráfico nativo do Streamlit
+                st.bar_chart(
+                    contagem_chamados.set_index('operador')['total_chamados'],
+                    height=500,
+                    color='#9467bd'
+                )
+        else:
+            st.warning("Nenhum chamado encontrado com 'Chamado em atendimento' no período!")
+
+        # 6. Tabela detalhada
+        mostrar_tabela_acomp = st.checkbox("Mostrar detalhes de chamados por operador", key="tabela_chamados_operador")
+        if mostrar_tabela_acomp and not contagem_chamados.empty:
+            st.subheader("Detalhamento de Chamados Atendidos")
+
+            tabela_acomp = contagem_chamados[['operador', 'total_chamados']].rename(columns={
+                'operador': 'Operador',
+                'total_chamados': 'Chamados Atendidos'
+            })
 
-    # 6. Mapear nomes dos operadores
-    contagem_chamados['operador'] = contagem_chamados['cdusuario'].map(OPERADORES)
-    
-    # 7. Filtrar apenas operadores válidos
-    contagem_chamados = contagem_chamados[contagem_chamados['cdusuario'].isin(OPERADORES.keys())]
+            with medidor.etapa('grafico3:tabela', len(tabela_acomp)):
+                st.dataframe(
+                    tabela_acomp.style
+                        .background_gradient(subset=['Chamados Atendidos'], cmap='Purples')
+                        .format({'Chamados Atendidos': '{:.0f}'}),
+                    height=400,
+                    use_container_width=True
+                )
+
+        # 7. Verificação de operadores sem registros
+        if not contagem_chamados.empty:
+            usuarios_sem_chamados = set(OPERADORES.keys()) - set(contagem_chamados['cdusuario'])
+            if usuarios_sem_chamados:
+                st.warning(f"Operadores sem chamados atendidos: {', '.join(OPERADORES[id] for id in usuarios_sem_chamados)}")
+    else:
+        st.warning("Dados de acompanhamentos não disponíveis")
 
-    # 8. Gráfico de barras
-    if not contagem_chamados.empty:
-        # Usar Plotly Express para melhor visualização
-        try:
-            import plotly.express as px
-            fig = px.bar(
-                contagem_chamados,
-                x='operador',
-                y='total_chamados',
-                title='Chamados Atendidos por Operador',
-                labels={'operador': 'Operador', 'total_chamados': 'Chamados Atendidos'},
-                color='total_chamados',
-                color_continuous_scale='Purples'
+
+# ======================================
+# GRÁFICO 4 - Chamados por Meio de Solicitação
+# ======================================
+def secao_grafico4():
+    if not df_filtrado.empty:
+        # Contagem por código de origem (cubo) e depois por meio de solicitação
+        contagem_meios = agregado('grafico4', linhas_entrada=len(recorte.cubo_chamados))
+
+        # Só a visualização escolhida é montada e enviada ao navegador; trocar
+        # de visualização reexecuta apenas esta seção, sem recalcular a contagem
+        visualizacao = st.radio("Visualização", ["Gráfico de Pizza", "Gráfico de Barras"],
+                                horizontal=True, label_visibility="collapsed", key="visualizacao_meios")
+
+        if visualizacao == "Gráfico de Pizza":
+            grafico_meios = alt.Chart(contagem_meios).mark_arc().encode(
+                theta=alt.Theta(field="Total", type="quantitative"),
+                color=alt.Color(field="Meio de Solicitação", type="nominal", 
+                               scale=alt.Scale(scheme='category20')),
+                tooltip=['Meio de Solicitação', 'Total']
+            ).properties(
+                width=500,
+                height=400,
+                title="Distribuição de Chamados por Meio de Solicitação"
             )
-            fig.update_layout(
-                xaxis_tickangle=-45,
-                height=500
+        else:
+            grafico_meios = alt.Chart(contagem_meios).mark_bar().encode(
+                x=alt.X('Meio de Solicitação:N', axis=alt.Axis(labelAngle=0), sort='-y'),
+                y='Total:Q',
+                color=alt.Color('Meio de Solicitação:N', scale=alt.Scale(scheme='category20')),
+                tooltip=['Meio de Solicitação', 'Total']
+            ).properties(
+                width=600,
+                height=400,
+                title="Chamados por Meio de Solicitação"
             )
-            st.plotly_chart(fig, use_container_width=True)
-        except:
-            # Fallback para gráfico nativo do Streamlit
-            st.bar_chart(
-                contagem_chamados.set_index('operador')['total_chamados'],
-                height=500,
-                color='#9467bd'
+
+        with medidor.etapa('grafico4:render', len(contagem_meios)):
+            st.altair_chart(grafico_meios, use_container_width=True)
+        botao_exportacao(contagem_meios, 'chamados_por_meio')
+
+        mostrar_tabela_meios = st.checkbox("Mostrar tabela detalhada", key="tabela_meios")
+        if mostrar_tabela_meios:
+            st.subheader("Detalhamento por Meio de Solicitação")
+            tabela_meios = contagem_meios.copy()
+            tabela_meios['Percentual'] = (tabela_meios['Total'] / tabela_meios['Total'].sum() * 100).round(2)
+            with medidor.etapa('grafico4:tabela', len(tabela_meios)):
+                st.dataframe(
+                    tabela_meios.style
+                        .background_gradient(subset=['Total'], cmap='Blues')
+                        .format({'Total': '{:.0f}', 'Percentual': '{:.2f}%'}),
+                    height=400,
+                    use_container_width=True
+                )
+    else:
+        st.warning("Nenhum dado disponível para o período selecionado")
+
+
+# ======================================
+# GRÁFICO 5 - Acompanhamentos Tipo 22.0 por Operador ok
+# ======================================
+def secao_grafico5():
+    if not df_acompanhamentos.empty:
+        # Acompanhamentos tipo 20 e 22 no período, direto do cubo
+        dados_grafico5 = agregado('grafico5', linhas_entrada=len(recorte.cubo_acompanhamentos))
+
+        if not dados_grafico5.empty:
+            grafico_barras = alt.Chart(dados_grafico5).mark_bar(
+                color='#17becf',
+                cornerRadius=5
+            ).encode(
+                x=alt.X('operador:N', title='Operador', sort='-y'),
+                y=alt.Y('total:Q', title='Total de Acompanhamentos'),
+                tooltip=['operador', 'total']
+            ).properties(
+                height=400,
+                title="Acompanhamentos Tipo 22.0 por Operador"
             )
+            with medidor.etapa('grafico5:render', len(dados_grafico5)):
+                st.altair_chart(grafico_barras, use_container_width=True)
+            botao_exportacao(dados_grafico5, 'acompanhamentos_por_operador')
+
+            mostrar_tabela = st.checkbox("Mostrar tabela detalhada", key="tabela_grafico5")
+            if mostrar_tabela:
+                st.subheader("Detalhamento por Operador")
+                total_geral = dados_grafico5['total'].sum()
+                # O agregado vem do cache compartilhado: o percentual vai numa cópia
+                tabela = dados_grafico5.assign(
+                    percentual=(dados_grafico5['total'] / total_geral * 100).round(1)
+                )[['operador', 'total', 'percentual']].rename(columns={
+                    'operador': 'Operador',
+                    'total': 'Total',
+                    'percentual': 'Percentual (%)'
+                })
+                with medidor.etapa('grafico5:tabela', len(tabela)):
+                    st.dataframe(
+                        tabela.style
+                            .background_gradient(subset=['Total'], cmap='Blues')
+                            .format({'Total': '{:.0f}', 'Percentual (%)': '{:.1f}%'}),
+                        height=400,
+                        use_container_width=True
+                    )
+
+                st.subheader("Estatísticas")
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Total Geral", total_geral)
+                col2.metric("Média por Operador", f"{total_geral / len(dados_grafico5):.1f}")
+                top_operador = dados_grafico5.iloc[0]
+                col3.metric("Operador com Mais Acompanhamentos", 
+                           f"{top_operador['operador']} ({top_operador['total']})")
+
+            operadores_sem = dados_grafico5[dados_grafico5['total'] == 0]
+            if not operadores_sem.empty:
+                st.warning(
+                    "Operadores sem acompanhamentos tipo 22.0: " +
+                    ", ".join(operadores_sem['operador'].tolist())
+                )
+        else:
+            st.warning("Nenhum acompanhamento tipo 22.0 encontrado no período!")
     else:
-        st.warning("Nenhum chamado encontrado com 'Chamado em atendimento' no período!")
-
-    # 9. Tabela detalhada
-    mostrar_tabela_acomp = st.checkbox("Mostrar detalhes de chamados por operador", key="tabela_chamados_operador")
-    if mostrar_tabela_acomp and not contagem_chamados.empty:
-        st.subheader("Detalhamento de Chamados Atendidos")
-        
-        tabela_acomp = contagem_chamados[['operador', 'total_chamados']].rename(columns={
-            'operador': 'Operador',
-            'total_chamados': 'Chamados Atendidos'
-        })
-        
-        st.dataframe(
-            tabela_acomp.style
-                .background_gradient(subset=['Chamados Atendidos'], cmap='Purples')
-                .format({'Chamados Atendidos': '{:.0f}'}),
-            height=400,
-            use_container_width=True
-        )
+        st.warning("Dados de acompanhamentos não disponíveis")
 
-    # 10. Verificação de operadores sem registros
-    if not contagem_chamados.empty:
-        usuarios_sem_chamados = set(OPERADORES.keys()) - set(contagem_chamados['cdusuario'])
-        if usuarios_sem_chamados:
-            st.warning(f"Operadores sem chamados atendidos: {', '.join(OPERADORES[id] for id in usuarios_sem_chamados)}")
-else:
-    st.warning("Dados de acompanhamentos não disponíveis")
 
 # ======================================
-# GRÁFICO 4 - Chamados por Meio de Solicitação
+# GRÁFICO 6 - Chamados Finalizados por Operador
 # ======================================
-st.header("Chamados por tipo de solicitação")
-
-if not df_filtrado.empty:
-    mapeamento_origem = {
-        1: "Telefone", 18: "Telefone", 5: "Telefone",
-        2: "Email", 6: "Email",
-        4: "Pessoalmente", 7: "Pessoalmente", 17: "Pessoalmente",
-        14: "Web Service", 3: "Web Service", 8: "Web Service", 13: "Web Service", 20: "Web Service",
-        15: "Chat", 9: "Chat",
-        10: "Operação Monitoramento",
-        11: "Oficio",
-        12: "URA", 19: "URA"
-    }
-
-    df_filtrado['meio_solicitacao'] = df_filtrado['cdorigem'].map(mapeamento_origem)
-    contagem_meios = df_filtrado['meio_solicitacao'].value_counts().reset_index()
-    contagem_meios.columns = ['Meio de Solicitação', 'Total']
-    contagem_meios = contagem_meios.sort_values('Total', ascending=False)
-
-    # Gráfico de Pizza
-    grafico_pizza = alt.Chart(contagem_meios).mark_arc().encode(
-        theta=alt.Theta(field="Total", type="quantitative"),
-        color=alt.Color(field="Meio de Solicitação", type="nominal", 
-                       scale=alt.Scale(scheme='category20')),
-        tooltip=['Meio de Solicitação', 'Total']
-    ).properties(
-        width=500,
-        height=400,
-        title="Distribuição de Chamados por Meio de Solicitação"
-    )
+def secao_grafico6():
+    if not df_filtrado.empty:
+        # Chamados na situação 7 (finalizado) por responsável, direto do cubo
+        total_finalizados, dados_grafico6 = agregado('grafico6', linhas_entrada=len(recorte.cubo_chamados))
+
+        if total_finalizados > 0:
+
+            grafico_barras = alt.Chart(dados_grafico6).mark_bar(
+                cornerRadius=5,
+                size=25
+            ).encode(
+                x=alt.X('operador:N', title='Operador', sort='-y'),
+                y=alt.Y('total:Q', title='Chamados Finalizados'),
+                color=alt.Color('equipe:N', 
+                               scale=alt.Scale(range=['#1f77b4', '#ff7f0e']),
+                               legend=alt.Legend(title="Equipe")),
+                tooltip=['operador', 'equipe', 'total']
+            ).properties(
+                height=400,
+                title="Chamados Finalizados por Operador"
+            )
 
-    # Gráfico de Barras
-    grafico_barras = alt.Chart(contagem_meios).mark_bar().encode(
-        x=alt.X('Meio de Solicitação:N', axis=alt.Axis(labelAngle=0), sort='-y'),
-        y='Total:Q',
-        color=alt.Color('Meio de Solicitação:N', scale=alt.Scale(scheme='category20')),
-        tooltip=['Meio de Solicitação', 'Total']
-    ).properties(
-        width=600,
-        height=400,
-        title="Chamados por Meio de Solicitação"
-    )
+            with medidor.etapa('grafico6:render', len(dados_grafico6)):
+                st.altair_chart(grafico_barras, use_container_width=True)
+            botao_exportacao(dados_grafico6, 'chamados_finalizados_por_operador')
+
+            mostrar_tabela_finalizados = st.checkbox("Mostrar tabela detalhada", key="tabela_finalizados")
+            if mostrar_tabela_finalizados:
+                st.subheader("Detalhamento de Chamados Finalizados")
+                tabela_finalizados = dados_grafico6[['operador', 'equipe', 'total']].rename(columns={
+                    'operador': 'Operador',
+                    'equipe': 'Equipe',
+                    'total': 'Chamados Finalizados'
+                })
+                with medidor.etapa('grafico6:tabela', len(tabela_finalizados)):
+                    st.dataframe(
+                        tabela_finalizados.style
+                            .background_gradient(subset=['Chamados Finalizados'], cmap='Oranges')
+                            .format({'Chamados Finalizados': '{:.0f}'}),
+                        height=400,
+                        use_container_width=True
+                    )
+
+                st.subheader("Estatísticas")
+                col1, col2 = st.columns(2)
+                total_geral = tabela_finalizados['Chamados Finalizados'].sum()
+                col1.metric("Total de Chamados Finalizados", total_geral)
+                col2.metric("Operador com Mais Finalizações", 
+                           f"{tabela_finalizados.iloc[0]['Operador']} ({tabela_finalizados.iloc[0]['Chamados Finalizados']})")
+
+            operadores_sem_finalizados = dados_grafico6[dados_grafico6['total'] == 0]
+            if not operadores_sem_finalizados.empty:
+                st.warning(
+                    "Operadores sem chamados finalizados: " +
+                    ", ".join(operadores_sem_finalizados['operador'].tolist())
+                )
+        else:
+            st.warning("Nenhum chamado finalizado no período selecionado")
+    else:
+        st.warning("Nenhum dado disponível para o período selecionado")
 
-    aba1, aba2 = st.tabs(["Gráfico de Pizza", "Gráfico de Barras"])
-    with aba1: st.altair_chart(grafico_pizza, use_container_width=True)
-    with aba2: st.altair_chart(grafico_barras, use_container_width=True)
-
-    mostrar_tabela_meios = st.checkbox("Mostrar tabela detalhada", key="tabela_meios")
-    if mostrar_tabela_meios:
-        st.subheader("Detalhamento por Meio de Solicitação")
-        tabela_meios = contagem_meios.copy()
-        tabela_meios['Percentual'] = (tabela_meios['Total'] / tabela_meios['Total'].sum() * 100).round(2)
-        st.dataframe(
-            tabela_meios.style
-                .background_gradient(subset=['Total'], cmap='Blues')
-                .format({'Total': '{:.0f}', 'Percentual': '{:.2f}%'}),
-            height=400,
-            use_container_width=True
-        )
-else:
-    st.warning("Nenhum dado disponível para o período selecionado")
 
 # ======================================
-# GRÁFICO 5 - Acompanhamentos Tipo 22.0 por Operador ok
+# PRIMEIRA RESPOSTA E TROCAS DE OPERADOR
 # ======================================
-st.header("Acompanhamentos por Operador")
-
-if not df_acompanhamentos.empty:
-    todos_operadores = pd.DataFrame({
-        'cdusuario': list(OPERADORES.keys()),
-        'operador': [OPERADORES[id] for id in OPERADORES.keys()]
-    })
-
-    df_acomp_tipo22 = df_acompanhamentos[
-        (df_acompanhamentos['dtacompanhamento'].dt.date >= data_inicio) &
-        (df_acompanhamentos['dtacompanhamento'].dt.date <= data_fim) &
-        (df_acompanhamentos['cdtipoacompanhamento'].isin([20.0, 22.0]))
-    ]
-
-    contagem_acomp = df_acomp_tipo22.groupby('cdusuario').size().reset_index(name='total')
-    dados_grafico5 = todos_operadores.merge(
-        contagem_acomp, 
-        on='cdusuario', 
-        how='left'
-    ).fillna(0).sort_values('total', ascending=False)
-
-    if not dados_grafico5.empty:
-        grafico_barras = alt.Chart(dados_grafico5).mark_bar(
-            color='#17becf',
-            cornerRadius=5
+# Uma linha por chamado (primeiro/último acompanhamento e trocas), calculada
+# uma vez por versão dos dados e recortada por período e equipes
+def interacoes_do_recorte():
+    interacoes_chamados = agregado('interacoes', linhas_entrada=len(df_acompanhamentos_base))
+    return agregado('interacoes:recorte', linhas_entrada=len(interacoes_chamados))
+
+def secao_primeira_resposta():
+    interacoes_recorte = interacoes_do_recorte()
+    primeira_resposta = agregado('primeira_resposta', linhas_entrada=len(interacoes_recorte))
+
+    if not primeira_resposta.empty:
+        grafico_resposta = alt.Chart(primeira_resposta).mark_bar(
+            cornerRadius=5,
+            size=25
         ).encode(
-            x=alt.X('operador:N', title='Operador', sort='-y'),
-            y=alt.Y('total:Q', title='Total de Acompanhamentos'),
-            tooltip=['operador', 'total']
-        ).properties(
-            height=400,
-            title="Acompanhamentos Tipo 22.0 por Operador"
-        )
-        st.altair_chart(grafico_barras, use_container_width=True)
-
-        mostrar_tabela = st.checkbox("Mostrar tabela detalhada", key="tabela_grafico5")
-        if mostrar_tabela:
-            st.subheader("Detalhamento por Operador")
-            total_geral = dados_grafico5['total'].sum()
-            dados_grafico5['percentual'] = (dados_grafico5['total'] / total_geral * 100).round(1)
-            tabela = dados_grafico5[['operador', 'total', 'percentual']].rename(columns={
+            x=alt.X('operador:N', title='Operador', sort='y'),
+            y=alt.Y('p50_horas:Q', title='Mediana até o 1º acompanhamento (h)'),
+            color=alt.Color('chamados:Q', title='Chamados', scale=alt.Scale(scheme='purples')),
+            tooltip=['operador', 'chamados',
+                     alt.Tooltip('media_horas:Q', title='Média (h)', format='.1f'),
+                     alt.Tooltip('p50_horas:Q', title='Mediana (h)', format='.1f'),
+                     alt.Tooltip('p90_horas:Q', title='P90 (h)', format='.1f')]
+        ).properties(height=400)
+
+        with medidor.etapa('primeira_resposta:render', len(primeira_resposta)):
+            st.altair_chart(grafico_resposta, use_container_width=True)
+        botao_exportacao(primeira_resposta, 'primeira_resposta_por_operador')
+
+        if st.checkbox("Mostrar tabela de primeira resposta", key="tabela_primeira_resposta"):
+            tabela_resposta = primeira_resposta[
+                ['operador', 'chamados', 'media_horas', 'p50_horas', 'p90_horas', 'p95_horas']
+            ].rename(columns={
                 'operador': 'Operador',
-                'total': 'Total',
-                'percentual': 'Percentual (%)'
+                'chamados': 'Chamados',
+                'media_horas': 'Média (h)',
+                'p50_horas': 'Mediana (h)',
+                'p90_horas': 'P90 (h)',
+                'p95_horas': 'P95 (h)'
             })
             st.dataframe(
-                tabela.style
-                    .background_gradient(subset=['Total'], cmap='Blues')
-                    .format({'Total': '{:.0f}', 'Percentual (%)': '{:.1f}%'}),
-                height=400,
+                tabela_resposta.style.format({coluna: '{:.1f}' for coluna in tabela_resposta.columns[2:]}),
+                hide_index=True,
                 use_container_width=True
             )
-            
-            st.subheader("Estatísticas")
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Total Geral", total_geral)
-            col2.metric("Média por Operador", f"{total_geral / len(dados_grafico5):.1f}")
-            top_operador = dados_grafico5.iloc[0]
-            col3.metric("Operador com Mais Acompanhamentos", 
-                       f"{top_operador['operador']} ({top_operador['total']})")
-
-        operadores_sem = dados_grafico5[dados_grafico5['total'] == 0]
-        if not operadores_sem.empty:
-            st.warning(
-                "Operadores sem acompanhamentos tipo 22.0: " +
-                ", ".join(operadores_sem['operador'].tolist())
-            )
     else:
-        st.warning("Nenhum acompanhamento tipo 22.0 encontrado no período!")
-else:
-    st.warning("Dados de acompanhamentos não disponíveis")
+        st.warning("Nenhum chamado do período teve acompanhamento de operador")
 
-# ======================================
-# GRÁFICO 6 - Chamados Finalizados por Operador
-# ======================================
-st.header("Chamados Finalizados por Operador")
-
-if not df_filtrado.empty:
-    df_finalizados = df_filtrado[df_filtrado['cdsituacao'] == 7.0]
-    
-    if not df_finalizados.empty:
-        contagem_finalizados = df_finalizados['cdresponsavel'].value_counts().reset_index()
-        contagem_finalizados.columns = ['cdresponsavel', 'total']
-        contagem_finalizados['operador'] = contagem_finalizados['cdresponsavel'].map(OPERADORES)
-        contagem_finalizados['equipe'] = contagem_finalizados['cdresponsavel'].map(EQUIPES_POR_OPERADOR)
-
-        todos_operadores = pd.DataFrame({
-            'cdresponsavel': list(OPERADORES.keys()),
-            'operador': [OPERADORES[id] for id in OPERADORES.keys()],
-            'equipe': [EQUIPES_POR_OPERADOR[id] for id in OPERADORES.keys()]
-        })
-
-        dados_grafico6 = todos_operadores.merge(
-            contagem_finalizados[['cdresponsavel', 'total']], 
-            on='cdresponsavel', 
-            how='left'
-        ).fillna(0).sort_values('total', ascending=False)
-
-        grafico_barras = alt.Chart(dados_grafico6).mark_bar(
+def secao_trocas():
+    interacoes_recorte = interacoes_do_recorte()
+    trocas_equipe = agregado('trocas:equipes', linhas_entrada=len(interacoes_recorte))
+
+    if not trocas_equipe.empty:
+        grafico_trocas = alt.Chart(trocas_equipe).mark_bar(
             cornerRadius=5,
             size=25
         ).encode(
-            x=alt.X('operador:N', title='Operador', sort='-y'),
-            y=alt.Y('total:Q', title='Chamados Finalizados'),
-            color=alt.Color('equipe:N', 
+            x=alt.X('trocas:N', title='Trocas de operador', sort=metricas.ROTULOS_TROCAS,
+                    axis=alt.Axis(labelAngle=0)),
+            y=alt.Y('total:Q', title='Chamados'),
+            color=alt.Color('equipe:N',
                            scale=alt.Scale(range=['#1f77b4', '#ff7f0e']),
                            legend=alt.Legend(title="Equipe")),
-            tooltip=['operador', 'equipe', 'total']
-        ).properties(
-            height=400,
-            title="Chamados Finalizados por Operador"
-        )
+            xOffset=alt.XOffset('equipe:N'),
+            tooltip=['equipe', 'trocas', 'total']
+        ).properties(height=350)
 
-        st.altair_chart(grafico_barras, use_container_width=True)
+        with medidor.etapa('trocas:render', len(trocas_equipe)):
+            st.altair_chart(grafico_trocas, use_container_width=True)
+        botao_exportacao(trocas_equipe, 'trocas_por_equipe')
 
-        mostrar_tabela_finalizados = st.checkbox("Mostrar tabela detalhada", key="tabela_finalizados")
-        if mostrar_tabela_finalizados:
-            st.subheader("Detalhamento de Chamados Finalizados")
-            tabela_finalizados = dados_grafico6[['operador', 'equipe', 'total']].rename(columns={
-                'operador': 'Operador',
-                'equipe': 'Equipe',
-                'total': 'Chamados Finalizados'
-            })
+        if st.checkbox("Mostrar trocas por operador", key="tabela_trocas_operador"):
+            trocas_operador = agregado('trocas:operadores', linhas_entrada=len(interacoes_recorte))
+            st.caption("Operador do último acompanhamento de cada chamado")
             st.dataframe(
-                tabela_finalizados.style
-                    .background_gradient(subset=['Chamados Finalizados'], cmap='Oranges')
-                    .format({'Chamados Finalizados': '{:.0f}'}),
-                height=400,
+                trocas_operador[['operador', 'chamados', 'media_trocas', 'com_troca']].rename(columns={
+                    'operador': 'Operador',
+                    'chamados': 'Chamados',
+                    'media_trocas': 'Média de Trocas',
+                    'com_troca': 'Com Troca'
+                }).style.format({'Média de Trocas': '{:.2f}', 'Com Troca': '{:.0%}'}),
+                hide_index=True,
                 use_container_width=True
             )
-            
-            st.subheader("Estatísticas")
-            col1, col2 = st.columns(2)
-            total_geral = tabela_finalizados['Chamados Finalizados'].sum()
-            col1.metric("Total de Chamados Finalizados", total_geral)
-            col2.metric("Operador com Mais Finalizações", 
-                       f"{tabela_finalizados.iloc[0]['Operador']} ({tabela_finalizados.iloc[0]['Chamados Finalizados']})")
-
-        operadores_sem_finalizados = dados_grafico6[dados_grafico6['total'] == 0]
-        if not operadores_sem_finalizados.empty:
-            st.warning(
-                "Operadores sem chamados finalizados: " +
-                ", ".join(operadores_sem_finalizados['operador'].tolist())
-            )
     else:
-        st.warning("Nenhum chamado finalizado no período selecionado")
-else:
-    st.warning("Nenhum dado disponível para o período selecionado")
+        st.warning("Nenhum chamado do período teve acompanhamento de operador")
+
+
+# ======================================
+# GRÁFICO 7 - Tempo de Resolução, Backlog e Envelhecimento
+# ======================================
+COLUNAS_RESOLUCAO = {
+    'chamados': 'Chamados',
+    'resolvidos': 'Resolvidos',
+    'media_horas': 'Média (h)',
+    'p50_horas': 'Mediana (h)',
+    'p90_horas': 'P90 (h)',
+    'p95_horas': 'P95 (h)',
+}
+
+def tabela_resolucao(dados, coluna_nome, titulo_nome):
+    tabela = dados[[coluna_nome, *COLUNAS_RESOLUCAO]].rename(
+        columns={coluna_nome: titulo_nome, **COLUNAS_RESOLUCAO})
+    return tabela.style.format({titulo: '{:.1f}' for titulo in list(COLUNAS_RESOLUCAO.values())[2:]},
+                               na_rep='-')
+
+def secao_grafico7():
+    if not df_filtrado.empty:
+        # Percentis do tempo de resolução dos chamados abertos no período
+        resolucao_equipes = agregado('grafico7:equipes', linhas_entrada=len(df_filtrado))
+        st.subheader("Tempo de resolução por equipe")
+        with medidor.etapa('grafico7:tabela_equipes', len(resolucao_equipes)):
+            st.dataframe(tabela_resolucao(resolucao_equipes, 'equipe', 'Equipe'),
+                         hide_index=True, use_container_width=True)
+        botao_exportacao(resolucao_equipes, 'resolucao_por_equipe')
+
+        if st.checkbox("Mostrar tempo de resolução por operador", key="tabela_resolucao_operador"):
+            resolucao_operadores = agregado('grafico7:operadores', linhas_entrada=len(df_filtrado))
+            with medidor.etapa('grafico7:tabela_operadores', len(resolucao_operadores)):
+                st.dataframe(tabela_resolucao(resolucao_operadores, 'operador', 'Operador'),
+                             hide_index=True, use_container_width=True)
+
+        # Backlog: chamados abertos no fim de cada dia (inclui os abertos antes do período)
+        backlog = agregado('grafico7:backlog', linhas_entrada=len(df_base))
+        st.subheader("Backlog diário")
+        # Períodos longos: cada ponto agrupa "passo" dias (até MAXIMO_PONTOS pontos)
+        passo = graficos.passo_pontos(len(backlog))
+        dados_backlog, spec_backlog = agregado('grafico7:spec_backlog', linhas_entrada=len(backlog))
+        with medidor.etapa('grafico7:render_backlog', len(dados_backlog)):
+            st.vega_lite_chart(dados_backlog, spec_backlog, use_container_width=True)
+        if passo > 1:
+            st.caption(f"Cada ponto agrupa {passo} dias: backlog no último dia, aberturas e fechamentos somados")
+        botao_exportacao(backlog, 'backlog_diario')
+
+        # Idade dos chamados em aberto no fim do período
+        envelhecimento = agregado('grafico7:envelhecimento', linhas_entrada=len(df_base))
+        st.subheader("Envelhecimento dos chamados em aberto")
+        if envelhecimento['total'].sum() > 0:
+            grafico_envelhecimento = alt.Chart(envelhecimento).mark_bar(
+                cornerRadius=5,
+                size=25
+            ).encode(
+                x=alt.X('faixa:N', title='Idade', sort=list(envelhecimento['faixa'].cat.categories),
+                        axis=alt.Axis(labelAngle=0)),
+                y=alt.Y('total:Q', title='Chamados em Aberto'),
+                color=alt.Color('equipe:N',
+                               scale=alt.Scale(range=['#1f77b4', '#ff7f0e']),
+                               legend=alt.Legend(title="Equipe")),
+                xOffset=alt.XOffset('equipe:N'),
+                tooltip=['equipe', 'faixa', 'total']
+            ).properties(height=350)
+            with medidor.etapa('grafico7:render_envelhecimento', len(envelhecimento)):
+                st.altair_chart(grafico_envelhecimento, use_container_width=True)
+            botao_exportacao(envelhecimento, 'envelhecimento')
+        else:
+            st.info("Nenhum chamado em aberto no fim do período")
+    else:
+        st.warning("Nenhum dado disponível para o período selecionado")
+
+
+# ======================================
+# SEÇÕES
+# ======================================
+# Cada seção só é calculada e desenhada quando está aberta. Cada uma roda como
+# fragmento: marcar uma tabela detalhada ou trocar a visualização reexecuta só
+# a própria seção, e os agregados vêm do cache por estado dos filtros.
+SECOES = [
+    ('grafico1', "Chamados por Atendido Equipe", secao_grafico1),
+    ('grafico2', "Chamados Abertos por Operador", secao_grafico2),
+    ('grafico3', "Chamado Iniciado - Por Operador (Validar dados - inconsistencias entre 2 a 4 chamados)", secao_grafico3),
+    ('primeira_resposta', "Tempo até o Primeiro Acompanhamento por Operador", secao_primeira_resposta),
+    ('grafico4', "Chamados por tipo de solicitação", secao_grafico4),
+    ('grafico5', "Acompanhamentos por Operador", secao_grafico5),
+    ('trocas', "Trocas de Operador por Chamado", secao_trocas),
+    ('grafico6', "Chamados Finalizados por Operador", secao_grafico6),
+    ('grafico7', "Tempo de Resolução e Backlog", secao_grafico7),
+]
+
+for chave, titulo, renderizar in SECOES:
+    st.header(titulo)
+    if st.toggle("Exibir seção", value=True, key=f"secao_{chave}"):
+        st.fragment(renderizar)()
+
+# ======================================
+# INSTRUMENTAÇÃO (ADMINISTRAÇÃO)
+# ======================================
+if modo_admin:
+    relatorio_perfil = perfil.parar() if perfil is not None else None
+
+    with st.expander("Instrumentação desta execução"):
+        st.write("### Etapas")
+        st.dataframe(medidor.tabela(), use_container_width=True)
+        st.download_button(
+            "Exportar etapas (JSON Lines)",
+            medidor.exportar(),
+            file_name=f"etapas-{medidor.execucao}.jsonl",
+            mime="application/x-ndjson"
+        )
+
+        # Desempenho da última leitura do banco (linhas, linhas/s e pico de
+        # memória por tabela)
+        st.write("### Última sincronização com o banco")
+        st.dataframe(pd.DataFrame.from_dict(sincronizador.estatisticas, orient='index'), use_container_width=True)
 
+        if relatorio_perfil:
+            st.write("### Perfil")
+            st.text(relatorio_perfil)
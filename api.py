@@ -0,0 +1,197 @@
+import gzip
+import hashlib
+import json
+import threading
+from datetime import date, datetime
+
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import make_server
+
+import exportacao
+import metricas
+
+# ======================================
+# API DE AGREGADOS (JSON)
+# ======================================
+# Expõe os mesmos agregados do painel (por operador, por equipe e por origem)
+# para outras equipes, a partir do estado e do cache compartilhado do painel:
+# nenhuma requisição consulta o banco.
+#
+#   GET /api/status
+#   GET /api/operadores?inicio=2025-01-01&fim=2025-01-31&equipes=1,3
+#   GET /api/equipes?...
+#   GET /api/origens?...
+#
+# O ETag muda junto com a versão dos dados (e das dimensões), então um GET condicional
+# (If-None-Match) devolve 304 até a próxima atualização. Respostas são
+# compactadas com gzip quando o cliente aceita, com um ETag próprio. Datas
+# inválidas ou fora de DATA_MINIMA..DATA_MAXIMA dão 400.
+#
+# Os agregados não têm autenticação, e a API escuta apenas em 127.0.0.1,
+# salvo configuração em contrário (HOST_API). Linhas de chamados e
+# acompanhamentos só saem por links emitidos pelo painel:
+#
+#   GET /api/exportar/<token>
+#
+# O token (aleatório e com validade, ver exportacao.PedidosExportacao) guarda
+# o filtro, a tabela e o formato; o arquivo é enviado em partes, lote a lote,
+# sem ser montado inteiro em memória.
+
+# Respostas menores que isso não compensam a compactação
+TAMANHO_MINIMO_GZIP = 512
+
+# Datas aceitas nos filtros (fora disso, 400): os limites do período e as
+# datas do pandas (até 2262) não podem estourar
+DATA_MINIMA = date(1900, 1, 1)
+DATA_MAXIMA = date(2199, 12, 31)
+
+
+class ParametroInvalido(ValueError):
+    pass
+
+
+def _ler_data(nome, padrao):
+    valor = request.args.get(nome)
+    if not valor:
+        return padrao
+    try:
+        data = datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise ParametroInvalido(f"'{nome}' deve estar no formato AAAA-MM-DD")
+    if not DATA_MINIMA <= data <= DATA_MAXIMA:
+        raise ParametroInvalido(f"'{nome}' deve estar entre {DATA_MINIMA} e {DATA_MAXIMA}")
+    return data
+
+
+def _ler_equipes(equipes):
+    valor = request.args.get('equipes')
+    if not valor:
+        return tuple(sorted(int(codigo) for codigo in equipes))
+    try:
+        return tuple(sorted(int(codigo) for codigo in valor.split(',')))
+    except ValueError:
+        raise ParametroInvalido("'equipes' deve ser uma lista de códigos separados por vírgula")
+
+
+def _ler_filtros(equipes):
+    hoje = datetime.now().date()
+    data_inicio = _ler_data('inicio', hoje.replace(day=1))
+    data_fim = _ler_data('fim', hoje)
+    if data_fim < data_inicio:
+        raise ParametroInvalido("'fim' deve ser igual ou posterior a 'inicio'")
+    return data_inicio, data_fim, _ler_equipes(equipes)
+
+
+def _corpo_json(versao, data_inicio, data_fim, codigos_equipes, dados):
+    documento = {
+        'versao': versao,
+        'inicio': data_inicio.isoformat(),
+        'fim': data_fim.isoformat(),
+        'equipes': list(codigos_equipes),
+        'dados': json.loads(dados.to_json(orient='records', force_ascii=False)),
+    }
+    corpo = json.dumps(documento, ensure_ascii=False).encode('utf-8')
+    return corpo, gzip.compress(corpo) if len(corpo) >= TAMANHO_MINIMO_GZIP else None
+
+
+# Cada codificação (gzip ou não) é uma representação diferente, com seu ETag
+def _etag(versao, nome, filtros, codificacao):
+    return hashlib.sha1(repr((versao, nome, filtros, codificacao)).encode()).hexdigest()
+
+
+# fonte: objeto com estado() (o Sincronizador do painel)
+# cache: CacheCompartilhado do painel, para reaproveitar recortes e respostas
+# dimensoes: objeto com atual() (o CarregadorDimensoes do painel)
+# exportacoes: PedidosExportacao do painel; sem ele, não há exportação de linhas
+def criar_app(fonte, cache, dimensoes, situacao=None, exportacoes=None):
+    app = Flask(__name__)
+
+    consultas_api = {
+        'operadores': lambda recorte, tabelas: metricas.resumo_por_operador(recorte, tabelas.operadores),
+        'equipes': lambda recorte, tabelas: metricas.chamados_por_equipe(recorte, tabelas.equipes),
+        'origens': lambda recorte, tabelas: metricas.chamados_por_meio(recorte, tabelas.meios_origem).rename(
+            columns={'Meio de Solicitação': 'meio_solicitacao', 'Total': 'total'}),
+    }
+
+    def responder(nome):
+        estado = fonte.estado()
+        tabelas = dimensoes.atual()
+        # Mesma versão e mesma chave de recorte usadas pelo painel
+        versao = (estado.versao, tabelas.versao)
+        cache.invalidar(versao)
+        data_inicio, data_fim, codigos_equipes = _ler_filtros(tabelas.equipes)
+
+        def obter(chave, calcular):
+            return cache.obter(versao, (data_inicio, data_fim, codigos_equipes, chave), calcular)
+
+        def calcular_corpo():
+            recorte = obter('recorte', lambda: metricas.recortar(estado, data_inicio, data_fim, codigos_equipes))
+            return _corpo_json(estado.versao, data_inicio, data_fim, codigos_equipes,
+                               consultas_api[nome](recorte, tabelas))
+
+        corpo, corpo_gzip = obter('api:' + nome, calcular_corpo)
+
+        resposta = Response(mimetype='application/json')
+        resposta.headers['Cache-Control'] = 'no-cache'
+        resposta.vary.add('Accept-Encoding')
+        codificacao = None
+        if corpo_gzip is not None and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            codificacao = 'gzip'
+            resposta.set_data(corpo_gzip)
+            resposta.headers['Content-Encoding'] = 'gzip'
+        else:
+            resposta.set_data(corpo)
+        resposta.set_etag(_etag(versao, nome, (data_inicio, data_fim, codigos_equipes), codificacao))
+        return resposta.make_conditional(request)
+
+    @app.errorhandler(ParametroInvalido)
+    def parametro_invalido(erro):
+        return jsonify(erro=str(erro)), 400
+
+    @app.get('/api/status')
+    def status():
+        estado = fonte.estado()
+        return jsonify(
+            versao=estado.versao,
+            chamados=len(estado.chamados),
+            acompanhamentos=len(estado.acompanhamentos),
+            **(situacao() if situacao is not None else {}),
+        )
+
+    # Linhas de chamados ou acompanhamentos do recorte autorizado pelo painel
+    @app.get('/api/exportar/<token>')
+    def exportar(token):
+        pedido = exportacoes.resgatar(token) if exportacoes is not None else None
+        if pedido is None:
+            return jsonify(erro="link de exportação inválido ou vencido"), 404
+        estado = fonte.estado()
+        tabelas = dimensoes.atual()
+        versao = (estado.versao, tabelas.versao)
+        cache.invalidar(versao)
+        filtros = (pedido['data_inicio'], pedido['data_fim'], pedido['codigos_equipes'])
+        recorte = cache.obter(versao, filtros + ('recorte',), lambda: metricas.recortar(estado, *filtros))
+
+        try:
+            partes = exportacao.exportar(getattr(recorte, pedido['tabela']), pedido['formato'])
+        except exportacao.ExportacaoInvalida as erro:
+            raise ParametroInvalido(str(erro))
+        nome = exportacao.nome_arquivo(pedido['tabela'], pedido['data_inicio'], pedido['data_fim'], pedido['formato'])
+        resposta = Response(partes, mimetype=exportacao.FORMATOS[pedido['formato']])
+        resposta.headers['Content-Disposition'] = f'attachment; filename="{nome}"'
+        return resposta
+
+    @app.get('/api/<nome>')
+    def agregado(nome):
+        if nome not in consultas_api:
+            return jsonify(erro=f"agregado desconhecido: {nome}"), 404
+        return responder(nome)
+
+    return app
+
+
+# Serve a API numa thread do processo do painel; devolve o servidor (use
+# servidor.shutdown() para encerrar)
+def iniciar_em_segundo_plano(app, host='127.0.0.1', porta=8502):
+    servidor = make_server(host, porta, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, name='api', daemon=True).start()
+    return servidor
@@ -0,0 +1,206 @@
+import json
+import os
+import time as relogio
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import periodo
+
+# ======================================
+# SNAPSHOT COLUNAR EM DISCO
+# ======================================
+# Guarda hd_chamado e hd_acompanhamento em arquivos Arrow IPC (um por mês de
+# abertura/acompanhamento), sem compressão: a carga inicial não consulta o
+# SQL Server e lê os arquivos mapeados em memória. A conversão para o pandas
+# (to_pandas) copia os dados para cada processo; quem compartilha as mesmas
+# páginas entre processos é o modo compartilhado (ver memoria_compartilhada.py).
+#
+# Os frames gravados estão ordenados pela coluna de data (NaT no final), como
+# no Estado publicado: cada partição é uma fatia contígua, achada por busca
+# binária, e o delta regrava só os meses tocados sem percorrer o snapshot.
+
+# Tabela do snapshot -> coluna de data usada para particionar
+PARTICOES = {
+    'chamados': 'dtchamado',
+    'acompanhamentos': 'dtacompanhamento',
+}
+
+# Partição dos registros sem data válida
+SEM_DATA = 'sem-data'
+
+ARQUIVO_METADADOS = 'metadados.json'
+
+# Mantém os textos como strings Arrow ao voltar para o pandas
+_TIPOS_PANDAS = {
+    pa.string(): pd.StringDtype('pyarrow'),
+    pa.large_string(): pd.StringDtype('pyarrow'),
+}
+
+
+# Chave de partição (AAAA-MM) de cada linha, sem criar strings por linha
+def _codigos_mes(datas):
+    codigos = (datas.dt.year * 100 + datas.dt.month).fillna(0).astype('int64')
+    return codigos
+
+
+def _nome_particao(codigo):
+    if codigo == 0:
+        return SEM_DATA
+    return f"{codigo // 100:04d}-{codigo % 100:02d}"
+
+
+# Partições (AAAA-MM) tocadas por um conjunto de datas
+def meses_das_datas(datas):
+    return {_nome_particao(int(c)) for c in pd.unique(_codigos_mes(pd.Series(datas)))}
+
+
+def _limites_mes(mes):
+    inicio = pd.Timestamp(f"{mes}-01")
+    return inicio, inicio + pd.offsets.MonthBegin()
+
+
+# Linhas do mês (AAAA-MM ou SEM_DATA) num frame ordenado por "coluna"
+def _fatia_mes(df, coluna, mes):
+    if mes == SEM_DATA:
+        validos = df[coluna].to_numpy().searchsorted(np.datetime64('NaT'), side='left')
+        return df.iloc[validos:]
+    return periodo.recortar_periodo(df, coluna, *_limites_mes(mes))
+
+
+# Meses com dados num frame ordenado: do primeiro ao último, mais SEM_DATA
+def _meses_do_frame(df, coluna):
+    datas = df[coluna]
+    validos = datas.to_numpy().searchsorted(np.datetime64('NaT'), side='left')
+    meses = set()
+    if validos:
+        primeiro, ultimo = datas.iloc[0], datas.iloc[validos - 1]
+        meses = {mes.strftime('%Y-%m') for mes in pd.period_range(primeiro, ultimo, freq='M')}
+    if validos < len(df):
+        meses.add(SEM_DATA)
+    return meses
+
+
+def _gravar_atomico(caminho, escrever):
+    temporario = f"{caminho}.tmp-{os.getpid()}"
+    escrever(temporario)
+    os.replace(temporario, caminho)
+
+
+def _ler_arrow(caminho):
+    fonte = pa.memory_map(caminho, 'r')
+    return ipc.open_file(fonte).read_all()
+
+
+class ArmazenamentoSnapshot:
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        for tabela in PARTICOES:
+            os.makedirs(self._pasta(tabela), exist_ok=True)
+
+    def _pasta(self, tabela):
+        return os.path.join(self.diretorio, tabela)
+
+    def _arquivo(self, tabela, mes):
+        return os.path.join(self._pasta(tabela), f"{mes}.arrow")
+
+    # Partições existentes de uma tabela, em ordem cronológica
+    def meses(self, tabela):
+        return sorted(
+            nome[:-len('.arrow')]
+            for nome in os.listdir(self._pasta(tabela))
+            if nome.endswith('.arrow')
+        )
+
+    def existe(self):
+        return os.path.exists(os.path.join(self.diretorio, ARQUIVO_METADADOS))
+
+    def ler_metadados(self):
+        if not self.existe():
+            return None
+        with open(os.path.join(self.diretorio, ARQUIVO_METADADOS), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+
+    def _salvar_tabela(self, tabela, df, meses=None):
+        coluna = PARTICOES[tabela]
+        df = periodo.ordenar_por_data(df, coluna) if meses is None else df
+
+        # Sem lista de meses, regrava tudo e remove partições que deixaram de existir
+        if meses is None:
+            meses = (_meses_do_frame(df, coluna) if not df.empty else set()) | set(self.meses(tabela))
+
+        for mes in meses:
+            caminho = self._arquivo(tabela, mes)
+            parte = _fatia_mes(df, coluna, mes) if not df.empty else df
+            if parte.empty:
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+                continue
+
+            tabela_arrow = pa.Table.from_pandas(parte, preserve_index=False)
+
+            def escrever(destino, tabela_arrow=tabela_arrow):
+                with pa.OSFile(destino, 'wb') as saida:
+                    with ipc.new_file(saida, tabela_arrow.schema) as escritor:
+                        escritor.write_table(tabela_arrow)
+
+            _gravar_atomico(caminho, escrever)
+
+    # Frames ordenados pela coluna de data (os do Estado); numa gravação
+    # completa, são ordenados aqui se preciso
+    # meses_alterados: {'chamados': {...}, 'acompanhamentos': {...}}; None regrava tudo
+    # filtros: equipes/operadores usados na carga completa, para que a partida
+    # a frio não reaproveite um snapshot buscado com outros filtros
+    def salvar(self, df_chamados, df_acompanhamentos, versao, meses_alterados=None,
+               carga_completa_em=None, filtros=None):
+        meses_alterados = meses_alterados or {}
+        self._salvar_tabela('chamados', df_chamados, meses_alterados.get('chamados'))
+        self._salvar_tabela('acompanhamentos', df_acompanhamentos, meses_alterados.get('acompanhamentos'))
+
+        # Numa gravação completa, os metadados anteriores (que podem estar
+        # ilegíveis) são descartados
+        metadados = (self.ler_metadados() or {}) if meses_alterados else {}
+        metadados.update({
+            'versao': versao,
+            'atualizado_em': relogio.time(),
+            'linhas_chamados': len(df_chamados),
+            'linhas_acompanhamentos': len(df_acompanhamentos),
+        })
+        if carga_completa_em is not None:
+            metadados['carga_completa_em'] = carga_completa_em
+        if filtros is not None:
+            metadados['filtros'] = filtros
+
+        def escrever(destino):
+            with open(destino, 'w', encoding='utf-8') as arquivo:
+                json.dump(metadados, arquivo)
+
+        _gravar_atomico(os.path.join(self.diretorio, ARQUIVO_METADADOS), escrever)
+
+    # Lê as partições que cobrem [inicio, fim); sem limites, lê todas. A
+    # partida a frio (Sincronizador.carregar_do_disco) passa o início do
+    # histórico
+    def ler_tabela(self, tabela, inicio=None, fim=None):
+        meses = self.meses(tabela)
+        if inicio is not None or fim is not None:
+            primeiro = _nome_particao(inicio.year * 100 + inicio.month) if inicio is not None else '0000-00'
+            ultimo = _nome_particao(fim.year * 100 + fim.month) if fim is not None else '9999-99'
+            meses = [m for m in meses if m != SEM_DATA and primeiro <= m <= ultimo]
+
+        if not meses:
+            return pd.DataFrame()
+
+        tabelas = [_ler_arrow(self._arquivo(tabela, mes)) for mes in meses]
+        df = pa.concat_tables(tabelas, promote_options='permissive').to_pandas(types_mapper=_TIPOS_PANDAS.get)
+
+        coluna = PARTICOES[tabela]
+        if inicio is not None:
+            df = df[df[coluna] >= inicio]
+        if fim is not None:
+            df = df[df[coluna] < fim]
+        return df.reset_index(drop=True)
+
+    def ler(self, inicio=None, fim=None):
+        return self.ler_tabela('chamados', inicio, fim), self.ler_tabela('acompanhamentos', inicio, fim)
@@ -0,0 +1,142 @@
+import argparse
+import statistics
+import time as relogio
+import tracemalloc
+
+import pandas as pd
+
+import gerador_sintetico
+import metricas
+
+# ======================================
+# BENCHMARK DAS MÉTRICAS
+# ======================================
+# Mede latência e pico de memória de cada métrica do painel sobre dados
+# sintéticos de vários tamanhos, num período de um mês e no período inteiro.
+#
+#   python benchmark.py --tamanhos 1000000 10000000 50000000 --saida atual.csv
+#   python benchmark.py --tamanhos 1000000 --base atual.csv
+#
+# O tamanho é a quantidade de linhas de hd_acompanhamento; hd_chamado fica
+# com um terço disso. Com --base, mostra a variação em relação a uma medição
+# anterior (valores positivos são regressões).
+
+OPERADORES = {codigo: f"Operador {codigo}" for codigo in gerador_sintetico.OPERADORES_PADRAO}
+EQUIPES = {1: "Service Desk", 3: "Suporte Técnico"}
+EQUIPES_POR_OPERADOR = {codigo: EQUIPES[1 if i < 4 else 3]
+                        for i, codigo in enumerate(gerador_sintetico.OPERADORES_PADRAO)}
+MAPEAMENTO_ORIGEM = {codigo: f"Origem {codigo % 8}" for codigo in gerador_sintetico.ORIGENS}
+
+
+def _metricas(estado, recorte, data_inicio, data_fim, interacoes_recorte):
+    return {
+        'grafico1_equipe_mes': lambda: metricas.chamados_por_equipe(recorte, EQUIPES),
+        'grafico2_abertos_operador': lambda: metricas.chamados_abertos_por_operador(recorte, OPERADORES),
+        'grafico3_iniciados_operador': lambda: metricas.chamados_iniciados_por_operador(recorte, OPERADORES),
+        'grafico4_origem': lambda: metricas.chamados_por_meio(recorte, MAPEAMENTO_ORIGEM),
+        'grafico5_acompanhamentos_20_22': lambda: metricas.acompanhamentos_por_operador(recorte, OPERADORES),
+        'grafico6_finalizados_responsavel': lambda: metricas.chamados_finalizados_por_operador(
+            recorte, OPERADORES, EQUIPES_POR_OPERADOR),
+        'resolucao_equipe': lambda: metricas.resolucao_por_equipe(recorte, EQUIPES),
+        'resolucao_operador': lambda: metricas.resolucao_por_operador(recorte, OPERADORES),
+        'backlog_diario': lambda: metricas.backlog_diario(estado, data_inicio, data_fim, list(EQUIPES)),
+        'envelhecimento': lambda: metricas.envelhecimento(estado, data_fim, list(EQUIPES), EQUIPES),
+        'primeira_resposta_operador': lambda: metricas.primeira_resposta_por_operador(interacoes_recorte, OPERADORES),
+        'trocas_equipe': lambda: metricas.trocas_por_equipe(interacoes_recorte, EQUIPES),
+        'trocas_operador': lambda: metricas.trocas_por_operador(interacoes_recorte, OPERADORES),
+    }
+
+
+# Latência (mediana e máxima, em ms) e pico de memória alocada (MB) de uma função.
+# A memória é medida numa execução à parte, pois o tracemalloc deixa tudo mais lento
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = relogio.perf_counter()
+        funcao()
+        tempos.append((relogio.perf_counter() - inicio) * 1000)
+
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.get_traced_memory()[0]
+        funcao()
+        pico = tracemalloc.get_traced_memory()[1] - antes
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'mediana_ms': statistics.median(tempos),
+        'max_ms': max(tempos),
+        'pico_mb': pico / 1024 / 1024,
+    }
+
+
+def executar(tamanhos, repeticoes=5, semente=0):
+    resultados = []
+
+    def registrar(tamanho, periodo, metrica, medicao):
+        resultados.append({'tamanho': tamanho, 'periodo': periodo, 'metrica': metrica, **medicao})
+        print(f"{tamanho:>12,} {periodo:<9} {metrica:<34} "
+              f"{medicao['mediana_ms']:>10.1f} ms {medicao['pico_mb']:>9.1f} MB", flush=True)
+
+    for tamanho in tamanhos:
+        df_chamados, df_acompanhamentos = gerador_sintetico.gerar(tamanho, semente=semente)
+
+        # Montagem do estado (cubos e eventos), feita a cada carga completa
+        registrar(tamanho, '-', 'montar_estado', medir(
+            lambda: metricas.FonteMemoria(df_chamados, df_acompanhamentos, list(OPERADORES)), 1))
+        estado = metricas.FonteMemoria(df_chamados, df_acompanhamentos, list(OPERADORES)).estado()
+        # Primeira resposta e trocas por chamado, calculadas uma vez por versão
+        registrar(tamanho, '-', 'interacoes_por_chamado', medir(
+            lambda: metricas.interacoes_por_chamado(estado), 1))
+        interacoes_chamados = metricas.interacoes_por_chamado(estado)
+
+        fim = estado.chamados['dtchamado'].max().date()
+        periodos = {
+            'mes': (fim.replace(day=1), fim),
+            'completo': (estado.chamados['dtchamado'].min().date(), fim),
+        }
+        for nome_periodo, (data_inicio, data_fim) in periodos.items():
+            def recortar():
+                return metricas.recortar(estado, data_inicio, data_fim, list(EQUIPES))
+
+            registrar(tamanho, nome_periodo, 'recorte', medir(recortar, repeticoes))
+            interacoes_recorte = metricas.recortar_interacoes(interacoes_chamados, data_inicio, data_fim, list(EQUIPES))
+            for nome, funcao in _metricas(estado, recortar(), data_inicio, data_fim, interacoes_recorte).items():
+                registrar(tamanho, nome_periodo, nome, medir(funcao, repeticoes))
+
+        del df_chamados, df_acompanhamentos, estado, interacoes_chamados
+
+    return pd.DataFrame(resultados)
+
+
+# Variação percentual da mediana em relação a uma medição anterior
+def comparar(resultados, base):
+    chaves = ['tamanho', 'periodo', 'metrica']
+    comparacao = resultados.merge(base[chaves + ['mediana_ms']], on=chaves, how='left',
+                                  suffixes=('', '_base'))
+    comparacao['variacao_%'] = ((comparacao['mediana_ms'] / comparacao['mediana_ms_base'] - 1) * 100).round(1)
+    return comparacao
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das métricas do painel de chamados")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1_000_000, 5_000_000],
+                        help="linhas de hd_acompanhamento em cada rodada")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', help="grava os resultados neste CSV")
+    parser.add_argument('--base', help="CSV de uma medição anterior, para comparação")
+    argumentos = parser.parse_args()
+
+    resultados = executar(argumentos.tamanhos, argumentos.repeticoes, argumentos.semente)
+    if argumentos.saida:
+        resultados.to_csv(argumentos.saida, index=False)
+    if argumentos.base:
+        comparacao = comparar(resultados, pd.read_csv(argumentos.base))
+        print()
+        print(comparacao.to_string(index=False, float_format=lambda valor: f"{valor:.1f}"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# ======================================
+# CACHE COMPARTILHADO ENTRE SESSÕES
+# ======================================
+# Memoriza o frame filtrado e os agregados de cada gráfico pela chave
+# (versão dos dados, período, equipes, ...). Todas as sessões do processo usam
+# o mesmo cache: quem abre o mesmo mês reaproveita o resultado de quem abriu
+# antes. As entradas saem por LRU (quantidade e tamanho) e as de versões
+# antigas são descartadas quando os dados são atualizados.
+#
+# Os valores devolvidos são compartilhados e não devem ser alterados.
+
+
+def tamanho_em_bytes(valor):
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=False).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=False))
+    if isinstance(valor, bytes):
+        return len(valor)
+    if isinstance(valor, (tuple, list)):
+        return sum(tamanho_em_bytes(item) for item in valor)
+    return 0
+
+
+class CacheCompartilhado:
+    def __init__(self, max_entradas=256, max_bytes=512 * 1024 * 1024):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+
+        self._trava = threading.Lock()
+        self._entradas = OrderedDict()  # chave -> (versao, valor, bytes)
+        self._calculando = {}  # chave -> threading.Event
+        self._bytes = 0
+        self._versao_atual = None
+        self._versoes_vistas = set()  # da versão atual dos dados
+        self.acertos = 0
+        self.faltas = 0
+
+    def _remover(self, chave):
+        _, _, tamanho = self._entradas.pop(chave)
+        self._bytes -= tamanho
+
+    def _guardar(self, chave, versao, valor):
+        tamanho = tamanho_em_bytes(valor)
+        if chave in self._entradas:
+            self._remover(chave)
+        self._entradas[chave] = (versao, valor, tamanho)
+        self._bytes += tamanho
+        while self._entradas and (len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes):
+            self._remover(next(iter(self._entradas)))
+
+    # Devolve o valor de (versao, chave); se ausente, calcula uma única vez,
+    # mesmo que várias sessões peçam a mesma chave ao mesmo tempo
+    def obter(self, versao, chave, calcular):
+        chave = (versao, chave)
+        while True:
+            with self._trava:
+                if chave in self._entradas:
+                    self._entradas.move_to_end(chave)
+                    self.acertos += 1
+                    return self._entradas[chave][1]
+                evento = self._calculando.get(chave)
+                if evento is None:
+                    evento = self._calculando[chave] = threading.Event()
+                    self.faltas += 1
+                    break
+            evento.wait()
+
+        try:
+            valor = calcular()
+            with self._trava:
+                self._guardar(chave, versao, valor)
+            return valor
+        finally:
+            with self._trava:
+                self._calculando.pop(chave, None)
+            evento.set()
+
+    # Descarta tudo o que não pertence à versão atual dos dados (só percorre
+    # as entradas quando a versão muda). A versão é (versão dos dados, versão
+    # das dimensões) e só avança: a dos dados é crescente; a das dimensões é um
+    # hash, então, com os mesmos dados, é nova a que ainda não foi vista.
+    # Sessões com um estado antigo não apagam as entradas da versão nova
+    def invalidar(self, versao_atual):
+        with self._trava:
+            if self._versao_atual is not None:
+                if versao_atual[0] < self._versao_atual[0]:
+                    return
+                if versao_atual[0] == self._versao_atual[0]:
+                    if versao_atual in self._versoes_vistas:
+                        return
+                else:
+                    self._versoes_vistas.clear()
+            self._versoes_vistas.add(versao_atual)
+            self._versao_atual = versao_atual
+            for chave in [c for c, (versao, _, _) in self._entradas.items() if versao != versao_atual]:
+                self._remover(chave)
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+            }
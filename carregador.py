@@ -0,0 +1,72 @@
+import argparse
+import logging
+import time as relogio
+
+import armazenamento
+import conexao
+import configuracao
+import dimensoes
+import memoria_compartilhada
+import sincronizacao
+
+# ======================================
+# PROCESSO CARREGADOR (MODO COMPARTILHADO)
+# ======================================
+# Único processo que acessa o banco: sincroniza hd_chamado e hd_acompanhamento
+# e publica cada versão do estado para as réplicas do painel, que apenas
+# mapeiam os arquivos em memória (ver memoria_compartilhada.py).
+#
+#   python carregador.py
+#   DASHCHAMADOS_MODO=compartilhado streamlit run Dashboardchamados.py --server.port 8501
+#   DASHCHAMADOS_MODO=compartilhado streamlit run Dashboardchamados.py --server.port 8511
+#   ...
+#
+# O número de réplicas passa a depender dos núcleos disponíveis, e não da
+# memória: os dados ficam uma única vez no page cache do sistema.
+
+logger = logging.getLogger('dashchamados.carregador')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carregador do estado compartilhado do painel de chamados")
+    parser.add_argument('--diretorio', default=configuracao.DIRETORIO_COMPARTILHADO,
+                        help="pasta onde as versões do estado são publicadas")
+    parser.add_argument('--intervalo', type=int, default=configuracao.INTERVALO_ATUALIZACAO,
+                        help="segundos entre sincronizações")
+    argumentos = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+
+    pool = conexao.PoolConexoes(configuracao.conectar_bd, tamanho_maximo=4)
+    carregador_dimensoes = dimensoes.CarregadorDimensoes(configuracao.ARQUIVO_DIMENSOES, pool)
+    tabelas = carregador_dimensoes.atual()
+    publicador = memoria_compartilhada.PublicadorEstado(argumentos.diretorio)
+    sincronizador = sincronizacao.Sincronizador(
+        pool,
+        codigos_equipes=list(tabelas.equipes),
+        operadores=list(tabelas.operadores),
+        intervalo=argumentos.intervalo,
+        armazenamento=armazenamento.ArmazenamentoSnapshot(configuracao.DIRETORIO_SNAPSHOT),
+        publicador=publicador,
+        meses_historico=configuracao.MESES_HISTORICO,
+        meses_reconciliacao=configuracao.MESES_RECONCILIACAO,
+    )
+
+    while True:
+        # Mudanças nas tabelas de dimensão mudam os filtros (carga completa);
+        # as réplicas recebem as mesmas tabelas junto com o estado
+        tabelas = carregador_dimensoes.atual()
+        sincronizador.definir_filtros(list(tabelas.equipes), list(tabelas.operadores))
+        publicador.definir_dimensoes(tabelas)
+        try:
+            if sincronizador.atualizar_se_necessario():
+                situacao = sincronizador.situacao
+                logger.info("versão %s publicada: %s chamados, %s acompanhamentos em %.1f s",
+                            sincronizador.versao, situacao['linhas_chamados'],
+                            situacao['linhas_acompanhamentos'], situacao['duracao'])
+        except Exception:
+            logger.exception("falha na sincronização")
+        relogio.sleep(argumentos.intervalo)
+
+
+if __name__ == '__main__':
+    main()
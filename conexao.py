@@ -0,0 +1,100 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from tenacity import Retrying, stop_after_attempt, wait_exponential
+
+# ======================================
+# POOL DE CONEXÕES
+# ======================================
+# Conexões reaproveitadas entre cargas, com limite de conexões abertas,
+# verificação de saúde antes do uso e novas tentativas (com espera
+# exponencial) ao abrir conexões. As consultas de tabelas diferentes rodam em
+# paralelo, cada uma com sua conexão (o pyodbc libera o GIL durante o fetch).
+
+
+class PoolConexoes:
+    def __init__(self, fabrica, tamanho_maximo=4, tentativas=4, espera_maxima=8,
+                 consulta_saude="SELECT 1"):
+        # fabrica: função que abre uma nova conexão DB-API (ou levanta exceção)
+        self.fabrica = fabrica
+        self.tamanho_maximo = tamanho_maximo
+        self.tentativas = tentativas
+        self.espera_maxima = espera_maxima
+        self.consulta_saude = consulta_saude
+
+        self._livres = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(tamanho_maximo)
+        self._executor = ThreadPoolExecutor(max_workers=tamanho_maximo,
+                                            thread_name_prefix='consulta')
+
+    def _abrir(self):
+        for tentativa in Retrying(stop=stop_after_attempt(self.tentativas),
+                                  wait=wait_exponential(multiplier=0.5, max=self.espera_maxima),
+                                  reraise=True):
+            with tentativa:
+                return self.fabrica()
+
+    def _saudavel(self, conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self.consulta_saude)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _fechar(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    # Conexão livre e saudável do pool, ou uma nova
+    def _obter(self):
+        while True:
+            try:
+                conn = self._livres.get_nowait()
+            except queue.Empty:
+                return self._abrir()
+            if self._saudavel(conn):
+                return conn
+            self._fechar(conn)
+
+    # Empresta uma conexão; se o uso falhar, a conexão é descartada
+    @contextmanager
+    def conexao(self):
+        self._vagas.acquire()
+        try:
+            conn = self._obter()
+            try:
+                yield conn
+            except Exception:
+                self._fechar(conn)
+                raise
+            else:
+                self._livres.put(conn)
+        finally:
+            self._vagas.release()
+
+    # Executa cada tarefa(conn) em paralelo, cada uma com uma conexão do pool,
+    # e devolve os resultados na mesma ordem
+    def executar_em_paralelo(self, tarefas):
+        def executar(tarefa):
+            with self.conexao() as conn:
+                return tarefa(conn)
+
+        futuros = [self._executor.submit(executar, tarefa) for tarefa in tarefas]
+        return [futuro.result() for futuro in futuros]
+
+    def fechar(self):
+        while True:
+            try:
+                self._fechar(self._livres.get_nowait())
+            except queue.Empty:
+                break
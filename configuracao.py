@@ -0,0 +1,68 @@
+import os
+
+# ======================================
+# CONFIGURAÇÃO COMPARTILHADA
+# ======================================
+# Conexão e pastas usadas tanto pelo painel (Dashboardchamados.py) quanto pelo
+# processo carregador do modo compartilhado (carregador.py).
+
+# Configurar a conexão com o SQL Server
+server = 'SFZ-MSQL-003'
+database = 'QualitorProd'
+conn_str = (
+    f'DRIVER=ODBC Driver 17 for SQL Server;'
+    f'SERVER={server};'
+    f'DATABASE={database};'
+    f'Trusted_Connection=yes;'
+)
+
+# Origem das tabelas do Qualitor (ver fonte_dados.py):
+#   'sqlserver' o banco de produção acima (padrão)
+#   'sqlite'    o banco sintético gerado por "python fonte_dados.py gerar"
+FONTE_DADOS = os.environ.get('DASHCHAMADOS_FONTE', 'sqlserver')
+ARQUIVO_SQLITE = os.environ.get('DASHCHAMADOS_SQLITE', os.path.join('fixtures', 'qualitor.db'))
+
+# Pasta do snapshot local (arquivos Arrow por mês), usado na partida a frio;
+# cada fonte tem o seu, para que os dados sintéticos não se misturem aos reais
+DIRETORIO_SNAPSHOT = 'snapshot' if FONTE_DADOS == 'sqlserver' else os.path.join('snapshot', FONTE_DADOS)
+INTERVALO_ATUALIZACAO = 60  # Sincronizar a cada 1 minuto (em segundos)
+# Meses completos antes do atual trazidos do banco (0: todo o histórico das
+# equipes e operadores, como o painel original). Limitar reduz a carga
+# completa e a memória, mas o filtro de datas e o backlog passam a começar
+# no início da janela
+MESES_HISTORICO = int(os.environ.get('DASHCHAMADOS_MESES_HISTORICO', '0')) or None
+# A carga completa diária relê do banco só os últimos meses (exclusões e
+# alterações que os deltas não veem); o histórico anterior vem do snapshot.
+# 0 relê todo o histórico
+MESES_RECONCILIACAO = int(os.environ.get('DASHCHAMADOS_MESES_RECONCILIACAO', '3')) or None
+PORTA_API = 8502  # API JSON de agregados (ver api.py)
+# Interface da API; sem autenticação, por padrão só aceita conexões locais
+# (exponha por um proxy que autentique, ou com '0.0.0.0' numa rede confiável)
+HOST_API = os.environ.get('DASHCHAMADOS_HOST_API', '127.0.0.1')
+# Endereço da API visto pelo navegador, de preferência no mesmo domínio do
+# painel atrás do proxy (ex.: '/dashchamados-api'). Com ele, as linhas
+# completas são baixadas pela API em partes; sem ele, pelo próprio painel,
+# limitadas a exportacao.LINHAS_POR_DOWNLOAD
+URL_API = os.environ.get('DASHCHAMADOS_URL_API')
+
+# Operadores, equipes e meios de solicitação (ver dimensoes.py)
+ARQUIVO_DIMENSOES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dimensoes.json')
+
+# Origem dos dados do painel (ver memoria_compartilhada.py):
+#   'local'         cada processo do painel sincroniza com o banco (padrão)
+#   'compartilhado' as réplicas mapeiam o estado publicado por carregador.py
+MODO_DADOS = os.environ.get('DASHCHAMADOS_MODO', 'local')
+DIRETORIO_COMPARTILHADO = os.environ.get('DASHCHAMADOS_DIRETORIO_COMPARTILHADO',
+                                         os.path.join(DIRETORIO_SNAPSHOT, 'compartilhado'))
+
+
+# Função para conectar ao banco de dados (usada pelo pool de conexões). O
+# banco sintético (e o gerador) só é importado quando escolhido
+def conectar_bd():
+    if FONTE_DADOS == 'sqlserver':
+        import pyodbc
+        return pyodbc.connect(conn_str)
+    if FONTE_DADOS == 'sqlite':
+        import fonte_dados
+        return fonte_dados.conectar_sqlite(ARQUIVO_SQLITE)
+    raise ValueError(f"fonte de dados desconhecida: {FONTE_DADOS} (use 'sqlserver' ou 'sqlite')")
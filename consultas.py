@@ -0,0 +1,216 @@
+import time as relogio
+from datetime import datetime, time, timedelta
+
+import pandas as pd
+
+import instrumentacao
+
+# ======================================
+# CONSULTAS PARAMETRIZADAS AO QUALITOR
+# ======================================
+# Os filtros de equipes e operadores (e o início do histórico, quando
+# limitado) são aplicados diretamente no SQL; o período de cada visualização é
+# recortado do snapshot local (ver sincronizacao.py e periodo.py).
+
+COLUNAS_CHAMADOS = [
+    'cdchamado', 'dtchamado', 'dttermino', 'cdequipe',
+    'cdusuario', 'cdorigem', 'cdsituacao', 'cdresponsavel'
+]
+
+# Texto que marca o início do atendimento de um chamado
+TEXTO_EM_ATENDIMENTO = 'Chamado em atendimento'
+
+# A descrição (texto livre) não é trazida do banco: o SQL Server classifica cada
+# acompanhamento e devolve apenas o indicador "em_atendimento"
+COLUNAS_ACOMPANHAMENTOS = [
+    f"CASE WHEN dsacompanhamento LIKE '%{TEXTO_EM_ATENDIMENTO}%' THEN 1 ELSE 0 END AS em_atendimento",
+    'cdchamado', 'dtacompanhamento', 'cdusuario', 'cdtipoacompanhamento'
+]
+
+# Tipos finais de cada coluna: 'data' -> datetime64, 'texto' -> string Arrow,
+# 'logico' -> bool, demais -> inteiros anuláveis do menor tamanho que comporta os códigos
+TIPOS_CHAMADOS = {
+    'cdchamado': 'Int64',
+    'dtchamado': 'data',
+    'dttermino': 'data',
+    'cdequipe': 'Int16',
+    'cdusuario': 'Int32',
+    'cdorigem': 'Int16',
+    'cdsituacao': 'Int16',
+    'cdresponsavel': 'Int32',
+}
+
+TIPOS_ACOMPANHAMENTOS = {
+    'em_atendimento': 'logico',
+    'cdchamado': 'Int64',
+    'dtacompanhamento': 'data',
+    'cdusuario': 'Int32',
+    'cdtipoacompanhamento': 'Int16',
+}
+
+# Linhas buscadas por ida ao banco: os objetos Python (tuplas) ficam limitados
+# ao lote, e não à tabela
+TAMANHO_LOTE = 50_000
+
+
+def _converter_coluna(valores, tipo):
+    serie = pd.Series(valores, dtype=object)
+    if tipo == 'data':
+        return pd.to_datetime(serie, errors='coerce')
+    if tipo == 'texto':
+        return serie.astype('string[pyarrow]')
+    if tipo == 'logico':
+        return pd.to_numeric(serie, errors='coerce').fillna(0).astype(bool)
+    return pd.to_numeric(serie, errors='coerce').astype(tipo)
+
+
+# Converte um lote de linhas (tuplas) direto para os tipos finais, coluna a coluna
+def converter_lote(linhas, colunas, tipos):
+    valores_por_coluna = list(zip(*linhas)) if linhas else [()] * len(colunas)
+    return pd.DataFrame({
+        coluna: _converter_coluna(valores, tipos.get(coluna, 'texto'))
+        for coluna, valores in zip(colunas, valores_por_coluna)
+    })
+
+
+# Variação da memória residente (MB) em relação a "antes"; None fora do Linux
+def _variacao_memoria(antes):
+    depois = instrumentacao.memoria_mb()
+    return depois - antes if antes is not None and depois is not None else None
+
+
+# Leitura em streaming: busca TAMANHO_LOTE linhas por vez (cursor.fetchmany) e
+# converte cada lote assim que chega, sem manter o resultado inteiro como
+# objetos Python. Os lotes convertidos são guardados por coluna e juntados
+# uma coluna por vez, liberando os pedaços de cada coluna assim que ela fica
+# pronta: o pico fica perto do frame final mais uma coluna (um pd.concat de
+# todos os lotes manteria lotes e resultado ao mesmo tempo, o dobro).
+#
+# Se "estatisticas" for um dict, recebe linhas, tempo (total, no banco/ODBC e
+# na conversão de tipos), linhas por segundo e a variação da memória
+# residente (RSS) durante a busca: no fim ('memoria_mb') e a maior, medida a
+# cada lote ('pico_memoria_mb'). A medida é do processo: as duas tabelas são
+# buscadas em paralelo, então cada uma inclui a memória da outra no período.
+def ler_em_lotes(conn, query, parametros, tipos, tamanho_lote=TAMANHO_LOTE, estatisticas=None):
+    inicio = relogio.perf_counter()
+    memoria_antes = instrumentacao.memoria_mb()
+    pico_memoria = None
+    segundos_conversao = 0.0
+    cursor = conn.cursor()
+    try:
+        cursor.arraysize = tamanho_lote
+        cursor.execute(query, parametros)
+        colunas = [descricao[0] for descricao in cursor.description]
+
+        pedacos = {coluna: [] for coluna in colunas}
+        while True:
+            linhas = cursor.fetchmany(tamanho_lote)
+            if not linhas:
+                break
+            inicio_conversao = relogio.perf_counter()
+            lote = converter_lote(linhas, colunas, tipos)
+            del linhas
+            for coluna in colunas:
+                pedacos[coluna].append(lote[coluna])
+            del lote
+            segundos_conversao += relogio.perf_counter() - inicio_conversao
+            variacao = _variacao_memoria(memoria_antes)
+            if variacao is not None:
+                pico_memoria = variacao if pico_memoria is None else max(pico_memoria, variacao)
+    finally:
+        cursor.close()
+
+    if colunas and pedacos[colunas[0]]:
+        df = pd.DataFrame({coluna: pd.concat(pedacos.pop(coluna), ignore_index=True) for coluna in colunas},
+                          copy=False)
+    else:
+        df = converter_lote([], colunas, tipos)
+
+    if estatisticas is not None:
+        segundos = relogio.perf_counter() - inicio
+        memoria = _variacao_memoria(memoria_antes)
+        estatisticas.update({
+            'linhas': len(df),
+            'segundos': segundos,
+            'segundos_busca': segundos - segundos_conversao,
+            'segundos_conversao': segundos_conversao,
+            'linhas_por_segundo': len(df) / segundos if segundos > 0 else None,
+            'memoria_mb': memoria,
+            'pico_memoria_mb': max(pico_memoria, memoria) if pico_memoria is not None else memoria,
+        })
+    return df
+
+
+# Converte o período selecionado em um intervalo semiaberto [inicio, fim + 1 dia)
+def limites_periodo(data_inicio, data_fim):
+    inicio = datetime.combine(data_inicio, time.min)
+    fim = datetime.combine(data_fim, time.min) + timedelta(days=1)
+    return inicio, fim
+
+
+# Monta "coluna IN (?, ?, ...)" com os parâmetros correspondentes
+def _filtro_in(coluna, codigos):
+    codigos = [int(c) for c in codigos]
+    if not codigos:
+        return "1 = 0", []
+    marcadores = ", ".join("?" for _ in codigos)
+    return f"{coluna} IN ({marcadores})", codigos
+
+
+def _montar_consulta(tabela, colunas, condicoes, parametros):
+    query = f"""
+        SELECT {', '.join(colunas)}
+        FROM [dbo].[{tabela}]
+        WHERE {' AND '.join(condicoes) if condicoes else '1 = 1'}
+        """
+    return query, parametros
+
+
+def _filtros_chamados(codigos_equipes, condicoes, parametros):
+    if codigos_equipes is not None:
+        condicao, valores = _filtro_in("cdequipe", codigos_equipes)
+        condicoes.append(condicao)
+        parametros += valores
+    return condicoes, parametros
+
+
+def _filtros_acompanhamentos(operadores, condicoes, parametros):
+    if operadores is not None:
+        condicao, valores = _filtro_in("cdusuario", operadores)
+        condicoes.append(condicao)
+        parametros += valores
+    return condicoes, parametros
+
+
+# Chamados novos (cdchamado acima da marca), encerrados desde a última
+# sincronização ou ainda abertos (podem ter mudado de situação). Com
+# "inicio", só os abertos a partir dele (histórico limitado)
+def montar_consulta_chamados_delta(ultimo_cdchamado, ultimo_termino, menor_aberto,
+                                   codigos_equipes=None, inicio=None):
+    condicoes = ["(cdchamado > ? OR dttermino >= ? OR (dttermino IS NULL AND cdchamado >= ?))"]
+    parametros = [int(ultimo_cdchamado), ultimo_termino, int(menor_aberto)]
+    if inicio is not None:
+        condicoes.append("dtchamado >= ?")
+        parametros.append(inicio)
+    condicoes, parametros = _filtros_chamados(codigos_equipes, condicoes, parametros)
+    return _montar_consulta("hd_chamado", COLUNAS_CHAMADOS, condicoes, parametros)
+
+
+# Acompanhamentos a partir da última data vista (inclusive, para não perder
+# registros gravados no mesmo instante da marca), e não antes de "inicio"
+def montar_consulta_acompanhamentos_delta(ultima_data, operadores=None, inicio=None):
+    if inicio is not None:
+        ultima_data = max(ultima_data, inicio)
+    condicoes, parametros = _filtros_acompanhamentos(
+        operadores, ["dtacompanhamento >= ?"], [ultima_data])
+    return _montar_consulta("hd_acompanhamento", COLUNAS_ACOMPANHAMENTOS, condicoes, parametros)
+
+
+# Executa uma consulta de hd_chamado, lendo em lotes já com os tipos finais
+def executar_consulta_chamados(conn, query, parametros, estatisticas=None):
+    return ler_em_lotes(conn, query, parametros, TIPOS_CHAMADOS, estatisticas=estatisticas)
+
+
+# Executa uma consulta de hd_acompanhamento, lendo em lotes já com os tipos finais
+def executar_consulta_acompanhamentos(conn, query, parametros, estatisticas=None):
+    return ler_em_lotes(conn, query, parametros, TIPOS_ACOMPANHAMENTOS, estatisticas=estatisticas)
@@ -0,0 +1,123 @@
+import pandas as pd
+
+import dimensoes
+import periodo
+
+# ======================================
+# CUBO DE CONTAGENS DIÁRIAS
+# ======================================
+# Contagens pré-agregadas por dia e pelas dimensões usadas nos gráficos. O cubo
+# é montado uma vez por carga e atualizado com os deltas; cada gráfico é
+# respondido recortando e somando algumas milhares de linhas do cubo. As
+# dimensões (inclusive o mês) são códigos inteiros; ver dimensoes.py.
+
+DIMENSOES_CHAMADOS = ['dia', 'mes', 'cdequipe', 'cdusuario', 'cdorigem', 'cdsituacao', 'cdresponsavel']
+DIMENSOES_ACOMPANHAMENTOS = ['dia', 'mes', 'cdusuario', 'cdtipoacompanhamento']
+
+# Código usado para usuários/responsáveis fora da lista de operadores
+OUTROS = -1
+
+
+def cubo_vazio(colunas):
+    return pd.DataFrame({
+        coluna: pd.Series(dtype='datetime64[ns]' if coluna == 'dia' else dimensoes.TIPOS_CODIGOS[coluna])
+        for coluna in colunas
+    }).assign(total=pd.Series(dtype='int64'))
+
+
+# Usuários que não são operadores viram OUTROS, para manter o cubo pequeno
+def _agrupar_usuarios(codigos, operadores, coluna):
+    if operadores is not None:
+        codigos = codigos.where(codigos.isin(list(operadores)), OUTROS)
+    return dimensoes.codificar(codigos, coluna)
+
+
+def _contar(df, colunas):
+    return df.groupby(colunas, dropna=False, observed=True).size().reset_index(name='total')
+
+
+def _dia_e_mes(datas):
+    return {'dia': datas.dt.normalize(), 'mes': dimensoes.codigo_mes(datas)}
+
+
+def agregar_chamados(df_chamados, operadores=None):
+    if df_chamados.empty:
+        return cubo_vazio(DIMENSOES_CHAMADOS)
+    base = pd.DataFrame({
+        **_dia_e_mes(df_chamados['dtchamado']),
+        'cdequipe': dimensoes.codificar(df_chamados['cdequipe'], 'cdequipe'),
+        'cdusuario': _agrupar_usuarios(df_chamados['cdusuario'], operadores, 'cdusuario'),
+        'cdorigem': dimensoes.codificar(df_chamados['cdorigem'], 'cdorigem'),
+        'cdsituacao': dimensoes.codificar(df_chamados['cdsituacao'], 'cdsituacao'),
+        'cdresponsavel': _agrupar_usuarios(df_chamados['cdresponsavel'], operadores, 'cdresponsavel'),
+    })
+    return _contar(base, DIMENSOES_CHAMADOS)
+
+
+def agregar_acompanhamentos(df_acompanhamentos, operadores=None):
+    if df_acompanhamentos.empty:
+        return cubo_vazio(DIMENSOES_ACOMPANHAMENTOS)
+    base = pd.DataFrame({
+        **_dia_e_mes(df_acompanhamentos['dtacompanhamento']),
+        'cdusuario': _agrupar_usuarios(df_acompanhamentos['cdusuario'], operadores, 'cdusuario'),
+        'cdtipoacompanhamento': dimensoes.codificar(
+            df_acompanhamentos['cdtipoacompanhamento'], 'cdtipoacompanhamento'),
+    })
+    return _contar(base, DIMENSOES_ACOMPANHAMENTOS)
+
+
+# Soma as contagens adicionadas e subtrai as removidas, descartando células zeradas
+def atualizar_cubo(cubo, adicionados, removidos, colunas):
+    partes = [parte for parte in (cubo, adicionados) if not parte.empty]
+    if not removidos.empty:
+        partes.append(removidos.assign(total=-removidos['total']))
+    if not partes:
+        return cubo
+    cubo = pd.concat(partes, ignore_index=True)
+    cubo = cubo.groupby(colunas, dropna=False, observed=True)['total'].sum().reset_index()
+    return cubo[cubo['total'] != 0].reset_index(drop=True)
+
+
+# Recorta o cubo (ordenado por dia) no intervalo [inicio, fim) e, opcionalmente, nas equipes
+def recortar(cubo, inicio, fim, codigos_equipes=None):
+    cubo = periodo.recortar_periodo(cubo, 'dia', inicio, fim)
+    if codigos_equipes is not None and 'cdequipe' in cubo.columns:
+        cubo = cubo[cubo['cdequipe'].isin(list(codigos_equipes))]
+    return cubo
+
+
+# Agrupa pelo código do mês e só então converte os meses do resultado em "AAAA-MM"
+def _somar_por_mes(cubo, coluna):
+    resultado = cubo.groupby(['mes', coluna])['total'].sum().reset_index()
+    resultado['mes'] = dimensoes.rotulos_mes(resultado['mes'])
+    return resultado
+
+
+# Gráfico 1: chamados por mês e equipe
+def chamados_por_equipe_mes(cubo_chamados):
+    return _somar_por_mes(cubo_chamados, 'cdequipe')
+
+
+# Gráfico 2: chamados abertos por mês e operador
+def chamados_por_operador_mes(cubo_chamados):
+    return _somar_por_mes(cubo_chamados[cubo_chamados['cdusuario'] != OUTROS], 'cdusuario')
+
+
+# Gráfico 4: chamados por código de origem
+def chamados_por_origem(cubo_chamados):
+    return cubo_chamados.groupby('cdorigem', observed=True)['total'].sum().reset_index()
+
+
+# Gráfico 5: acompanhamentos dos tipos informados por operador
+def acompanhamentos_por_operador(cubo_acompanhamentos, tipos):
+    selecionados = cubo_acompanhamentos[
+        cubo_acompanhamentos['cdtipoacompanhamento'].isin(list(tipos)) &
+        (cubo_acompanhamentos['cdusuario'] != OUTROS)
+    ]
+    return selecionados.groupby('cdusuario', observed=True)['total'].sum().reset_index()
+
+
+# Gráfico 6: chamados na situação informada por responsável
+def chamados_por_responsavel(cubo_chamados, situacao):
+    selecionados = cubo_chamados[cubo_chamados['cdsituacao'] == situacao]
+    return selecionados.groupby('cdresponsavel', observed=True)['total'].sum().reset_index()
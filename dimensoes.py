@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import threading
+import time as relogio
+from collections import namedtuple
+
+import numpy as np
+
+# ======================================
+# CODIFICAÇÃO DAS DIMENSÕES
+# ======================================
+# Operadores, equipes, origens, situações e meses entram no cubo como inteiros
+# pequenos (numpy, sem máscara de nulos), codificados uma vez na carga. As
+# agregações agrupam por esses códigos e os rótulos (nomes, "AAAA-MM") só são
+# aplicados às poucas linhas do resultado.
+
+# Código usado no lugar de valores nulos
+NULO = -2
+
+# Tipo de cada dimensão codificada no cubo
+TIPOS_CODIGOS = {
+    'mes': np.int32,
+    'cdequipe': np.int16,
+    'cdusuario': np.int32,
+    'cdorigem': np.int16,
+    'cdsituacao': np.int16,
+    'cdresponsavel': np.int32,
+    'cdtipoacompanhamento': np.int16,
+}
+
+
+def codificar(serie, coluna):
+    return serie.fillna(NULO).to_numpy(dtype=TIPOS_CODIGOS[coluna])
+
+
+# Mês como inteiro AAAAMM (ex.: 202501)
+def codigo_mes(datas):
+    return (datas.dt.year * 100 + datas.dt.month).fillna(NULO).to_numpy(dtype=TIPOS_CODIGOS['mes'])
+
+
+def rotulos_mes(codigos):
+    return [f"{codigo // 100:04d}-{codigo % 100:02d}" for codigo in codigos]
+
+
+# ======================================
+# TABELAS DE DIMENSÃO
+# ======================================
+# Operadores, equipes e meios de solicitação vêm de um arquivo JSON
+# (dimensoes.json) e, opcionalmente, das tabelas de cadastro do Qualitor. Para
+# ler do banco, o arquivo traz as consultas em "consultas", por exemplo:
+#
+#   "consultas": {
+#     "equipes": "SELECT cdequipe, nmequipe FROM dbo.hd_equipe WHERE cdequipe IN (1, 3)",
+#     "operadores": "SELECT eu.cdusuario, u.nmusuario, eu.cdequipe FROM dbo.hd_equipeusuario eu
+#                    JOIN dbo.ad_usuario u ON u.cdusuario = eu.cdusuario WHERE eu.cdequipe IN (1, 3)"
+#   }
+#
+# O que vier do banco substitui o arquivo; os meios de solicitação (agrupamento
+# das origens) são sempre do arquivo. Cada conjunto carregado tem uma versão
+# (hash do conteúdo), usada nas chaves de cache.
+
+TabelasDimensao = namedtuple('TabelasDimensao', [
+    'equipes', 'operadores', 'equipes_por_operador', 'meios_origem', 'versao'
+])
+
+
+# equipes: {cdequipe: nome}; operadores: {cdusuario: (nome, cdequipe)};
+# meios: {meio: [cdorigem, ...]}
+def montar_tabelas(equipes, operadores, meios):
+    conteudo = json.dumps([sorted(equipes.items()), sorted(operadores.items()), sorted(meios.items())],
+                          ensure_ascii=False)
+    return TabelasDimensao(
+        equipes=dict(equipes),
+        operadores={codigo: nome for codigo, (nome, _) in operadores.items()},
+        equipes_por_operador={codigo: equipes.get(equipe) for codigo, (_, equipe) in operadores.items()},
+        meios_origem={origem: meio for meio, origens in meios.items() for origem in origens},
+        versao=hashlib.sha1(conteudo.encode('utf-8')).hexdigest()[:12],
+    )
+
+
+# Tabelas num documento JSON (chaves como texto) e de volta, para o carregador
+# publicá-las às réplicas do painel (ver memoria_compartilhada.py)
+def tabelas_para_documento(tabelas):
+    return {campo: {str(codigo): valor for codigo, valor in conteudo.items()} if isinstance(conteudo, dict)
+            else conteudo for campo, conteudo in tabelas._asdict().items()}
+
+
+def tabelas_do_documento(documento):
+    return TabelasDimensao(**{campo: {int(codigo): valor for codigo, valor in conteudo.items()}
+                              if isinstance(conteudo, dict) else conteudo
+                              for campo, conteudo in documento.items()})
+
+
+def ler_configuracao(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def _consultar(conn, query):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def tabelas_da_configuracao(configuracao, conn=None):
+    equipes = {int(codigo): nome for codigo, nome in configuracao.get('equipes', {}).items()}
+    operadores = {int(codigo): (dados['nome'], dados.get('equipe'))
+                  for codigo, dados in configuracao.get('operadores', {}).items()}
+
+    consultas = configuracao.get('consultas') or {}
+    if conn is not None and consultas.get('equipes'):
+        equipes = {int(codigo): nome for codigo, nome in _consultar(conn, consultas['equipes'])}
+    if conn is not None and consultas.get('operadores'):
+        operadores = {int(codigo): (nome, int(equipe) if equipe is not None else None)
+                      for codigo, nome, equipe in _consultar(conn, consultas['operadores'])}
+
+    return montar_tabelas(equipes, operadores, configuracao.get('meios_origem', {}))
+
+
+# Mantém as tabelas em memória e as recarrega quando o arquivo muda ou, se
+# houver consultas ao banco, a cada "intervalo" segundos. Se a recarga falhar,
+# continua com as últimas tabelas carregadas.
+class CarregadorDimensoes:
+    def __init__(self, caminho, pool=None, intervalo=3600):
+        # pool: PoolConexoes opcional, usado se o arquivo trouxer "consultas"
+        self.caminho = caminho
+        self.pool = pool
+        self.intervalo = intervalo
+
+        self._trava = threading.Lock()
+        self._tabelas = None
+        self._modificado_em = None
+        self._carregado_em = None
+        self.erro = None
+
+    def _carregar(self):
+        configuracao = ler_configuracao(self.caminho)
+        if self.pool is not None and configuracao.get('consultas'):
+            with self.pool.conexao() as conn:
+                return tabelas_da_configuracao(configuracao, conn)
+        return tabelas_da_configuracao(configuracao)
+
+    def _vencido(self):
+        if self._tabelas is None or os.path.getmtime(self.caminho) != self._modificado_em:
+            return True
+        return self.pool is not None and relogio.time() - self._carregado_em >= self.intervalo
+
+    def atual(self):
+        with self._trava:
+            if self._vencido():
+                modificado_em = os.path.getmtime(self.caminho)
+                try:
+                    self._tabelas = self._carregar()
+                    self.erro = None
+                except Exception as e:
+                    if self._tabelas is None:
+                        raise
+                    self.erro = str(e)
+                self._modificado_em = modificado_em
+                self._carregado_em = relogio.time()
+            return self._tabelas
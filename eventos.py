@@ -0,0 +1,43 @@
+import pandas as pd
+
+import periodo
+
+# ======================================
+# EVENTOS "CHAMADO EM ATENDIMENTO"
+# ======================================
+# Tabela derivada com um registro por acompanhamento que marcou o início do
+# atendimento. A classificação é feita uma vez, na ingestão (no próprio SQL),
+# e a tabela é atualizada junto com os deltas de acompanhamentos.
+
+COLUNAS_EVENTOS = ['cdchamado', 'cdusuario', 'dtacompanhamento']
+
+
+def eventos_vazios():
+    return pd.DataFrame({coluna: pd.Series(dtype='object') for coluna in COLUNAS_EVENTOS})
+
+
+def extrair_eventos_atendimento(df_acompanhamentos):
+    if df_acompanhamentos.empty:
+        return eventos_vazios()
+    eventos = df_acompanhamentos.loc[df_acompanhamentos['em_atendimento'], COLUNAS_EVENTOS]
+    return periodo.ordenar_por_data(eventos.reset_index(drop=True), 'dtacompanhamento')
+
+
+# Mantém os eventos anteriores à marca e acrescenta os do delta (que relê a data da marca)
+def atualizar_eventos(eventos, delta_acompanhamentos, ultima_data):
+    novos = extrair_eventos_atendimento(delta_acompanhamentos)
+    if eventos.empty:
+        return novos
+    mantidos = eventos[~(eventos['dtacompanhamento'] >= ultima_data)]
+    return periodo.ordenar_por_data(pd.concat([mantidos, novos], ignore_index=True), 'dtacompanhamento')
+
+
+# Gráfico 3: chamados distintos iniciados por operador
+def chamados_iniciados_por_operador(eventos):
+    return (
+        eventos
+        .groupby('cdusuario')['cdchamado']
+        .nunique()
+        .reset_index(name='total_chamados')
+        .sort_values('total_chamados', ascending=False)
+    )
@@ -0,0 +1,172 @@
+import secrets
+import tempfile
+import threading
+import time as relogio
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+# ======================================
+# EXPORTAÇÃO (CSV, XLSX E PARQUET)
+# ======================================
+# Converte um frame em partes de bytes, lote a lote: os lotes são fatias
+# (iloc) dos frames do snapshot, sem cópia, e só o lote da vez passa pelas
+# estruturas intermediárias do pandas/pyarrow/openpyxl.
+#
+# As linhas completas do painel saem de dois jeitos (ver Dashboardchamados.py):
+# - com configuracao.URL_API (a API atrás de um proxy), por um link de uso
+#   temporário (token emitido pelo painel) que a API envia em partes, sem
+#   montar o arquivo em memória;
+# - sem ele, pelo st.download_button, que precisa do arquivo inteiro em
+#   memória: as partes vão para um arquivo temporário e são lidas de uma vez
+#   (uma cópia só), e o download é limitado a LINHAS_POR_DOWNLOAD linhas.
+#
+# - CSV: separador ";" e vírgula decimal, com BOM, para abrir direto no Excel;
+# - Parquet: um row group por lote, enviado assim que é gravado;
+# - XLSX: o formato é um zip, que só fica completo no fim; as linhas vão para
+#   um arquivo temporário (openpyxl em modo write_only) e o arquivo é enviado
+#   em partes. Limitado a uma planilha (1.048.575 linhas de dados): a geração
+#   é lenta (célula a célula, em Python) e, acima disso, CSV ou Parquet
+#   servem melhor.
+
+TAMANHO_LOTE = 100_000
+TAMANHO_PARTE = 1024 * 1024
+LINHAS_POR_PLANILHA = 1_048_575
+# Limite do download montado em memória pelo painel (sem a API)
+LINHAS_POR_DOWNLOAD = 250_000
+# Validade dos links de exportação pela API, em segundos
+VALIDADE_LINK = 300
+
+FORMATOS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+class ExportacaoInvalida(ValueError):
+    pass
+
+
+def lotes(df, tamanho_lote=TAMANHO_LOTE):
+    for inicio in range(0, len(df), tamanho_lote):
+        yield df.iloc[inicio:inicio + tamanho_lote]
+
+
+def csv_em_partes(df, tamanho_lote=TAMANHO_LOTE):
+    yield '\ufeff'.encode('utf-8') + df.iloc[0:0].to_csv(index=False, sep=';').encode('utf-8')
+    for lote in lotes(df, tamanho_lote):
+        yield lote.to_csv(index=False, header=False, sep=';', decimal=',',
+                          date_format='%Y-%m-%d %H:%M:%S').encode('utf-8')
+
+
+# Destino do ParquetWriter que guarda o que foi gravado até ser drenado
+class _Partes:
+    def __init__(self):
+        self.closed = False
+        self._partes = []
+        self._posicao = 0
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drenar(self):
+        partes, self._partes = self._partes, []
+        return b''.join(partes)
+
+
+def parquet_em_partes(df, tamanho_lote=TAMANHO_LOTE):
+    destino = _Partes()
+    schema = pa.Schema.from_pandas(df.iloc[0:0], preserve_index=False)
+    with pq.ParquetWriter(pa.PythonFile(destino, mode='w'), schema) as escritor:
+        for lote in lotes(df, tamanho_lote):
+            escritor.write_table(pa.Table.from_pandas(lote, schema=schema, preserve_index=False))
+            yield destino.drenar()
+    yield destino.drenar()
+
+
+def xlsx_em_partes(df, tamanho_lote=TAMANHO_LOTE, nome_planilha='dados'):
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet(nome_planilha)
+    planilha.append(list(df.columns))
+    for lote in lotes(df, tamanho_lote):
+        # Nulos (NA, NaT) viram células vazias
+        lote = lote.astype(object).where(lote.notna(), None)
+        for linha in lote.itertuples(index=False, name=None):
+            planilha.append(linha)
+
+    with tempfile.TemporaryFile() as arquivo:
+        livro.save(arquivo)
+        arquivo.seek(0)
+        while parte := arquivo.read(TAMANHO_PARTE):
+            yield parte
+
+
+def exportar(df, formato, tamanho_lote=TAMANHO_LOTE):
+    if formato == 'csv':
+        return csv_em_partes(df, tamanho_lote)
+    if formato == 'parquet':
+        return parquet_em_partes(df, tamanho_lote)
+    if formato == 'xlsx':
+        if len(df) > LINHAS_POR_PLANILHA:
+            raise ExportacaoInvalida(f"{len(df):,} linhas excedem o limite do Excel "
+                                     f"({LINHAS_POR_PLANILHA:,}); use CSV ou Parquet")
+        return xlsx_em_partes(df, tamanho_lote)
+    raise ExportacaoInvalida(f"formato de exportação desconhecido: {formato}")
+
+
+# Arquivo inteiro em memória, para tabelas pequenas (agregados dos gráficos)
+def em_bytes(df, formato):
+    if isinstance(df, pd.Series):
+        df = df.reset_index()
+    return b''.join(exportar(df, formato))
+
+
+# Junta as partes passando por um arquivo temporário: b''.join guardaria todas
+# as partes e o resultado ao mesmo tempo (o dobro do arquivo)
+def juntar_partes(partes):
+    with tempfile.TemporaryFile() as arquivo:
+        for parte in partes:
+            arquivo.write(parte)
+        arquivo.seek(0)
+        return arquivo.read()
+
+
+def nome_arquivo(nome, data_inicio, data_fim, formato):
+    return f"{nome}_{data_inicio:%Y%m%d}_{data_fim:%Y%m%d}.{formato}"
+
+
+# Pedidos de exportação autorizados pelo painel, por token aleatório: a API
+# só envia linhas a quem recebeu um link do painel, e só até ele vencer
+class PedidosExportacao:
+    def __init__(self, validade=VALIDADE_LINK):
+        self.validade = validade
+        self._trava = threading.Lock()
+        self._pedidos = {}  # token -> (vence_em, pedido)
+
+    def emitir(self, pedido):
+        token = secrets.token_urlsafe(32)
+        agora = relogio.monotonic()
+        with self._trava:
+            self._pedidos = {chave: valor for chave, valor in self._pedidos.items() if valor[0] > agora}
+            self._pedidos[token] = (agora + self.validade, pedido)
+        return token
+
+    # O pedido do token, ou None se desconhecido ou vencido
+    def resgatar(self, token):
+        with self._trava:
+            vence_em, pedido = self._pedidos.get(token, (0, None))
+        return pedido if vence_em > relogio.monotonic() else None
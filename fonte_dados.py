@@ -0,0 +1,265 @@
+import argparse
+import os
+import sqlite3
+import time as relogio
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+import consultas
+import gerador_sintetico
+
+# ======================================
+# FONTES DE DADOS (SQL SERVER OU SQLITE)
+# ======================================
+# O painel e o carregador só conversam com o banco pelas consultas de
+# consultas.py (SQL genérico com "[dbo].[tabela]" e parâmetros "?"). A fonte
+# escolhida em configuracao.FONTE_DADOS decide quem as responde:
+#
+# - 'sqlserver': o Qualitor (SFZ-MSQL-003), pelo pyodbc (padrão);
+# - 'sqlite':    um arquivo SQLite com hd_chamado e hd_acompanhamento no mesmo
+#   esquema, anexado como "dbo": as consultas rodam sem alteração. Serve para
+#   rodar, perfilar e testar a carga do painel fora da rede corporativa.
+#
+# O banco SQLite é gerado com os dados sintéticos de gerador_sintetico.py, em
+# qualquer volume; os frames também ficam em Parquet (as fixtures), para
+# recriar o banco ou usar nas medições sem gerar de novo:
+#
+#   python fonte_dados.py gerar --linhas 5000000 --destino fixtures
+#   python fonte_dados.py reproduzir --destino fixtures --passo-minutos 60 --intervalo 5
+#
+# Com --reservar-dias, os últimos dias gerados ficam fora das tabelas do
+# painel (em sintetico_*); "reproduzir" os libera aos poucos, abrindo e
+# encerrando chamados e gravando acompanhamentos, como o banco em produção:
+# a sincronização incremental trabalha durante o teste de carga.
+
+ARQUIVO_BANCO = 'qualitor.db'
+ARQUIVO_CHAMADOS = 'hd_chamado.parquet'
+ARQUIVO_ACOMPANHAMENTOS = 'hd_acompanhamento.parquet'
+
+# Texto dos acompanhamentos que não são o início do atendimento
+TEXTO_ACOMPANHAMENTO = 'Acompanhamento registrado'
+# Situação dos chamados ainda não encerrados no banco reproduzido
+SITUACAO_ABERTO = 1
+
+ESQUEMA = """
+    CREATE TABLE {prefixo}chamado (
+        cdchamado INTEGER PRIMARY KEY,
+        dtchamado TIMESTAMP NOT NULL,
+        dttermino TIMESTAMP,
+        cdequipe INTEGER,
+        cdusuario INTEGER,
+        cdorigem INTEGER,
+        cdsituacao INTEGER,
+        cdresponsavel INTEGER
+    );
+    CREATE TABLE {prefixo}acompanhamento (
+        dsacompanhamento TEXT,
+        cdchamado INTEGER,
+        dtacompanhamento TIMESTAMP,
+        cdusuario INTEGER,
+        cdtipoacompanhamento INTEGER
+    );
+"""
+
+# Os mesmos filtros das consultas do painel e da sincronização
+INDICES = """
+    CREATE INDEX ix_chamado_dtchamado ON hd_chamado (dtchamado);
+    CREATE INDEX ix_chamado_dttermino ON hd_chamado (dttermino);
+    CREATE INDEX ix_acompanhamento_dtacompanhamento ON hd_acompanhamento (dtacompanhamento);
+    CREATE INDEX ix_sintetico_chamado_dtchamado ON sintetico_chamado (dtchamado);
+    CREATE INDEX ix_sintetico_chamado_dttermino ON sintetico_chamado (dttermino);
+    CREATE INDEX ix_sintetico_acompanhamento_dtacompanhamento ON sintetico_acompanhamento (dtacompanhamento);
+"""
+
+# Corte da reprodução: tudo até ele já está nas tabelas do painel
+TABELA_CORTE = "CREATE TABLE sintetico_corte (corte TIMESTAMP NOT NULL)"
+
+LINHAS_POR_INSERCAO = 100_000
+
+
+# Datas gravadas como texto ISO ("AAAA-MM-DD HH:MM:SS"), que o SQLite compara
+# na ordem cronológica, e lidas de volta como datetime (colunas TIMESTAMP)
+def _registrar_datas():
+    sqlite3.register_adapter(datetime, lambda valor: valor.isoformat(' '))
+    sqlite3.register_adapter(pd.Timestamp, lambda valor: valor.isoformat(' '))
+    sqlite3.register_converter('TIMESTAMP', lambda valor: datetime.fromisoformat(valor.decode()))
+
+
+
+# Conexão ao arquivo SQLite anexado como "dbo" (as consultas usam
+# [dbo].[tabela]); usada por threads do pool diferentes da que a abriu
+def conectar_sqlite(caminho):
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f"banco SQLite não encontrado: {caminho} (gere com: python fonte_dados.py gerar)")
+    _registrar_datas()
+    conn = sqlite3.connect(':memory:', detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    conn.execute("ATTACH DATABASE ? AS dbo", (caminho,))
+    return conn
+
+
+# ======================================
+# GERAÇÃO DO BANCO SQLITE
+# ======================================
+
+# Colunas de hd_acompanhamento a partir do frame sintético (com o texto livre
+# que a consulta do painel classifica)
+def _acompanhamentos_banco(df_acompanhamentos):
+    texto = df_acompanhamentos['em_atendimento'].map({True: consultas.TEXTO_EM_ATENDIMENTO,
+                                                      False: TEXTO_ACOMPANHAMENTO})
+    return df_acompanhamentos.drop(columns='em_atendimento').assign(dsacompanhamento=texto)[
+        ['dsacompanhamento', 'cdchamado', 'dtacompanhamento', 'cdusuario', 'cdtipoacompanhamento']]
+
+
+def _inserir(conn, tabela, df):
+    colunas = ', '.join(df.columns)
+    marcadores = ', '.join('?' for _ in df.columns)
+    for inicio in range(0, len(df), LINHAS_POR_INSERCAO):
+        # Nulos (NA, NaT) viram NULL
+        lote = df.iloc[inicio:inicio + LINHAS_POR_INSERCAO].astype(object)
+        lote = lote.where(lote.notna(), None)
+        conn.executemany(f"INSERT INTO {tabela} ({colunas}) VALUES ({marcadores})",
+                         lote.itertuples(index=False, name=None))
+
+
+# Banco com todos os chamados e acompanhamentos em sintetico_* e, nas tabelas
+# do painel, o que aconteceu até "corte": chamados encerrados depois dele
+# continuam abertos
+def criar_banco(caminho, df_chamados, df_acompanhamentos, corte):
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    _registrar_datas()
+    conn = sqlite3.connect(caminho)
+    try:
+        # Leitores (o painel) e o escritor (reproduzir) ao mesmo tempo
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(ESQUEMA.format(prefixo='hd_') + ESQUEMA.format(prefixo='sintetico_') + TABELA_CORTE)
+        _inserir(conn, 'sintetico_chamado', df_chamados)
+        _inserir(conn, 'sintetico_acompanhamento', _acompanhamentos_banco(df_acompanhamentos))
+        conn.execute("INSERT INTO sintetico_corte (corte) VALUES (?)", (datetime.min,))
+        conn.executescript(INDICES)
+        avancar(conn, corte)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+# Libera nas tabelas do painel o que aconteceu entre o corte atual e "corte":
+# chamados abertos, chamados encerrados e acompanhamentos. Devolve a
+# quantidade de linhas inseridas ou alteradas
+def avancar(conn, corte):
+    anterior = conn.execute("SELECT corte FROM sintetico_corte").fetchone()[0]
+    if isinstance(anterior, str):
+        anterior = datetime.fromisoformat(anterior)
+    if corte <= anterior:
+        return 0
+
+    with conn:
+        linhas = conn.execute("""
+            INSERT INTO hd_chamado
+            SELECT cdchamado, dtchamado,
+                   CASE WHEN dttermino <= :corte THEN dttermino END,
+                   cdequipe, cdusuario, cdorigem,
+                   CASE WHEN dttermino > :corte THEN :aberto ELSE cdsituacao END,
+                   cdresponsavel
+            FROM sintetico_chamado
+            WHERE dtchamado > :anterior AND dtchamado <= :corte
+            """, {'anterior': anterior, 'corte': corte, 'aberto': SITUACAO_ABERTO}).rowcount
+        linhas += conn.execute("""
+            UPDATE hd_chamado
+            SET dttermino = sintetico.dttermino, cdsituacao = sintetico.cdsituacao
+            FROM sintetico_chamado AS sintetico
+            WHERE sintetico.cdchamado = hd_chamado.cdchamado
+              AND sintetico.dttermino > :anterior AND sintetico.dttermino <= :corte
+              AND sintetico.dtchamado <= :anterior
+            """, {'anterior': anterior, 'corte': corte}).rowcount
+        linhas += conn.execute("""
+            INSERT INTO hd_acompanhamento
+            SELECT * FROM sintetico_acompanhamento
+            WHERE dtacompanhamento > :anterior AND dtacompanhamento <= :corte
+            """, {'anterior': anterior, 'corte': corte}).rowcount
+        conn.execute("UPDATE sintetico_corte SET corte = ?", (corte,))
+    return linhas
+
+
+def _amanha():
+    return datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+
+
+# Dados sintéticos de "dias" dias até amanhã (o painel abre no mês atual), em
+# Parquet e no banco SQLite
+def gerar(destino, linhas, por_chamado=3.0, dias=730, reservar_dias=0, semente=0):
+    fim = _amanha()
+    inicio = fim - timedelta(days=dias)
+    os.makedirs(destino, exist_ok=True)
+
+    df_chamados, df_acompanhamentos = gerador_sintetico.gerar(
+        linhas, por_chamado, semente, inicio=inicio, fim=fim)
+    df_chamados.to_parquet(os.path.join(destino, ARQUIVO_CHAMADOS), index=False)
+    df_acompanhamentos.to_parquet(os.path.join(destino, ARQUIVO_ACOMPANHAMENTOS), index=False)
+
+    criar_banco(os.path.join(destino, ARQUIVO_BANCO), df_chamados, df_acompanhamentos,
+                fim - timedelta(days=reservar_dias))
+    return df_chamados, df_acompanhamentos
+
+
+# Avança o corte "passo" a cada "intervalo" segundos (tempo simulado mais
+# rápido que o real) até liberar tudo o que foi gerado
+def reproduzir(caminho, passo, intervalo):
+    _registrar_datas()
+    conn = sqlite3.connect(caminho, detect_types=sqlite3.PARSE_DECLTYPES)
+    try:
+        final = conn.execute("""
+            SELECT MAX(data) FROM (
+                SELECT MAX(dtchamado) AS data FROM sintetico_chamado
+                UNION ALL SELECT MAX(dttermino) FROM sintetico_chamado
+                UNION ALL SELECT MAX(dtacompanhamento) FROM sintetico_acompanhamento)
+            """).fetchone()[0]
+        final = datetime.fromisoformat(final) if isinstance(final, str) else final
+        corte = conn.execute("SELECT corte FROM sintetico_corte").fetchone()[0]
+        while corte < final:
+            corte = min(corte + passo, final)
+            inicio = relogio.perf_counter()
+            linhas = avancar(conn, corte)
+            print(f"{corte:%Y-%m-%d %H:%M}: {linhas:,} linhas em "
+                  f"{(relogio.perf_counter() - inicio) * 1000:,.0f} ms", flush=True)
+            relogio.sleep(intervalo)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banco SQLite sintético para rodar o painel sem o SQL Server")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    gerar_parser = comandos.add_parser('gerar', help="gera as fixtures Parquet e o banco SQLite")
+    gerar_parser.add_argument('--destino', default='fixtures')
+    gerar_parser.add_argument('--linhas', type=int, default=1_000_000,
+                              help="quantidade de linhas de hd_acompanhamento")
+    gerar_parser.add_argument('--por-chamado', type=float, default=3.0,
+                              help="acompanhamentos por chamado, em média")
+    gerar_parser.add_argument('--dias', type=int, default=730, help="período gerado, até amanhã")
+    gerar_parser.add_argument('--reservar-dias', type=int, default=0,
+                              help="últimos dias liberados só pelo comando reproduzir")
+    gerar_parser.add_argument('--semente', type=int, default=0)
+
+    reproduzir_parser = comandos.add_parser('reproduzir', help="libera aos poucos os dias reservados")
+    reproduzir_parser.add_argument('--destino', default='fixtures')
+    reproduzir_parser.add_argument('--passo-minutos', type=int, default=60,
+                                   help="tempo simulado liberado a cada passo")
+    reproduzir_parser.add_argument('--intervalo', type=float, default=5.0, help="segundos entre os passos")
+    argumentos = parser.parse_args()
+
+    caminho = os.path.join(argumentos.destino, ARQUIVO_BANCO)
+    if argumentos.comando == 'gerar':
+        inicio = relogio.perf_counter()
+        df_chamados, df_acompanhamentos = gerar(argumentos.destino, argumentos.linhas, argumentos.por_chamado,
+                                                argumentos.dias, argumentos.reservar_dias, argumentos.semente)
+        print(f"{len(df_chamados):,} chamados e {len(df_acompanhamentos):,} acompanhamentos em "
+              f"{caminho} ({relogio.perf_counter() - inicio:,.1f} s)")
+    else:
+        reproduzir(caminho, timedelta(minutes=argumentos.passo_minutos), argumentos.intervalo)
+
+
+if __name__ == '__main__':
+    main()
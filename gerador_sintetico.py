@@ -0,0 +1,102 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# ======================================
+# DADOS SINTÉTICOS DE CHAMADOS
+# ======================================
+# Gera hd_chamado e hd_acompanhamento com as colunas e os tipos do snapshot
+# (consultas.TIPOS_*), em volumes de produção, para medir as métricas sem
+# acesso ao banco. Tudo é vetorizado: 50 milhões de linhas levam segundos.
+
+# Mesmos códigos de operador de dimensoes.json
+OPERADORES_PADRAO = [497, 462, 122, 63, 206, 133, 240, 258, 103, 229, 158]
+EQUIPES_PADRAO = [1, 3]
+
+# Origens mais comuns primeiro (telefone, e-mail, web service, chat, ...)
+ORIGENS = np.arange(1, 21)
+PESOS_ORIGENS = np.array([20, 15, 6, 5, 5, 4, 3, 3, 3, 2, 1, 4, 3, 12, 8, 1, 2, 1, 1, 1], dtype=float)
+
+# Tipos de acompanhamento; 20 e 22 são os contados no gráfico 5
+TIPOS_ACOMPANHAMENTO = np.arange(1, 26)
+PESOS_TIPOS = np.ones(len(TIPOS_ACOMPANHAMENTO))
+PESOS_TIPOS[[19, 21]] = 8
+
+# Fração dos chamados abertos por operadores (o restante vem de outros usuários)
+FRACAO_OPERADORES = 0.6
+FRACAO_FINALIZADOS = 0.9
+# Duração média de um chamado finalizado, em horas
+DURACAO_MEDIA_HORAS = 30
+
+
+def _escolher(rng, valores, quantidade, pesos=None):
+    if pesos is not None:
+        pesos = pesos / pesos.sum()
+    return rng.choice(np.asarray(valores), size=quantidade, p=pesos)
+
+
+def _usuarios(rng, quantidade, operadores, fracao_operadores):
+    outros = rng.integers(1000, 9000, size=quantidade)
+    return np.where(rng.random(quantidade) < fracao_operadores,
+                    _escolher(rng, operadores, quantidade), outros)
+
+
+# Chamados numerados na ordem de abertura, distribuídos no período [inicio, fim)
+def gerar_chamados(quantidade, inicio=datetime(2024, 1, 1), fim=datetime(2026, 1, 1),
+                   operadores=OPERADORES_PADRAO, equipes=EQUIPES_PADRAO, semente=0):
+    rng = np.random.default_rng(semente)
+    segundos = int((fim - inicio).total_seconds())
+
+    abertura = np.sort(rng.integers(0, segundos, size=quantidade))
+    dtchamado = np.datetime64(inicio, 's') + abertura.astype('timedelta64[s]')
+
+    finalizado = rng.random(quantidade) < FRACAO_FINALIZADOS
+    duracao = rng.exponential(DURACAO_MEDIA_HORAS * 3600, size=quantidade).astype('int64')
+    dttermino = np.where(finalizado, dtchamado + duracao.astype('timedelta64[s]'),
+                         np.datetime64('NaT'))
+
+    return pd.DataFrame({
+        'cdchamado': pd.array(np.arange(1, quantidade + 1), dtype='Int64'),
+        'dtchamado': pd.Series(dtchamado).astype('datetime64[ns]'),
+        'dttermino': pd.Series(dttermino).astype('datetime64[ns]'),
+        'cdequipe': pd.array(_escolher(rng, equipes, quantidade), dtype='Int16'),
+        'cdusuario': pd.array(_usuarios(rng, quantidade, operadores, FRACAO_OPERADORES), dtype='Int32'),
+        'cdorigem': pd.array(_escolher(rng, ORIGENS, quantidade, PESOS_ORIGENS), dtype='Int16'),
+        'cdsituacao': pd.array(np.where(finalizado, 7, rng.integers(1, 7, size=quantidade)), dtype='Int16'),
+        'cdresponsavel': pd.array(_usuarios(rng, quantidade, operadores, 0.85), dtype='Int32'),
+    })
+
+
+# Acompanhamentos dos chamados informados (em média "por_chamado" cada), entre
+# a abertura e o término; só de operadores, como na consulta do painel. O
+# primeiro acompanhamento de cada chamado costuma ser o "Chamado em atendimento"
+def gerar_acompanhamentos(df_chamados, por_chamado=3.0, operadores=OPERADORES_PADRAO, semente=0):
+    rng = np.random.default_rng(semente + 1)
+    quantidade_por_chamado = rng.poisson(por_chamado, size=len(df_chamados))
+    indices = np.repeat(np.arange(len(df_chamados)), quantidade_por_chamado)
+    quantidade = len(indices)
+
+    dtchamado = df_chamados['dtchamado'].to_numpy()
+    duracao = (df_chamados['dttermino'] - df_chamados['dtchamado']).fillna(pd.Timedelta(days=3)).to_numpy()
+    deslocamento = (duracao[indices].astype('int64') * rng.random(quantidade)).astype('timedelta64[ns]')
+
+    inicio_grupo = np.cumsum(quantidade_por_chamado) - quantidade_por_chamado
+    primeiro = np.zeros(quantidade, dtype=bool)
+    primeiro[inicio_grupo[quantidade_por_chamado > 0]] = True
+
+    return pd.DataFrame({
+        'em_atendimento': primeiro & (rng.random(quantidade) < 0.8),
+        'cdchamado': pd.array(df_chamados['cdchamado'].to_numpy()[indices], dtype='Int64'),
+        'dtacompanhamento': pd.Series(dtchamado[indices] + deslocamento).dt.floor('s'),
+        'cdusuario': pd.array(_escolher(rng, operadores, quantidade), dtype='Int32'),
+        'cdtipoacompanhamento': pd.array(
+            _escolher(rng, TIPOS_ACOMPANHAMENTO, quantidade, PESOS_TIPOS), dtype='Int16'),
+    })
+
+
+# Par (chamados, acompanhamentos) com cerca de "linhas_acompanhamentos" acompanhamentos
+def gerar(linhas_acompanhamentos, por_chamado=3.0, semente=0, **opcoes):
+    df_chamados = gerar_chamados(max(1, int(linhas_acompanhamentos / por_chamado)), semente=semente, **opcoes)
+    operadores = opcoes.get('operadores', OPERADORES_PADRAO)
+    return df_chamados, gerar_acompanhamentos(df_chamados, por_chamado, operadores, semente)
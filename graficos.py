@@ -0,0 +1,152 @@
+import math
+
+import altair as alt
+import numpy as np
+import plotly.express as px
+
+# ======================================
+# DADOS E ESPECIFICAÇÃO DOS GRÁFICOS
+# ======================================
+# Reduz o que cada gráfico envia ao navegador e o trabalho de montá-lo:
+#
+# - só as colunas usadas pelo gráfico; séries (ex.: operadores) limitadas às
+#   maiores, com as demais somadas em "Outros", e séries diárias longas
+#   agrupadas em no máximo MAXIMO_PONTOS pontos;
+# - colunas de texto como categorias: no Arrow enviado ao navegador, cada
+#   valor distinto (mês, operador, equipe) vai uma única vez;
+# - a especificação Vega-Lite é gerada sem os dados: o Altair não converte o
+#   frame e os dados seguem à parte, em Arrow (st.vega_lite_chart).
+#
+# O painel memoriza o resultado (dados e especificação, ou a figura do
+# Plotly) por filtro no cache compartilhado: rever a mesma visão não recalcula
+# nem remonta o gráfico. Os gráficos memorizados ficam no fim deste arquivo,
+# para que o pré-cálculo (precalculo.py) monte exatamente os mesmos.
+
+MAXIMO_SERIES = 20  # cores da paleta category20
+MAXIMO_BARRAS = 40
+MAXIMO_PONTOS = 180
+# Abaixo disso, o dicionário das categorias custa mais do que economiza
+LINHAS_COMPACTAR = 100
+ROTULO_OUTROS = 'Outros'
+
+
+# Mantém as "maximo - 1" séries de maior total e soma as demais em "Outros"
+def limitar_series(dados, serie, valor, maximo=MAXIMO_SERIES):
+    totais = dados.groupby(serie, sort=False)[valor].sum()
+    if len(totais) <= maximo:
+        return dados
+    mantidas = totais.nlargest(maximo - 1).index
+    dados = dados.assign(**{serie: dados[serie].where(dados[serie].isin(mantidas), ROTULO_OUTROS)})
+    chaves = [coluna for coluna in dados.columns if coluna != valor]
+    return dados.groupby(chaves, sort=False, as_index=False)[valor].sum()
+
+
+# Linhas agrupadas por ponto para que a série tenha no máximo "maximo" pontos
+def passo_pontos(linhas, maximo=MAXIMO_PONTOS):
+    return max(1, math.ceil(linhas / maximo))
+
+
+# Agrupa cada "passo" linhas consecutivas: o eixo fica com o primeiro valor do
+# grupo, as colunas de "somas" com a soma e as de "ultimos" com o último valor
+def reduzir_pontos(dados, passo, eixo, somas=(), ultimos=()):
+    if passo <= 1:
+        return dados
+    agregacoes = {eixo: 'first', **{coluna: 'sum' for coluna in somas},
+                  **{coluna: 'last' for coluna in ultimos}}
+    return dados.groupby(np.arange(len(dados)) // passo).agg(agregacoes).reset_index(drop=True)
+
+
+def compactar(dados):
+    if len(dados) < LINHAS_COMPACTAR:
+        return dados
+    texto = [coluna for coluna in dados.columns if dados[coluna].dtype == object]
+    return dados.astype({coluna: 'category' for coluna in texto}) if texto else dados
+
+
+# Especificação Vega-Lite de um gráfico Altair montado sem dados (alt.Chart()),
+# sem o tema padrão do Altair, como o st.altair_chart faz
+def especificacao(grafico):
+    with alt.theme.enable('none'):
+        spec = grafico.to_dict()
+    spec.pop('data', None)
+    spec.pop('datasets', None)
+    return spec
+
+
+# Dados (só as colunas usadas, compactados) e especificação de um gráfico
+# Altair, para st.vega_lite_chart(dados, spec)
+def vega_lite(dados, colunas, grafico):
+    return compactar(dados[list(colunas)]), especificacao(grafico)
+
+
+# ======================================
+# GRÁFICOS MEMORIZADOS
+# ======================================
+
+# Gráfico 1: chamados por mês e equipe
+def chamados_por_equipe(dados_equipe):
+    grafico = alt.Chart().mark_bar(
+        cornerRadius=5,
+        size=25
+    ).encode(
+        x=alt.X('mes:N', title='Mês', axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('total:Q', title='Total de Chamados'),
+        color=alt.Color('equipe:N', 
+                       scale=alt.Scale(range=['#1f77b4', '#ff7f0e']),
+                       legend=alt.Legend(title="Equipe")),
+        xOffset=alt.XOffset('equipe:N')
+    ).properties(
+        width=alt.Step(40)
+    )
+    return vega_lite(dados_equipe, ['mes', 'equipe', 'total'], grafico)
+
+
+# Gráfico 2: barras agrupadas por mês, até MAXIMO_SERIES operadores (uma cor
+# por operador), os demais somados em "Outros"
+def chamados_abertos_por_operador(chamados_por_operador):
+    grafico = alt.Chart().mark_bar(
+        cornerRadius=3,
+        size=20
+    ).encode(
+        x=alt.X('mes:N', title='Mês', axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('total:Q', title='Chamados Abertos'),
+        color=alt.Color('operador:N', title='Operador', 
+                       scale=alt.Scale(scheme='category20')),
+        tooltip=['mes:N', 'operador:N', 'total:Q']
+    ).properties(
+        width=alt.Step(40)
+    )
+    dados = limitar_series(chamados_por_operador, 'operador', 'total')
+    return vega_lite(dados, ['mes', 'operador', 'total'], grafico)
+
+
+# Gráfico 3: figura do Plotly, até MAXIMO_BARRAS operadores, os demais
+# somados em "Outros"
+def chamados_iniciados_por_operador(contagem_chamados):
+    fig = px.bar(
+        limitar_series(contagem_chamados[['operador', 'total_chamados']],
+                       'operador', 'total_chamados', MAXIMO_BARRAS),
+        x='operador',
+        y='total_chamados',
+        title='Chamados Atendidos por Operador',
+        labels={'operador': 'Operador', 'total_chamados': 'Chamados Atendidos'},
+        color='total_chamados',
+        color_continuous_scale='Purples'
+    )
+    fig.update_layout(
+        xaxis_tickangle=-45,
+        height=500
+    )
+    return fig
+
+
+# Backlog diário; em períodos longos, cada ponto agrupa passo_pontos() dias
+def backlog_diario(backlog):
+    grafico = alt.Chart().mark_line(point=len(backlog) <= 62).encode(
+        x=alt.X('dia:T', title='Dia'),
+        y=alt.Y('backlog:Q', title='Chamados em aberto'),
+        tooltip=[alt.Tooltip('dia:T', title='Dia'), 'backlog:Q', 'abertos:Q', 'fechados:Q']
+    ).properties(height=300)
+    dados = reduzir_pontos(backlog, passo_pontos(len(backlog)), 'dia',
+                           somas=['abertos', 'fechados'], ultimos=['backlog'])
+    return vega_lite(dados, ['dia', 'backlog', 'abertos', 'fechados'], grafico)
@@ -0,0 +1,107 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import time as relogio
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import pyinstrument
+except ImportError:  # opcional: sem ele, o perfil usa o cProfile
+    pyinstrument = None
+
+# ======================================
+# INSTRUMENTAÇÃO DAS ETAPAS
+# ======================================
+# Cada execução do painel registra suas etapas (recorte, agregação e
+# renderização de cada gráfico) com tempo, linhas de entrada/saída e variação
+# de memória (RSS). Os registros vão para o log em JSON, um por linha, e podem
+# ser exibidos no painel de administração.
+
+logger = logging.getLogger('dashchamados.instrumentacao')
+
+try:
+    _TAMANHO_PAGINA = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):  # Windows
+    _TAMANHO_PAGINA = None
+
+
+# Memória residente atual do processo, em MB (None fora do Linux)
+def memoria_mb():
+    if _TAMANHO_PAGINA is None:
+        return None
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * _TAMANHO_PAGINA / 1024 / 1024
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+# Linhas de um resultado: soma dos frames que ele contém (frame, tupla ou namedtuple)
+def contar_linhas(valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return len(valor)
+    if isinstance(valor, tuple):
+        contagens = [contar_linhas(item) for item in valor]
+        contagens = [contagem for contagem in contagens if contagem is not None]
+        return sum(contagens) if contagens else None
+    return None
+
+
+class Medidor:
+    def __init__(self):
+        self.execucao = uuid.uuid4().hex[:12]
+        self.etapas = []
+
+    # Mede o bloco; quem chama pode preencher registro['linhas_saida'] e
+    # outros campos do registro dentro do bloco
+    @contextmanager
+    def etapa(self, nome, linhas_entrada=None):
+        registro = {'execucao': self.execucao, 'etapa': nome,
+                    'inicio': datetime.now().isoformat(timespec='milliseconds'),
+                    'linhas_entrada': linhas_entrada, 'linhas_saida': None}
+        memoria_antes = memoria_mb()
+        inicio = relogio.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro['ms'] = (relogio.perf_counter() - inicio) * 1000
+            memoria_depois = memoria_mb()
+            registro['memoria_mb'] = (memoria_depois - memoria_antes
+                                      if memoria_antes is not None and memoria_depois is not None else None)
+            self.etapas.append(registro)
+            logger.info(json.dumps(registro, ensure_ascii=False, default=str))
+
+    def tabela(self):
+        return pd.DataFrame(self.etapas, columns=[
+            'etapa', 'ms', 'linhas_entrada', 'linhas_saida', 'memoria_mb', 'calculado'])
+
+    # Registros em JSON Lines, para exportação
+    def exportar(self):
+        return '\n'.join(json.dumps(registro, ensure_ascii=False, default=str) for registro in self.etapas)
+
+
+# Perfil de uma execução (pyinstrument, se instalado; senão cProfile)
+class Perfil:
+    def __init__(self):
+        if pyinstrument is not None:
+            self._perfilador = pyinstrument.Profiler()
+            self._perfilador.start()
+        else:
+            self._perfilador = cProfile.Profile()
+            self._perfilador.enable()
+
+    def parar(self, linhas=40):
+        if pyinstrument is not None:
+            self._perfilador.stop()
+            return self._perfilador.output_text()
+        self._perfilador.disable()
+        saida = io.StringIO()
+        pstats.Stats(self._perfilador, stream=saida).sort_stats('cumulative').print_stats(linhas)
+        return saida.getvalue()
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+import dimensoes
+
+# ======================================
+# PRIMEIRA RESPOSTA E TROCAS DE OPERADOR
+# ======================================
+# Tabela derivada com uma linha por chamado: primeiro e último acompanhamento
+# (data e operador), quantidade de acompanhamentos e trocas de operador (quantas
+# vezes o acompanhamento seguinte foi de outro operador).
+#
+# Só entram os acompanhamentos do snapshot, que a sincronização busca
+# filtrados pelos operadores cadastrados (dimensões): o primeiro acompanhamento
+# é o primeiro de um operador cadastrado, e um acompanhamento de outro usuário
+# entre dois operadores não conta como troca (A, outro, B é uma troca; A,
+# outro, A é nenhuma).
+#
+# Os acompanhamentos são ordenados uma única vez por (cdchamado,
+# dtacompanhamento): como o snapshot já está ordenado por data, basta uma
+# ordenação estável por chamado. Tudo o mais sai de uma passada vetorizada
+# sobre os grupos contíguos (início e fim de cada chamado no vetor ordenado).
+# A tabela segue a ordem dos chamados (por dtchamado), para o recorte por
+# período por busca binária.
+
+_NAT = np.iinfo(np.int64).min
+
+def _codigos(serie):
+    return serie.to_numpy(dtype='int64', na_value=dimensoes.NULO)
+
+
+def interacoes_vazias():
+    return pd.DataFrame({
+        'cdchamado': pd.Series(dtype='Int64'),
+        'dtchamado': pd.Series(dtype='datetime64[ns]'),
+        'cdequipe': pd.Series(dtype='Int16'),
+        'acompanhamentos': pd.Series(dtype='int32'),
+        'dtprimeiro_acompanhamento': pd.Series(dtype='datetime64[ns]'),
+        'primeiro_operador': pd.Series(dtype='int32'),
+        'dtultimo_acompanhamento': pd.Series(dtype='datetime64[ns]'),
+        'ultimo_operador': pd.Series(dtype='int32'),
+        'trocas': pd.Series(dtype='int32'),
+    })
+
+
+# df_acompanhamentos deve estar ordenado por dtacompanhamento (como no Estado)
+def por_chamado(df_chamados, df_acompanhamentos):
+    if df_chamados.empty:
+        return interacoes_vazias()
+
+    chamado = _codigos(df_acompanhamentos['cdchamado'])
+    data = df_acompanhamentos['dtacompanhamento'].to_numpy(dtype='datetime64[ns]').view('int64')
+    operador = df_acompanhamentos['cdusuario'].to_numpy(dtype='int32', na_value=dimensoes.NULO)
+    validos = (data != _NAT) & (chamado != dimensoes.NULO)
+    if not validos.all():
+        chamado, data, operador = chamado[validos], data[validos], operador[validos]
+
+    # Ordenação estável por chamado: dentro de cada chamado, segue a data. A
+    # chave (chamado, posição) num único int64 ordena bem mais rápido que o
+    # argsort estável, quando cabe
+    quantidade = len(chamado)
+    menor = int(chamado.min()) if quantidade else 0
+    if quantidade and (int(chamado.max()) - menor + 1) * quantidade < 2**62:
+        ordem = np.sort((chamado - menor) * quantidade + np.arange(quantidade)) % quantidade
+    else:
+        ordem = np.argsort(chamado, kind='stable')
+    chamado, data, operador = chamado[ordem], data[ordem], operador[ordem]
+
+    inicios = np.flatnonzero(np.diff(chamado, prepend=dimensoes.NULO - 1))
+    fins = np.append(inicios[1:], len(chamado)) - 1
+    # Troca: acompanhamento de outro operador no mesmo chamado (o primeiro de
+    # cada chamado nunca conta, pois o chamado anterior é outro)
+    troca = np.zeros(len(chamado), dtype='int32')
+    troca[1:] = (operador[1:] != operador[:-1]) & (chamado[1:] == chamado[:-1])
+    trocas = np.add.reduceat(troca, inicios) if len(inicios) else troca
+
+    # Grupo de cada chamado (os grupos estão ordenados por cdchamado); chamados
+    # sem acompanhamentos ficam com os valores padrão
+    grupos = chamado[inicios]
+    codigos_chamados = _codigos(df_chamados['cdchamado'])
+    posicao = np.searchsorted(grupos, codigos_chamados)
+    tem = posicao < len(grupos)
+    tem[tem] = grupos[posicao[tem]] == codigos_chamados[tem]
+    posicao = posicao[tem]
+    inicio, fim = inicios[posicao], fins[posicao]
+
+    def coluna(valores, padrao, tipo):
+        saida = np.full(len(df_chamados), padrao, dtype=tipo)
+        saida[tem] = valores
+        return saida
+
+    return pd.DataFrame({
+        'cdchamado': df_chamados['cdchamado'].array,
+        'dtchamado': df_chamados['dtchamado'].to_numpy(),
+        'cdequipe': df_chamados['cdequipe'].array,
+        'acompanhamentos': coluna(fim - inicio + 1, 0, 'int32'),
+        'dtprimeiro_acompanhamento': coluna(data[inicio], _NAT, 'int64').view('datetime64[ns]'),
+        'primeiro_operador': coluna(operador[inicio], dimensoes.NULO, 'int32'),
+        'dtultimo_acompanhamento': coluna(data[fim], _NAT, 'int64').view('datetime64[ns]'),
+        'ultimo_operador': coluna(operador[fim], dimensoes.NULO, 'int32'),
+        'trocas': coluna(trocas[posicao], 0, 'int32'),
+    })
@@ -0,0 +1,282 @@
+import json
+import os
+import shutil
+import threading
+import time as relogio
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import cubo
+import dimensoes
+import eventos
+import sincronizacao
+
+# ======================================
+# ESTADO COMPARTILHADO ENTRE PROCESSOS
+# ======================================
+# Com várias réplicas do painel, cada uma mantinha sua própria cópia dos
+# dados. No modo compartilhado, um único processo carregador (carregador.py)
+# sincroniza com o banco e publica cada versão do Estado em arquivos Arrow
+# IPC; as réplicas mapeiam esses arquivos em memória, somente leitura, e
+# montam os frames sem copiar os dados: todas usam as mesmas páginas do
+# sistema operacional (page cache), e a memória deixa de crescer com o
+# número de réplicas.
+#
+#   <diretorio>/atual.json             versão publicada, situação, estatísticas
+#                                      e tabelas de dimensão do carregador
+#   <diretorio>/<versão>/<frame>.arrow um arquivo por frame do Estado
+#
+# Para que o pandas use os buffers mapeados sem cópia, cada coluna é gravada
+# num formato que o numpy lê diretamente: datas como int64 (NaT incluído),
+# lógicos como uint8 e inteiros anuláveis (Int64, Int16...) como valores mais
+# uma coluna com a máscara de nulos. O índice dos frames não é preservado
+# (as réplicas recebem índices 0..n-1).
+
+ARQUIVO_PONTEIRO = 'atual.json'
+
+# Frames do Estado gravados em cada versão publicada
+FRAMES = [campo for campo in sincronizacao.Estado._fields if campo != 'versao']
+
+# Sufixo da coluna com a máscara de nulos de um inteiro anulável
+SUFIXO_MASCARA = '__nulos'
+
+
+def _gravar_json_atomico(caminho, documento):
+    temporario = f"{caminho}.tmp-{os.getpid()}"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(documento, arquivo, ensure_ascii=False, default=str)
+    os.replace(temporario, caminho)
+
+
+# Inteiro anulável do pandas (Int64, Int16...)
+def _inteiro_anulavel(tipo):
+    return pd.api.types.is_extension_array_dtype(tipo) and pd.api.types.is_integer_dtype(tipo)
+
+
+# Colunas Arrow e tipo pandas de cada coluna do frame
+def _colunas_arrow(df):
+    colunas, tipos = {}, {}
+    for nome, serie in df.items():
+        tipo = serie.dtype
+        tipos[nome] = str(tipo)
+        if isinstance(tipo, np.dtype) and tipo.kind == 'M':
+            colunas[nome] = pa.array(serie.to_numpy().view('int64'))
+        elif isinstance(tipo, np.dtype) and tipo.kind == 'b':
+            colunas[nome] = pa.array(serie.to_numpy().view('uint8'))
+        elif isinstance(tipo, np.dtype) and tipo.kind in 'iuf':
+            colunas[nome] = pa.array(serie.to_numpy())
+        elif _inteiro_anulavel(tipo):
+            # Nulos gravados como 0 nos valores; a máscara os identifica
+            colunas[nome] = pa.array(serie.array.to_numpy(dtype=tipo.numpy_dtype, na_value=0))
+            colunas[nome + SUFIXO_MASCARA] = pa.array(serie.isna().to_numpy().view('uint8'))
+        else:
+            # Demais tipos (textos, frames vazios de object) são convertidos na leitura
+            colunas[nome] = pa.array(serie, from_pandas=True)
+            tipos[nome] = None
+    return colunas, tipos
+
+
+def gravar_frame(caminho, df):
+    colunas, tipos = _colunas_arrow(df)
+    tabela = pa.table(colunas) if colunas else pa.table({})
+    tabela = tabela.replace_schema_metadata({'tipos': json.dumps(tipos)})
+    with pa.OSFile(caminho, 'wb') as saida:
+        with ipc.new_file(saida, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+
+
+# Buffer de uma coluna como array numpy somente leitura, sem cópia
+def _numpy(coluna):
+    if coluna.num_chunks != 1:
+        return coluna.to_numpy()
+    return coluna.chunk(0).to_numpy(zero_copy_only=True)
+
+
+def _serie(tabela, nome, tipo):
+    coluna = tabela.column(nome)
+    if tipo is None:
+        return coluna.to_pandas()
+    tipo = pd.api.types.pandas_dtype(tipo)
+    if _inteiro_anulavel(tipo):
+        mascara = _numpy(tabela.column(nome + SUFIXO_MASCARA)).view(bool)
+        return pd.arrays.IntegerArray(_numpy(coluna), mascara, copy=False)
+    return _numpy(coluna).view(tipo)
+
+
+# Frame cujas colunas apontam para o arquivo mapeado em memória (somente leitura)
+def ler_frame(caminho):
+    tabela = ipc.open_file(pa.memory_map(caminho, 'r')).read_all()
+    tipos = json.loads(tabela.schema.metadata[b'tipos'])
+    # copy=False mantém um bloco por coluna, sem consolidar (o que copiaria)
+    return pd.DataFrame({nome: _serie(tabela, nome, tipo) for nome, tipo in tipos.items()}, copy=False)
+
+
+# ======================================
+# PUBLICAÇÃO (PROCESSO CARREGADOR)
+# ======================================
+
+class PublicadorEstado:
+    def __init__(self, diretorio, manter=3):
+        # manter: versões mantidas em disco; as réplicas podem ainda estar
+        # mapeando as anteriores à atual
+        self.diretorio = diretorio
+        self.manter = manter
+        self.versao_publicada = None
+        self._pasta = None
+        self._dimensoes = None
+        self._situacao = ({}, {})
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _ponteiro(self, situacao, estatisticas):
+        self._situacao = (situacao, estatisticas)
+        _gravar_json_atomico(os.path.join(self.diretorio, ARQUIVO_PONTEIRO), {
+            'pasta': self._pasta,
+            'publicado_em': relogio.time(),
+            'situacao': situacao or {},
+            'estatisticas': estatisticas or {},
+            'dimensoes': dimensoes.tabelas_para_documento(self._dimensoes) if self._dimensoes else None,
+        })
+
+    # Tabelas de dimensão do carregador (com as "consultas" ao banco), as
+    # mesmas usadas nos filtros das consultas e no agrupamento dos cubos: as
+    # réplicas usam estas, e não as do arquivo
+    def definir_dimensoes(self, tabelas):
+        if self._dimensoes is not None and self._dimensoes.versao == tabelas.versao:
+            return
+        self._dimensoes = tabelas
+        if self._pasta is not None:
+            self._ponteiro(*self._situacao)
+
+    # Grava os frames numa pasta nova e só então troca o ponteiro: uma réplica
+    # nunca vê uma versão pela metade
+    def publicar(self, estado, situacao=None, estatisticas=None):
+        nome = f"{int(relogio.time() * 1000)}-{estado.versao}"
+        pasta = os.path.join(self.diretorio, nome)
+        os.makedirs(pasta)
+        for frame in FRAMES:
+            gravar_frame(os.path.join(pasta, f"{frame}.arrow"), getattr(estado, frame))
+        self._pasta = nome
+        self.versao_publicada = estado.versao
+        self._ponteiro(situacao, estatisticas)
+        self._limpar()
+
+    # Sem dados novos: atualiza apenas a situação (horário, erro) e as estatísticas
+    def publicar_situacao(self, situacao, estatisticas=None):
+        if self._pasta is not None:
+            self._ponteiro(situacao, estatisticas)
+
+    def _limpar(self):
+        pastas = sorted(
+            (nome for nome in os.listdir(self.diretorio)
+             if os.path.isdir(os.path.join(self.diretorio, nome))),
+            key=lambda nome: int(nome.split('-')[0]))
+        for nome in pastas[:-self.manter]:
+            # No Windows, arquivos ainda mapeados não podem ser apagados; fica
+            # para a próxima publicação
+            shutil.rmtree(os.path.join(self.diretorio, nome), ignore_errors=True)
+
+
+# ======================================
+# LEITURA (RÉPLICAS DO PAINEL)
+# ======================================
+# Mesma interface usada pelo painel e pela API no Sincronizador (estado(),
+# versao, situacao, estatisticas...), mas sem acesso ao banco: os filtros
+# das consultas são os do processo carregador.
+
+class LeitorEstado:
+    def __init__(self, diretorio, intervalo_verificacao=1.0):
+        self.diretorio = diretorio
+        self.intervalo_verificacao = intervalo_verificacao
+        self._estado = sincronizacao.Estado(pd.DataFrame(), pd.DataFrame(),
+                                            cubo.cubo_vazio(cubo.DIMENSOES_CHAMADOS),
+                                            cubo.cubo_vazio(cubo.DIMENSOES_ACOMPANHAMENTOS),
+                                            eventos.eventos_vazios(), 0)
+        self._pasta = None
+        self._dimensoes = None
+        self._verificado_em = None
+        self._trava = threading.Lock()
+        self.situacao = {}
+        self.estatisticas = {}
+
+    def _ler_ponteiro(self):
+        try:
+            with open(os.path.join(self.diretorio, ARQUIVO_PONTEIRO), encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+
+    # Relê o ponteiro no máximo uma vez por "intervalo_verificacao"; se a
+    # pasta publicada mudou, mapeia a nova versão (a versão local é contada
+    # aqui, pois o carregador pode ter reiniciado)
+    def _verificar(self):
+        agora = relogio.monotonic()
+        if self._verificado_em is not None and agora - self._verificado_em < self.intervalo_verificacao:
+            return
+        with self._trava:
+            if self._verificado_em is not None and agora - self._verificado_em < self.intervalo_verificacao:
+                return
+            self._verificado_em = agora
+            ponteiro = self._ler_ponteiro()
+            if ponteiro is None:
+                return
+            self.situacao = ponteiro['situacao']
+            self.estatisticas = ponteiro['estatisticas']
+            documento = ponteiro.get('dimensoes')
+            if documento and (self._dimensoes is None or documento['versao'] != self._dimensoes.versao):
+                self._dimensoes = dimensoes.tabelas_do_documento(documento)
+            if ponteiro['pasta'] == self._pasta:
+                return
+            pasta = os.path.join(self.diretorio, ponteiro['pasta'])
+            try:
+                frames = [ler_frame(os.path.join(pasta, f"{frame}.arrow")) for frame in FRAMES]
+            except (OSError, pa.ArrowInvalid) as e:
+                # Versão removida entre a leitura do ponteiro e o mapeamento
+                self.situacao = dict(self.situacao, erro=f"Falha ao mapear a versão publicada: {e}")
+                return
+            self._estado = sincronizacao.Estado(*frames, self._estado.versao + 1)
+            self._pasta = ponteiro['pasta']
+
+    def estado(self):
+        self._verificar()
+        return self._estado
+
+    @property
+    def versao(self):
+        return self.estado().versao
+
+    # Tabelas de dimensão publicadas pelo carregador (None até a primeira)
+    def dimensoes(self):
+        self._verificar()
+        return self._dimensoes
+
+    # Espera o carregador publicar a primeira versão
+    def aguardar_primeira_carga(self, timeout=None):
+        limite = None if timeout is None else relogio.monotonic() + timeout
+        while self.versao == 0:
+            if limite is not None and relogio.monotonic() >= limite:
+                return False
+            relogio.sleep(self.intervalo_verificacao)
+        return True
+
+    # Quem sincroniza e define os filtros é o processo carregador
+    def iniciar_em_segundo_plano(self):
+        pass
+
+    def definir_filtros(self, codigos_equipes, operadores):
+        return False
+
+
+# Mesma interface do CarregadorDimensoes (atual(), erro) sobre as tabelas
+# publicadas: a primeira chamada espera o carregador publicá-las
+class DimensoesPublicadas:
+    def __init__(self, leitor):
+        self.leitor = leitor
+        self.erro = None
+
+    def atual(self):
+        while (tabelas := self.leitor.dimensoes()) is None:
+            relogio.sleep(self.leitor.intervalo_verificacao)
+        return tabelas
@@ -0,0 +1,229 @@
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import consultas
+import cubo
+import eventos
+import interacoes
+import periodo
+import resolucao
+import sincronizacao
+
+# ======================================
+# MÉTRICAS DO PAINEL (SEM STREAMLIT)
+# ======================================
+# Cálculo de cada gráfico como função pura sobre um recorte dos dados, para
+# que possa ser medido, reaproveitado e comparado fora do painel.
+#
+# Fonte de dados: qualquer objeto com o método estado(), que devolve um
+# sincronizacao.Estado (o Sincronizador do painel ou uma FonteMemoria).
+
+
+# Fonte fixa, montada a partir de frames já carregados (dados sintéticos, testes)
+class FonteMemoria:
+    def __init__(self, df_chamados, df_acompanhamentos, operadores=None):
+        self._estado = sincronizacao.montar_estado(df_chamados, df_acompanhamentos, operadores)
+
+    def estado(self):
+        return self._estado
+
+
+# Dados de uma mesma versão recortados no período e nas equipes selecionadas
+Recorte = namedtuple('Recorte', [
+    'chamados', 'acompanhamentos', 'cubo_chamados', 'cubo_acompanhamentos',
+    'eventos_atendimento', 'versao'
+])
+
+
+def recortar(estado, data_inicio, data_fim, codigos_equipes):
+    inicio, fim = consultas.limites_periodo(data_inicio, data_fim)
+    codigos_equipes = list(codigos_equipes)
+
+    df_chamados = periodo.recortar_periodo(estado.chamados, 'dtchamado', inicio, fim)
+    df_chamados = df_chamados[df_chamados['cdequipe'].isin(codigos_equipes)]
+    return Recorte(
+        df_chamados,
+        periodo.recortar_periodo(estado.acompanhamentos, 'dtacompanhamento', inicio, fim),
+        cubo.recortar(estado.cubo_chamados, inicio, fim, codigos_equipes),
+        cubo.recortar(estado.cubo_acompanhamentos, inicio, fim),
+        periodo.recortar_periodo(estado.eventos_atendimento, 'dtacompanhamento', inicio, fim),
+        estado.versao,
+    )
+
+
+# Gráfico 1: chamados por mês e equipe (apenas as equipes mapeadas)
+def chamados_por_equipe(recorte, equipes):
+    cubo_equipes = recorte.cubo_chamados[recorte.cubo_chamados['cdequipe'].isin(list(equipes))]
+    dados = cubo.chamados_por_equipe_mes(cubo_equipes)
+    dados['equipe'] = dados['cdequipe'].map(equipes)
+    return dados[['mes', 'equipe', 'total']]
+
+
+# Gráfico 2: chamados abertos por mês e operador
+def chamados_abertos_por_operador(recorte, operadores):
+    dados = cubo.chamados_por_operador_mes(recorte.cubo_chamados)
+    dados['operador'] = dados['cdusuario'].map(operadores)
+    return dados[['mes', 'operador', 'total']]
+
+
+# Gráfico 3: chamados distintos iniciados ("Chamado em atendimento") por operador
+def chamados_iniciados_por_operador(recorte, operadores):
+    contagem = eventos.chamados_iniciados_por_operador(recorte.eventos_atendimento)
+    contagem['operador'] = contagem['cdusuario'].map(operadores)
+    return contagem[contagem['cdusuario'].isin(list(operadores))]
+
+
+# Gráfico 4: chamados por meio de solicitação (origens agrupadas)
+def chamados_por_meio(recorte, mapeamento_origem):
+    contagem_origem = cubo.chamados_por_origem(recorte.cubo_chamados)
+    contagem_origem['meio_solicitacao'] = contagem_origem['cdorigem'].map(mapeamento_origem)
+    contagem_meios = contagem_origem.groupby('meio_solicitacao')['total'].sum().reset_index()
+    contagem_meios.columns = ['Meio de Solicitação', 'Total']
+    return contagem_meios.sort_values('Total', ascending=False).reset_index(drop=True)
+
+
+def _todos_operadores(operadores, coluna, **colunas):
+    return pd.DataFrame({
+        coluna: list(operadores.keys()),
+        'operador': list(operadores.values()),
+        **{nome: [valores[codigo] for codigo in operadores] for nome, valores in colunas.items()},
+    })
+
+
+# Gráfico 5: acompanhamentos dos tipos informados por operador (inclusive os zerados)
+def acompanhamentos_por_operador(recorte, operadores, tipos=(20, 22)):
+    contagem = cubo.acompanhamentos_por_operador(recorte.cubo_acompanhamentos, tipos)
+    return _todos_operadores(operadores, 'cdusuario').merge(
+        contagem,
+        on='cdusuario',
+        how='left'
+    ).fillna(0).sort_values('total', ascending=False)
+
+
+# Gráfico 6: chamados finalizados por responsável (inclusive os zerados);
+# devolve também o total de finalizados no recorte
+def chamados_finalizados_por_operador(recorte, operadores, equipes_por_operador, situacao=7):
+    contagem = cubo.chamados_por_responsavel(recorte.cubo_chamados, situacao)
+    dados = _todos_operadores(operadores, 'cdresponsavel', equipe=equipes_por_operador).merge(
+        contagem[['cdresponsavel', 'total']],
+        on='cdresponsavel',
+        how='left'
+    ).fillna(0).sort_values('total', ascending=False)
+    return int(contagem['total'].sum()), dados
+
+
+# Totais de cada operador no recorte, numa linha por operador: chamados
+# abertos, iniciados, acompanhamentos dos tipos informados e finalizados
+def resumo_por_operador(recorte, operadores, tipos=(20, 22), situacao=7):
+    codigos = list(operadores)
+
+    def por_operador(contagem, coluna_codigo, coluna_total='total'):
+        totais = contagem.groupby(coluna_codigo)[coluna_total].sum()
+        totais.index = totais.index.astype('int64')
+        return totais.reindex(codigos, fill_value=0).astype('int64').to_numpy()
+
+    return pd.DataFrame({
+        'cdusuario': codigos,
+        'operador': [operadores[codigo] for codigo in codigos],
+        'abertos': por_operador(cubo.chamados_por_operador_mes(recorte.cubo_chamados), 'cdusuario'),
+        'iniciados': por_operador(eventos.chamados_iniciados_por_operador(recorte.eventos_atendimento),
+                                  'cdusuario', 'total_chamados'),
+        'acompanhamentos': por_operador(
+            cubo.acompanhamentos_por_operador(recorte.cubo_acompanhamentos, tipos), 'cdusuario'),
+        'finalizados': por_operador(cubo.chamados_por_responsavel(recorte.cubo_chamados, situacao),
+                                    'cdresponsavel'),
+    })
+
+
+# Tempo de resolução (chamados abertos no recorte) por equipe
+def resolucao_por_equipe(recorte, equipes):
+    dados = resolucao.percentis_resolucao(recorte.chamados, 'cdequipe')
+    dados = dados[dados['cdequipe'].isin(list(equipes))].reset_index(drop=True)
+    dados.insert(1, 'equipe', dados['cdequipe'].map(equipes))
+    return dados
+
+
+# Tempo de resolução por responsável (apenas operadores)
+def resolucao_por_operador(recorte, operadores):
+    dados = resolucao.percentis_resolucao(recorte.chamados, 'cdresponsavel')
+    dados = dados[dados['cdresponsavel'].isin(list(operadores))].reset_index(drop=True)
+    dados.insert(1, 'operador', dados['cdresponsavel'].map(operadores))
+    return dados.sort_values('resolvidos', ascending=False)
+
+
+# Backlog diário das equipes selecionadas; usa o estado inteiro (e não o
+# recorte) para contar os chamados abertos antes do período
+def backlog_diario(estado, data_inicio, data_fim, codigos_equipes):
+    return resolucao.backlog_diario(estado.chamados, data_inicio, data_fim, codigos_equipes)
+
+
+# Chamados abertos por equipe e faixa de idade no fim do período (ou agora,
+# se o período ainda não terminou)
+def envelhecimento(estado, data_fim, codigos_equipes, equipes):
+    referencia = min(consultas.limites_periodo(data_fim, data_fim)[1], datetime.now())
+    dados = resolucao.envelhecimento(estado.chamados, referencia, codigos_equipes)
+    dados['equipe'] = dados['cdequipe'].map(equipes)
+    return dados
+
+
+# Primeira resposta, último contato e trocas de operador de cada chamado do
+# estado; não depende do período, então é calculado uma vez por versão
+def interacoes_por_chamado(estado):
+    return interacoes.por_chamado(estado.chamados, estado.acompanhamentos)
+
+
+# Chamados abertos no período e nas equipes selecionadas
+def recortar_interacoes(interacoes_chamados, data_inicio, data_fim, codigos_equipes):
+    inicio, fim = consultas.limites_periodo(data_inicio, data_fim)
+    recorte = periodo.recortar_periodo(interacoes_chamados, 'dtchamado', inicio, fim)
+    return recorte[recorte['cdequipe'].isin(list(codigos_equipes))]
+
+
+# Tempo até o primeiro acompanhamento por operador que o fez (percentis em
+# horas). Os acompanhamentos vêm do banco filtrados pelos operadores das
+# tabelas de dimensão: a "primeira resposta" é o primeiro acompanhamento de um
+# operador cadastrado (os de outros usuários não contam). Chamados sem data de
+# abertura ficam de fora
+def primeira_resposta_por_operador(interacoes_recorte, operadores):
+    respondidos = interacoes_recorte[interacoes_recorte['primeiro_operador'].isin(list(operadores))
+                                     & interacoes_recorte['dtchamado'].notna()]
+    espera = (respondidos['dtprimeiro_acompanhamento'] - respondidos['dtchamado']).to_numpy()
+    dados = resolucao.percentis_por_grupo(
+        respondidos['primeiro_operador'].to_numpy(dtype='int64'),
+        espera.view('int64') // resolucao.NANOSSEGUNDOS_MS, 'cdusuario')
+    dados = dados.rename(columns={'quantidade': 'chamados'})
+    dados.insert(1, 'operador', dados['cdusuario'].map(operadores))
+    return dados.sort_values('chamados', ascending=False).reset_index(drop=True)
+
+
+# Rótulo da quantidade de trocas de operador (3 ou mais num único grupo)
+ROTULOS_TROCAS = ['Sem troca', '1 troca', '2 trocas', '3 ou mais']
+
+
+# Chamados com acompanhamentos por equipe e quantidade de trocas de operador
+def trocas_por_equipe(interacoes_recorte, equipes):
+    acompanhados = interacoes_recorte[interacoes_recorte['acompanhamentos'] > 0]
+    faixa = np.minimum(acompanhados['trocas'].to_numpy(), len(ROTULOS_TROCAS) - 1)
+    dados = pd.DataFrame({'cdequipe': acompanhados['cdequipe'].to_numpy(dtype='int64', na_value=-2),
+                          'faixa': faixa})
+    dados = dados.groupby(['cdequipe', 'faixa']).size().reset_index(name='total')
+    dados = dados[dados['cdequipe'].isin(list(equipes))]
+    dados['equipe'] = dados['cdequipe'].map(equipes)
+    dados['trocas'] = pd.Categorical.from_codes(dados['faixa'], categories=ROTULOS_TROCAS, ordered=True)
+    return dados[['equipe', 'trocas', 'total']].reset_index(drop=True)
+
+
+# Chamados por operador do último acompanhamento, com a média de trocas e a
+# fração dos chamados que passaram por mais de um operador
+def trocas_por_operador(interacoes_recorte, operadores):
+    ultimos = interacoes_recorte[interacoes_recorte['ultimo_operador'].isin(list(operadores))]
+    dados = ultimos.assign(com_troca=ultimos['trocas'] > 0).groupby('ultimo_operador').agg(
+        chamados=('trocas', 'size'),
+        media_trocas=('trocas', 'mean'),
+        com_troca=('com_troca', 'mean'),
+    ).reset_index().rename(columns={'ultimo_operador': 'cdusuario'})
+    dados.insert(1, 'operador', dados['cdusuario'].map(operadores))
+    return dados.sort_values('media_trocas', ascending=False).reset_index(drop=True)
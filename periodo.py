@@ -0,0 +1,30 @@
+import pandas as pd
+
+# ======================================
+# RECORTE POR PERÍODO
+# ======================================
+# Os frames do snapshot (e os cubos) são mantidos ordenados pela coluna de
+# data; o filtro de período vira uma busca binária (searchsorted) que devolve
+# uma fatia contígua, sem máscara booleana nem objetos date por linha.
+
+
+def _ordenado(datas):
+    validos = len(datas) - int(datas.isna().sum())
+    return datas.iloc[:validos].notna().all() and datas.iloc[:validos].is_monotonic_increasing
+
+
+# Ordena pela coluna de data (NaT no final), só se ainda não estiver ordenado
+def ordenar_por_data(df, coluna):
+    if df.empty or _ordenado(df[coluna]):
+        return df
+    return df.sort_values(coluna, kind='stable', na_position='last').reset_index(drop=True)
+
+
+# Fatia [inicio, fim) de um frame ordenado por "coluna"
+def recortar_periodo(df, coluna, inicio, fim):
+    if df.empty:
+        return df
+    datas = df[coluna].to_numpy()
+    primeira = datas.searchsorted(pd.Timestamp(inicio).to_datetime64(), side='left')
+    ultima = datas.searchsorted(pd.Timestamp(fim).to_datetime64(), side='left')
+    return df.iloc[primeira:ultima]
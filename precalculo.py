@@ -0,0 +1,255 @@
+import logging
+import threading
+import time as relogio
+from collections import namedtuple
+from datetime import date, timedelta
+from itertools import combinations
+
+import exportacao
+import graficos
+import metricas
+
+# ======================================
+# PRÉ-CÁLCULO DOS PERÍODOS PADRÃO
+# ======================================
+# Quase todo acesso usa o período inicial do painel (mês atual) ou o mês
+# anterior. A cada nova versão dos dados (ou das dimensões), uma thread do
+# processo calcula todos os agregados do painel para o mês atual, o mês
+# anterior e o ano até hoje, em todas as combinações de equipes, e os guarda
+# no cache compartilhado com as mesmas chaves do painel: a carga padrão da
+# página só lê o cache.
+#
+# AGREGADOS é a definição única de cada agregado memorizado: o painel calcula
+# por ela (ver agregado() em Dashboardchamados.py), assim como o pré-cálculo.
+#
+# Os recortes (frames com as linhas do filtro) só ficam no cache para a visão
+# inicial do painel (mês atual, todas as equipes): os do ano até hoje, um por
+# combinação de equipes, ocupariam quase todo o limite do cache. Nos demais
+# filtros, o pré-cálculo os usa e descarta; a visão recalcula só o recorte
+# (busca binária e filtro de equipes) e lê os agregados do cache.
+#
+# O cache do painel é dimensionado para todo o pré-cálculo (ver
+# entradas_precalculadas), e a visão inicial é calculada por último: se ainda
+# assim faltar espaço, o LRU descarta primeiro os outros filtros.
+
+logger = logging.getLogger('dashchamados.precalculo')
+
+# Acima disso, só todas as equipes juntas e cada uma sozinha (as combinações
+# crescem como 2^n)
+MAXIMO_EQUIPES_COMBINADAS = 4
+
+# Dados, dimensões, período e equipes de uma visão do painel
+Filtro = namedtuple('Filtro', ['estado', 'tabelas', 'data_inicio', 'data_fim', 'codigos_equipes'])
+
+# nome -> (calcular(filtro, obter), por_filtros), onde obter(nome) devolve
+# outro agregado (pelo cache); em ordem de dependência. Com por_filtros=False,
+# o valor vale para qualquer período e equipes (só depende da versão)
+AGREGADOS = {
+    'recorte': (lambda f, obter: metricas.recortar(
+        f.estado, f.data_inicio, f.data_fim, f.codigos_equipes), True),
+    'grafico1': (lambda f, obter: metricas.chamados_por_equipe(obter('recorte'), f.tabelas.equipes), True),
+    'grafico1:spec': (lambda f, obter: graficos.chamados_por_equipe(obter('grafico1')), True),
+    'grafico2': (lambda f, obter: metricas.chamados_abertos_por_operador(
+        obter('recorte'), f.tabelas.operadores), True),
+    'grafico2:spec': (lambda f, obter: graficos.chamados_abertos_por_operador(obter('grafico2')), True),
+    'grafico3': (lambda f, obter: metricas.chamados_iniciados_por_operador(
+        obter('recorte'), f.tabelas.operadores), True),
+    'grafico3:figura': (lambda f, obter: graficos.chamados_iniciados_por_operador(obter('grafico3')), True),
+    'grafico4': (lambda f, obter: metricas.chamados_por_meio(obter('recorte'), f.tabelas.meios_origem), True),
+    'grafico5': (lambda f, obter: metricas.acompanhamentos_por_operador(
+        obter('recorte'), f.tabelas.operadores, [20, 22]), True),
+    'grafico6': (lambda f, obter: metricas.chamados_finalizados_por_operador(
+        obter('recorte'), f.tabelas.operadores, f.tabelas.equipes_por_operador, 7), True),
+    'interacoes': (lambda f, obter: metricas.interacoes_por_chamado(f.estado), False),
+    'interacoes:recorte': (lambda f, obter: metricas.recortar_interacoes(
+        obter('interacoes'), f.data_inicio, f.data_fim, f.codigos_equipes), True),
+    'primeira_resposta': (lambda f, obter: metricas.primeira_resposta_por_operador(
+        obter('interacoes:recorte'), f.tabelas.operadores), True),
+    'trocas:equipes': (lambda f, obter: metricas.trocas_por_equipe(
+        obter('interacoes:recorte'), f.tabelas.equipes), True),
+    'trocas:operadores': (lambda f, obter: metricas.trocas_por_operador(
+        obter('interacoes:recorte'), f.tabelas.operadores), True),
+    'grafico7:equipes': (lambda f, obter: metricas.resolucao_por_equipe(obter('recorte'), f.tabelas.equipes), True),
+    'grafico7:operadores': (lambda f, obter: metricas.resolucao_por_operador(
+        obter('recorte'), f.tabelas.operadores), True),
+    'grafico7:backlog': (lambda f, obter: metricas.backlog_diario(
+        f.estado, f.data_inicio, f.data_fim, f.codigos_equipes), True),
+    'grafico7:spec_backlog': (lambda f, obter: graficos.backlog_diario(obter('grafico7:backlog')), True),
+    'grafico7:envelhecimento': (lambda f, obter: metricas.envelhecimento(
+        f.estado, f.data_fim, f.codigos_equipes, f.tabelas.equipes), True),
+}
+
+RECORTES = {'recorte', 'interacoes:recorte'}
+
+# Dados de cada botão de exportação do painel, pelo nome do arquivo; o
+# arquivo no formato inicial do botão (o primeiro de exportacao.FORMATOS)
+# também é pré-calculado
+EXPORTACOES = {
+    'chamados_por_equipe': lambda obter: obter('grafico1'),
+    'chamados_abertos_por_operador': lambda obter: obter('grafico2'),
+    'chamados_iniciados_por_operador': lambda obter: obter('grafico3'),
+    'primeira_resposta_por_operador': lambda obter: obter('primeira_resposta'),
+    'chamados_por_meio': lambda obter: obter('grafico4'),
+    'acompanhamentos_por_operador': lambda obter: obter('grafico5'),
+    'trocas_por_equipe': lambda obter: obter('trocas:equipes'),
+    'chamados_finalizados_por_operador': lambda obter: obter('grafico6')[1],
+    'resolucao_por_equipe': lambda obter: obter('grafico7:equipes'),
+    'backlog_diario': lambda obter: obter('grafico7:backlog'),
+    'envelhecimento': lambda obter: obter('grafico7:envelhecimento'),
+}
+FORMATO_INICIAL = next(iter(exportacao.FORMATOS))
+
+
+def nome_exportacao(nome, formato):
+    return f"exportar:{nome}:{formato}"
+
+
+def _exportar(dados, formato):
+    return lambda f, obter: exportacao.em_bytes(dados(obter), formato)
+
+
+for _nome, _dados in EXPORTACOES.items():
+    AGREGADOS[nome_exportacao(_nome, FORMATO_INICIAL)] = (_exportar(_dados, FORMATO_INICIAL), True)
+
+
+# Chave do agregado no cache compartilhado (a versão é acrescentada pelo cache)
+def chave(filtro, nome, por_filtros=True):
+    if not por_filtros:
+        return (nome,)
+    return (filtro.data_inicio, filtro.data_fim, filtro.codigos_equipes, nome)
+
+
+# Agregado "nome" do filtro, calculado (com suas dependências) só se ausente.
+# Com "transitorios" (um dict), os RECORTES ficam nele, fora do cache
+def obter_agregado(cache, versao, filtro, nome, transitorios=None):
+    calcular, por_filtros = AGREGADOS[nome]
+
+    def calcular_agregado():
+        return calcular(filtro, lambda dependencia: obter_agregado(cache, versao, filtro, dependencia, transitorios))
+
+    if transitorios is not None and nome in RECORTES:
+        if nome not in transitorios:
+            transitorios[nome] = calcular_agregado()
+        return transitorios[nome]
+    return cache.obter(versao, chave(filtro, nome, por_filtros), calcular_agregado)
+
+
+# Mês atual, mês anterior e ano até hoje, limitados à última data dos dados
+# como os filtros de data do painel; 'mes_atual' é o período inicial do painel
+def periodos_padrao(hoje, data_maxima):
+    primeiro_dia_mes = hoje.replace(day=1)
+    ultimo_dia_mes = (primeiro_dia_mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    ultimo_dia_anterior = primeiro_dia_mes - timedelta(days=1)
+    periodos = {
+        'mes_atual': (primeiro_dia_mes, ultimo_dia_mes),
+        'mes_anterior': (ultimo_dia_anterior.replace(day=1), ultimo_dia_anterior),
+        'ano': (hoje.replace(month=1, day=1), hoje),
+    }
+    return {nome: (min(inicio, data_maxima), min(fim, data_maxima)) for nome, (inicio, fim) in periodos.items()}
+
+
+# Códigos das equipes como o painel os filtra (tuplas ordenadas), da seleção
+# com todas as equipes (a padrão) para as menores
+def combinacoes_equipes(codigos_equipes, maximo=MAXIMO_EQUIPES_COMBINADAS):
+    codigos = sorted(int(codigo) for codigo in codigos_equipes)
+    if len(codigos) > maximo:
+        return [tuple(codigos)] + [(codigo,) for codigo in codigos]
+    return [combinacao for tamanho in range(len(codigos), 0, -1) for combinacao in combinations(codigos, tamanho)]
+
+
+# Entradas do cache ocupadas pelo pré-cálculo de uma versão (no máximo: os
+# recortes dos outros filtros e os agregados que não dependem dos filtros
+# ocupam menos); o cache do painel precisa disso mais os filtros das sessões
+def entradas_precalculadas(codigos_equipes):
+    hoje = date.today()
+    return len(periodos_padrao(hoje, hoje)) * len(combinacoes_equipes(codigos_equipes)) * len(AGREGADOS)
+
+
+class Precalculador:
+    # fonte: objeto com estado() (Sincronizador ou LeitorEstado)
+    # cache: CacheCompartilhado do painel
+    # dimensoes: objeto com atual() (o CarregadorDimensoes do painel)
+    def __init__(self, fonte, cache, dimensoes, intervalo=1.0):
+        self.fonte = fonte
+        self.cache = cache
+        self.dimensoes = dimensoes
+        self.intervalo = intervalo
+        # Resumo do último pré-cálculo (versão, filtros, agregados, duração)
+        self.situacao = {}
+
+        self._feito = None
+        self._thread = None
+        self._parar = threading.Event()
+
+    # Calcula os agregados dos períodos padrão, se a versão dos dados, a das
+    # dimensões ou o dia (os períodos) mudaram desde a última vez
+    def precalcular(self, hoje=None):
+        estado = self.fonte.estado()
+        tabelas = self.dimensoes.atual()
+        versao = (estado.versao, tabelas.versao)
+        hoje = hoje or date.today()
+        if (versao, hoje) == self._feito or estado.chamados.empty:
+            return False
+        periodos = periodos_padrao(hoje, estado.chamados['dtchamado'].max().date())
+
+        # Limitados à última data dos dados, os períodos podem coincidir. O
+        # primeiro filtro é a visão inicial do painel (mês atual, todas as
+        # equipes), a única que guarda os recortes; ela vai por último, para
+        # ser a última a sair do cache pelo LRU
+        filtros = [(data_inicio, data_fim, codigos_equipes)
+                   for data_inicio, data_fim in dict.fromkeys(periodos.values())
+                   for codigos_equipes in combinacoes_equipes(tabelas.equipes)]
+        filtros = filtros[1:] + filtros[:1]
+        if len(filtros) * len(AGREGADOS) > self.cache.max_entradas:
+            logger.warning("o pré-cálculo (%s filtros) não cabe no cache (%s entradas)",
+                           len(filtros), self.cache.max_entradas)
+
+        inicio = relogio.perf_counter()
+        self.cache.invalidar(versao)
+        for data_inicio, data_fim, codigos_equipes in filtros:
+            filtro = Filtro(estado, tabelas, data_inicio, data_fim, codigos_equipes)
+            inicial = (data_inicio, data_fim, codigos_equipes) == filtros[-1]
+            transitorios = None if inicial else {}
+            try:
+                for nome in AGREGADOS:
+                    obter_agregado(self.cache, versao, filtro, nome, transitorios)
+            except Exception:
+                logger.exception("falha no pré-cálculo de %s a %s, equipes %s",
+                                 data_inicio, data_fim, codigos_equipes)
+
+        self._feito = (versao, hoje)
+        self.situacao = {
+            'versao': versao,
+            'filtros': len(filtros),
+            'agregados': len(filtros) * len(AGREGADOS),
+            'duracao': relogio.perf_counter() - inicio,
+        }
+        logger.info("versão %s pré-calculada: %s filtros em %.1f s", versao, len(filtros),
+                    self.situacao['duracao'])
+        return True
+
+    # ======================================
+    # PRÉ-CÁLCULO EM SEGUNDO PLANO
+    # ======================================
+    # Uma thread do processo verifica a versão a cada "intervalo" segundos
+
+    def _executar_periodicamente(self):
+        while not self._parar.is_set():
+            try:
+                self.precalcular()
+            except Exception:
+                logger.exception("falha no pré-cálculo")
+            self._parar.wait(self.intervalo)
+
+    def iniciar_em_segundo_plano(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar_periodicamente,
+                                        name='precalculo', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+import consultas
+import dimensoes
+
+# ======================================
+# TEMPO DE RESOLUÇÃO, BACKLOG E ENVELHECIMENTO
+# ======================================
+# Indicadores de SLA a partir de dtchamado e dttermino, calculados só com
+# operações vetorizadas do numpy sobre as datas como int64 (nanossegundos):
+#
+# - percentis do tempo de resolução por grupo: uma única ordenação por grupo
+#   e duração e a interpolação das posições de cada percentil;
+# - backlog diário: aberturas acumuladas (busca binária, o frame já está
+#   ordenado por dtchamado) menos fechamentos acumulados (bincount dos dias
+#   de término numa grade diária e soma acumulada);
+# - envelhecimento: idade dos chamados abertos numa data, em faixas de dias.
+#
+# Um chamado está aberto enquanto dttermino for nulo (como nas marcas d'água
+# da sincronização).
+
+NANOSSEGUNDOS_MS = 10**6
+NANOSSEGUNDOS_HORA = 3600 * 10**9
+NANOSSEGUNDOS_DIA = 24 * NANOSSEGUNDOS_HORA
+MILISSEGUNDOS_HORA = 3600 * 1000
+# Valor int64 de NaT
+_NAT = np.iinfo(np.int64).min
+
+PERCENTIS = (0.5, 0.9, 0.95)
+
+# Limites das faixas de idade, em dias
+FAIXAS_IDADE = (1, 3, 7, 15, 30)
+
+
+def _datas(serie):
+    return serie.to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+def _codigos(serie):
+    return serie.to_numpy(dtype='int64', na_value=dimensoes.NULO)
+
+
+# Duração de cada chamado em horas (NaN para os ainda abertos)
+def duracao_horas(df_chamados):
+    abertura = _datas(df_chamados['dtchamado'])
+    termino = _datas(df_chamados['dttermino'])
+    resolvido = (termino != _NAT) & (abertura != _NAT)
+    return np.where(resolvido, (termino - abertura) / NANOSSEGUNDOS_HORA, np.nan)
+
+
+# Quantidade, média e percentis (em horas) de durações em ms por código de
+# grupo; os grupos saem em ordem crescente de código
+def percentis_por_grupo(codigos, duracao, coluna, percentis=PERCENTIS):
+    nomes_percentis = [f"p{round(p * 100)}_horas" for p in percentis]
+    if len(codigos) == 0:
+        return pd.DataFrame({nome: pd.Series(dtype='float64') for nome in
+                             [coluna, 'quantidade', 'media_horas', *nomes_percentis]})
+
+    # Ordena por grupo e duração: numa única chave inteira (grupo, duração em
+    # ms) quando cabe em int64, o que é bem mais rápido que o lexsort
+    menor_codigo = int(codigos.min())
+    codigos = codigos - menor_codigo
+    menor_duracao = int(duracao.min())
+    amplitude = int(duracao.max()) - menor_duracao + 1
+    if (int(codigos.max()) + 1) * amplitude < 2**62:
+        chave = np.sort(codigos * amplitude + (duracao - menor_duracao))
+        codigos, duracao = chave // amplitude, chave % amplitude + menor_duracao
+    else:
+        ordem = np.lexsort((duracao, codigos))
+        codigos, duracao = codigos[ordem], duracao[ordem]
+    horas = duracao / MILISSEGUNDOS_HORA
+
+    # Início e tamanho de cada grupo no vetor ordenado
+    inicios = np.flatnonzero(np.diff(codigos, prepend=-1))
+    quantidade = np.diff(inicios, append=len(codigos))
+    resultado = pd.DataFrame({
+        coluna: codigos[inicios] + menor_codigo,
+        'quantidade': quantidade,
+        'media_horas': np.add.reduceat(horas, inicios) / quantidade,
+    })
+    for nome, percentil in zip(nomes_percentis, percentis):
+        # Interpolação linear entre as posições vizinhas (como numpy.percentile)
+        posicao = inicios + percentil * (quantidade - 1)
+        abaixo = np.floor(posicao).astype('int64')
+        acima = np.minimum(abaixo + 1, inicios + quantidade - 1)
+        resultado[nome] = horas[abaixo] + (horas[acima] - horas[abaixo]) * (posicao - abaixo)
+    return resultado
+
+
+# Quantidade de chamados, resolvidos, média e percentis (em horas) do tempo de
+# resolução por valor de "coluna" (ex.: cdequipe, cdresponsavel)
+def percentis_resolucao(df_chamados, coluna, percentis=PERCENTIS):
+    nomes_percentis = [f"p{round(p * 100)}_horas" for p in percentis]
+    if df_chamados.empty:
+        return pd.DataFrame(columns=[coluna, 'chamados', 'resolvidos', 'media_horas', *nomes_percentis])
+
+    codigos = _codigos(df_chamados[coluna])
+    grupos, chamados = np.unique(codigos, return_counts=True)
+
+    abertura = _datas(df_chamados['dtchamado'])
+    termino = _datas(df_chamados['dttermino'])
+    resolvido = (termino != _NAT) & (abertura != _NAT)
+    resolucao = percentis_por_grupo(codigos[resolvido],
+                                    (termino[resolvido] - abertura[resolvido]) // NANOSSEGUNDOS_MS,
+                                    coluna, percentis)
+
+    resultado = pd.DataFrame({coluna: grupos, 'chamados': chamados}).merge(
+        resolucao.rename(columns={'quantidade': 'resolvidos'}), on=coluna, how='left')
+    resultado['resolvidos'] = resultado['resolvidos'].fillna(0).astype('int64')
+    return resultado
+
+
+# Máscara das equipes selecionadas (sem copiar o frame)
+def _das_equipes(df_chamados, codigos_equipes):
+    return df_chamados['cdequipe'].isin(list(codigos_equipes)).to_numpy(dtype=bool)
+
+
+# Aberturas, fechamentos e backlog (chamados abertos no fim do dia) de cada
+# dia do período. Usa o frame inteiro, ordenado por dtchamado: o backlog do
+# primeiro dia inclui os chamados abertos antes do período
+def backlog_diario(df_chamados, data_inicio, data_fim, codigos_equipes=None):
+    inicio, fim = consultas.limites_periodo(data_inicio, data_fim)
+    dias = pd.date_range(inicio, fim, freq='D', inclusive='left')
+    if df_chamados.empty:
+        return pd.DataFrame({'dia': dias, 'abertos': 0, 'fechados': 0, 'backlog': 0})
+
+    abertura = _datas(df_chamados['dtchamado'])
+    termino = _datas(df_chamados['dttermino'])
+    if codigos_equipes is not None:
+        selecionados = _das_equipes(df_chamados, codigos_equipes)
+        abertura, termino = abertura[selecionados], termino[selecionados]
+    # Continua ordenado depois de retirar os NaT (que ficam no final)
+    abertura = abertura[abertura != _NAT]
+    termino = termino[termino != _NAT]
+
+    limites = np.append(dias.to_numpy().view('int64'), pd.Timestamp(fim).value)
+    abertos_ate = np.searchsorted(abertura, limites, side='left')
+
+    dia_termino = (termino - limites[0]) // NANOSSEGUNDOS_DIA
+    fechados_antes = int((dia_termino < 0).sum())
+    no_periodo = dia_termino[(dia_termino >= 0) & (dia_termino < len(dias))]
+    fechados_por_dia = np.bincount(no_periodo, minlength=len(dias))
+
+    return pd.DataFrame({
+        'dia': dias,
+        'abertos': np.diff(abertos_ate),
+        'fechados': fechados_por_dia,
+        'backlog': abertos_ate[1:] - (fechados_antes + np.cumsum(fechados_por_dia)),
+    })
+
+
+def rotulos_faixas(faixas=FAIXAS_IDADE):
+    rotulos = [f"até {faixas[0]} dia{'s' if faixas[0] > 1 else ''}"]
+    rotulos += [f"{anterior} a {limite} dias" for anterior, limite in zip(faixas, faixas[1:])]
+    rotulos.append(f"mais de {faixas[-1]} dias")
+    return rotulos
+
+
+# Chamados abertos em "referencia" por equipe e faixa de idade (em dias)
+def envelhecimento(df_chamados, referencia, codigos_equipes=None, faixas=FAIXAS_IDADE):
+    rotulos = rotulos_faixas(faixas)
+    if df_chamados.empty:
+        return pd.DataFrame(columns=['cdequipe', 'faixa', 'total'])
+
+    referencia = pd.Timestamp(referencia).value
+    abertura = _datas(df_chamados['dtchamado'])
+    validos = len(abertura) - int(df_chamados['dtchamado'].isna().sum())
+    # Abertos até a referência: prefixo do frame ordenado
+    ate = int(np.searchsorted(abertura[:validos], referencia, side='right'))
+    df_chamados = df_chamados.iloc[:ate]
+    termino = _datas(df_chamados['dttermino'])
+    aberto = (termino == _NAT) | (termino > referencia)
+    if codigos_equipes is not None:
+        aberto &= _das_equipes(df_chamados, codigos_equipes)
+
+    idade_dias = (referencia - abertura[:ate][aberto]) / NANOSSEGUNDOS_DIA
+    faixa = np.searchsorted(np.asarray(faixas, dtype=float), idade_dias, side='left')
+    equipes, equipe = np.unique(_codigos(df_chamados['cdequipe'])[aberto], return_inverse=True)
+
+    contagem = np.bincount(equipe * len(rotulos) + faixa, minlength=len(equipes) * len(rotulos))
+    return pd.DataFrame({
+        'cdequipe': np.repeat(equipes, len(rotulos)),
+        'faixa': pd.Categorical(np.tile(rotulos, len(equipes)), categories=rotulos, ordered=True),
+        'total': contagem,
+    })
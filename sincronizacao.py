@@ -0,0 +1,485 @@
+import logging
+import threading
+from collections import namedtuple
+import time as relogio
+from datetime import datetime
+
+import pandas as pd
+
+import armazenamento as armazenamento_snapshot
+import consultas
+import cubo
+import eventos
+import periodo
+
+logger = logging.getLogger('dashchamados.sincronizacao')
+
+# ======================================
+# SINCRONIZAÇÃO INCREMENTAL (DELTA)
+# ======================================
+# Mantém um snapshot local de hd_chamado e hd_acompanhamento e, a cada
+# atualização, busca no banco apenas as linhas novas ou alteradas desde as
+# marcas d'água (high-water marks) da última sincronização.
+
+# Data usada como marca quando ainda não há nenhum registro no snapshot
+DATA_INICIAL = datetime(1900, 1, 1)
+
+
+# Primeiro dia do mês "meses" meses antes do mês de "hoje": início do
+# histórico mantido no snapshot (None: todo o histórico)
+def inicio_historico(meses, hoje=None):
+    if not meses:
+        return None
+    hoje = hoje or datetime.now()
+    indice = hoje.year * 12 + hoje.month - 1 - meses
+    return datetime(indice // 12, indice % 12 + 1, 1)
+
+
+# Marcas d'água calculadas a partir do snapshot atual
+def calcular_marcas(df_chamados, df_acompanhamentos):
+    marcas = {
+        'ultimo_cdchamado': 0,
+        'ultimo_termino': DATA_INICIAL,
+        'menor_aberto': 0,
+        'ultima_data_acompanhamento': DATA_INICIAL,
+    }
+
+    if not df_chamados.empty:
+        marcas['ultimo_cdchamado'] = int(df_chamados['cdchamado'].max())
+        ultimo_termino = df_chamados['dttermino'].max()
+        if pd.notna(ultimo_termino):
+            marcas['ultimo_termino'] = ultimo_termino.to_pydatetime()
+        abertos = df_chamados.loc[df_chamados['dttermino'].isna(), 'cdchamado']
+        marcas['menor_aberto'] = int(abertos.min()) if not abertos.empty else marcas['ultimo_cdchamado'] + 1
+
+    if not df_acompanhamentos.empty:
+        ultima_data = df_acompanhamentos['dtacompanhamento'].max()
+        if pd.notna(ultima_data):
+            marcas['ultima_data_acompanhamento'] = ultima_data.to_pydatetime()
+
+    return marcas
+
+
+# O delta de chamados sempre traz os abertos; mantém só os que mudaram de fato
+def filtrar_chamados_alterados(df_chamados, delta):
+    if delta.empty or df_chamados.empty:
+        return delta
+    anteriores = df_chamados[df_chamados['cdchamado'].isin(delta['cdchamado'])]
+    comparacao = delta.merge(anteriores, on=list(delta.columns), how='left', indicator=True)
+    alterados = comparacao.loc[comparacao['_merge'] == 'left_only', 'cdchamado']
+    return delta[delta['cdchamado'].isin(alterados)]
+
+
+# O delta de acompanhamentos relê os registros da data da marca; só há
+# novidade se vierem registros posteriores ou se a quantidade nessa data mudou
+def acompanhamentos_alterados(df_acompanhamentos, delta, ultima_data):
+    if delta.empty:
+        return False
+    if (delta['dtacompanhamento'] > ultima_data).any():
+        return True
+    na_marca = (df_acompanhamentos['dtacompanhamento'] == ultima_data).sum() if not df_acompanhamentos.empty else 0
+    return len(delta) != na_marca
+
+
+# Substitui no snapshot os chamados que vieram no delta (upsert por cdchamado)
+def mesclar_chamados(df_chamados, delta):
+    if delta.empty:
+        return df_chamados
+    if df_chamados.empty:
+        return delta.reset_index(drop=True)
+    mantidos = df_chamados[~df_chamados['cdchamado'].isin(delta['cdchamado'])]
+    return pd.concat([mantidos, delta], ignore_index=True)
+
+
+# Os acompanhamentos são apenas inseridos; os registros na data da marca são
+# relidos por inteiro, então os do snapshot nessa data são descartados
+def mesclar_acompanhamentos(df_acompanhamentos, delta, ultima_data):
+    if delta.empty:
+        return df_acompanhamentos
+    if df_acompanhamentos.empty:
+        return delta.reset_index(drop=True)
+    mantidos = df_acompanhamentos[~(df_acompanhamentos['dtacompanhamento'] >= ultima_data)]
+    return pd.concat([mantidos, delta], ignore_index=True)
+
+
+def normalizar_filtros(codigos_equipes, operadores):
+    return {
+        'codigos_equipes': sorted(int(c) for c in codigos_equipes) if codigos_equipes is not None else None,
+        'operadores': sorted(int(c) for c in operadores) if operadores is not None else None,
+    }
+
+
+# Tudo o que é publicado a cada sincronização: frames do snapshot, estruturas
+# derivadas (cubos e eventos) e a versão dos dados
+Estado = namedtuple('Estado', [
+    'chamados', 'acompanhamentos', 'cubo_chamados', 'cubo_acompanhamentos',
+    'eventos_atendimento', 'versao'
+])
+
+
+# Sem derivados informados, cubos e eventos são montados do zero a partir dos
+# frames. Tudo fica ordenado por data para o recorte por busca binária
+def montar_estado(df_chamados, df_acompanhamentos, operadores=None, versao=1,
+                  cubos=None, eventos_atendimento=None):
+    df_chamados = periodo.ordenar_por_data(df_chamados, 'dtchamado')
+    df_acompanhamentos = periodo.ordenar_por_data(df_acompanhamentos, 'dtacompanhamento')
+    if cubos is None:
+        cubos = (cubo.agregar_chamados(df_chamados, operadores),
+                 cubo.agregar_acompanhamentos(df_acompanhamentos, operadores))
+    if eventos_atendimento is None:
+        eventos_atendimento = eventos.extrair_eventos_atendimento(df_acompanhamentos)
+    cubo_chamados, cubo_acompanhamentos = (periodo.ordenar_por_data(c, 'dia') for c in cubos)
+    return Estado(df_chamados, df_acompanhamentos, cubo_chamados, cubo_acompanhamentos,
+                  eventos_atendimento, versao)
+
+
+class Sincronizador:
+    def __init__(self, pool, codigos_equipes=None, operadores=None,
+                 intervalo=60, intervalo_completo=24 * 3600, armazenamento=None, publicador=None,
+                 meses_historico=None, meses_reconciliacao=None):
+        # pool: PoolConexoes usado para buscar as tabelas em paralelo
+        # armazenamento: ArmazenamentoSnapshot opcional para persistir o snapshot em disco
+        # publicador: PublicadorEstado opcional, que expõe cada versão às
+        # réplicas do painel (ver memoria_compartilhada.py)
+        # meses_historico: meses completos antes do atual mantidos no snapshot;
+        # None traz todo o histórico das equipes e operadores. O início avança
+        # a cada carga completa; chamados abertos antes dele ficam de fora
+        # (inclusive do backlog), mesmo que ainda estejam em aberto
+        # meses_reconciliacao: meses relidos do banco a cada "intervalo_completo"
+        # (ver reconciliar); None relê todo o histórico
+        self.pool = pool
+        self.armazenamento = armazenamento
+        self.publicador = publicador
+        self.codigos_equipes = codigos_equipes
+        self.operadores = operadores
+        self.intervalo = intervalo
+        self.intervalo_completo = intervalo_completo
+        self.meses_historico = meses_historico
+        self.meses_reconciliacao = meses_reconciliacao
+        self.inicio = inicio_historico(meses_historico)
+
+        self._trava = threading.Lock()
+        self._estado = Estado(pd.DataFrame(), pd.DataFrame(),
+                              cubo.cubo_vazio(cubo.DIMENSOES_CHAMADOS),
+                              cubo.cubo_vazio(cubo.DIMENSOES_ACOMPANHAMENTOS),
+                              eventos.eventos_vazios(), 0)
+        self.marcas = None
+        self.ultima_sincronizacao = None
+        self.ultima_carga_completa = None
+        # Linhas, tempos, linhas/s e pico de memória da última busca de cada
+        # tabela, e o tempo de montagem dos derivados (cubos e eventos)
+        self.estatisticas = {'chamados': {}, 'acompanhamentos': {}, 'derivados': {}}
+        # Resultado da última atualização (horário, duração, linhas, erro),
+        # substituído por inteiro a cada tentativa
+        self.situacao = {}
+
+        self._thread = None
+        self._parar = threading.Event()
+        self._primeira_tentativa = threading.Event()
+
+    # O estado é publicado numa única atribuição e seus frames nunca são
+    # alterados depois de publicados
+    def estado(self):
+        return self._estado
+
+    def dados(self):
+        estado = self._estado
+        return estado.chamados, estado.acompanhamentos, estado.versao
+
+    def cubos(self):
+        estado = self._estado
+        return estado.cubo_chamados, estado.cubo_acompanhamentos, estado.versao
+
+    def eventos(self):
+        estado = self._estado
+        return estado.eventos_atendimento, estado.versao
+
+    @property
+    def versao(self):
+        return self._estado.versao
+
+    def _publicar(self, df_chamados, df_acompanhamentos, cubos=None, eventos_atendimento=None):
+        inicio = relogio.perf_counter()
+        estado = montar_estado(df_chamados, df_acompanhamentos, self.operadores,
+                               self.versao + 1, cubos, eventos_atendimento)
+        self.estatisticas['derivados'] = {
+            'linhas': len(estado.cubo_chamados) + len(estado.cubo_acompanhamentos) + len(estado.eventos_atendimento),
+            'segundos': relogio.perf_counter() - inicio,
+        }
+        self.marcas = calcular_marcas(estado.chamados, estado.acompanhamentos)
+        self._estado = estado
+
+    # Equipes e operadores usados nas consultas (listas ordenadas, ou None) e
+    # o início do histórico, gravados com o snapshot
+    def filtros(self):
+        return dict(normalizar_filtros(self.codigos_equipes, self.operadores),
+                    inicio=self.inicio.isoformat() if self.inicio is not None else None)
+
+    # Troca os filtros das consultas (ex.: novas tabelas de dimensão); se
+    # mudarem, a próxima atualização é uma carga completa. Sem mudança, não
+    # espera pela trava (que pode estar com uma sincronização em andamento)
+    def definir_filtros(self, codigos_equipes, operadores):
+        if normalizar_filtros(codigos_equipes, operadores) == normalizar_filtros(self.codigos_equipes,
+                                                                                 self.operadores):
+            return False
+        with self._trava:
+            self.codigos_equipes = codigos_equipes
+            self.operadores = operadores
+            self.ultima_carga_completa = None
+            self.ultima_sincronizacao = None
+        return True
+
+    # Snapshot gravado com as mesmas equipes e operadores e com um histórico
+    # que cobre o atual (o início pode ter avançado desde a gravação)
+    def _snapshot_serve(self, filtros):
+        if not filtros or {**filtros, 'inicio': None} != {**self.filtros(), 'inicio': None}:
+            return False
+        if self.inicio is None:
+            return filtros.get('inicio') is None
+        return filtros.get('inicio') is None or datetime.fromisoformat(filtros['inicio']) <= self.inicio
+
+    # Partida a frio a partir do snapshot em disco, sem consultar o banco: só
+    # as partições a partir do início do histórico são lidas. Um snapshot
+    # gravado com outras colunas ou outros filtros é ignorado (vale a carga
+    # completa)
+    def carregar_do_disco(self):
+        metadados = self.armazenamento.ler_metadados()
+        if not self._snapshot_serve(metadados.get('filtros')):
+            return
+        df_chamados, df_acompanhamentos = self.armazenamento.ler(inicio=self.inicio)
+        if (not set(consultas.TIPOS_CHAMADOS) <= set(df_chamados.columns)
+                or not set(consultas.TIPOS_ACOMPANHAMENTOS) <= set(df_acompanhamentos.columns)):
+            return
+        self._publicar(df_chamados, df_acompanhamentos)
+        self.ultima_carga_completa = metadados.get('carga_completa_em')
+
+    def carregar_completo(self):
+        self.inicio = inicio_historico(self.meses_historico)
+        marcas_vazias = calcular_marcas(pd.DataFrame(), pd.DataFrame())
+        df_chamados, df_acompanhamentos = self._buscar_tabelas(marcas_vazias)
+        self._publicar(df_chamados, df_acompanhamentos)
+        self.ultima_carga_completa = relogio.time()
+
+        if self.armazenamento is not None:
+            self.armazenamento.salvar(self._estado.chamados, self._estado.acompanhamentos, self.versao,
+                                      carga_completa_em=self.ultima_carga_completa,
+                                      filtros=self.filtros())
+
+    # Reconciliação periódica: os deltas não veem exclusões nem alterações em
+    # chamados já encerrados, então a cada "intervalo_completo" os últimos
+    # "meses_reconciliacao" meses são relidos do banco (com o filtro de data
+    # no SQL) e substituem os do snapshot; o histórico anterior fica como
+    # está (chamados antigos ainda abertos continuam vindo pelos deltas).
+    # Sem janela, é uma carga completa
+    def reconciliar(self):
+        if not self.meses_reconciliacao or self._estado.chamados.empty:
+            self.carregar_completo()
+            return
+        self.inicio = inicio_historico(self.meses_historico)
+        janela = inicio_historico(self.meses_reconciliacao)
+        if self.inicio is not None:
+            janela = max(janela, self.inicio)
+
+        marcas_vazias = calcular_marcas(pd.DataFrame(), pd.DataFrame())
+        novos_chamados, novos_acompanhamentos = self._buscar_tabelas(marcas_vazias, janela)
+
+        # Histórico anterior à janela (e, com histórico limitado, a partir do início)
+        def anteriores(df, coluna):
+            datas = df[coluna]
+            mantidos = datas < janela if self.inicio is not None else ~(datas >= janela)
+            if self.inicio is not None:
+                mantidos &= datas >= self.inicio
+            return df[mantidos]
+
+        estado = self._estado
+        df_chamados = pd.concat([anteriores(estado.chamados, 'dtchamado'), novos_chamados], ignore_index=True)
+        df_acompanhamentos = pd.concat([anteriores(estado.acompanhamentos, 'dtacompanhamento'),
+                                        novos_acompanhamentos], ignore_index=True)
+        self._publicar(df_chamados, df_acompanhamentos)
+        self.ultima_carga_completa = relogio.time()
+
+        # Regrava as partições da janela e remove as anteriores ao início
+        if self.armazenamento is not None:
+            mes_janela = f"{janela:%Y-%m}"
+            mes_inicio = f"{self.inicio:%Y-%m}" if self.inicio is not None else None
+            meses_alterados = {}
+            for tabela, coluna, novos in (('chamados', 'dtchamado', novos_chamados),
+                                          ('acompanhamentos', 'dtacompanhamento', novos_acompanhamentos)):
+                meses_alterados[tabela] = armazenamento_snapshot.meses_das_datas(novos[coluna]) | {
+                    mes for mes in self.armazenamento.meses(tabela)
+                    if mes >= mes_janela or (mes_inicio is not None and mes < mes_inicio)}
+            self.armazenamento.salvar(self._estado.chamados, self._estado.acompanhamentos, self.versao,
+                                      meses_alterados, carga_completa_em=self.ultima_carga_completa,
+                                      filtros=self.filtros())
+
+    def carregar_delta(self):
+        marcas = self.marcas
+        estado = self._estado
+        df_chamados, df_acompanhamentos = estado.chamados, estado.acompanhamentos
+        ultima_data = marcas['ultima_data_acompanhamento']
+
+        delta_chamados, delta_acompanhamentos = self._buscar_tabelas(marcas)
+        delta_chamados = filtrar_chamados_alterados(df_chamados, delta_chamados)
+        if not acompanhamentos_alterados(df_acompanhamentos, delta_acompanhamentos, ultima_data):
+            delta_acompanhamentos = delta_acompanhamentos.iloc[0:0]
+
+        if delta_chamados.empty and delta_acompanhamentos.empty:
+            return False
+
+        # Atualiza os cubos só com as linhas que entram e saem do snapshot
+        if not df_chamados.empty:
+            chamados_removidos = df_chamados[df_chamados['cdchamado'].isin(delta_chamados['cdchamado'])]
+        else:
+            chamados_removidos = df_chamados
+        if not delta_acompanhamentos.empty and not df_acompanhamentos.empty:
+            acompanhamentos_removidos = df_acompanhamentos[df_acompanhamentos['dtacompanhamento'] >= ultima_data]
+        else:
+            acompanhamentos_removidos = df_acompanhamentos.iloc[0:0]
+
+        cubos = (
+            cubo.atualizar_cubo(estado.cubo_chamados,
+                                cubo.agregar_chamados(delta_chamados, self.operadores),
+                                cubo.agregar_chamados(chamados_removidos, self.operadores),
+                                cubo.DIMENSOES_CHAMADOS),
+            cubo.atualizar_cubo(estado.cubo_acompanhamentos,
+                                cubo.agregar_acompanhamentos(delta_acompanhamentos, self.operadores),
+                                cubo.agregar_acompanhamentos(acompanhamentos_removidos, self.operadores),
+                                cubo.DIMENSOES_ACOMPANHAMENTOS),
+        )
+
+        eventos_atendimento = eventos.atualizar_eventos(
+            estado.eventos_atendimento, delta_acompanhamentos, ultima_data)
+
+        df_chamados = mesclar_chamados(df_chamados, delta_chamados)
+        df_acompanhamentos = mesclar_acompanhamentos(df_acompanhamentos, delta_acompanhamentos, ultima_data)
+        self._publicar(df_chamados, df_acompanhamentos, cubos, eventos_atendimento)
+
+        # Regrava apenas as partições mensais tocadas pelo delta
+        if self.armazenamento is not None:
+            meses_alterados = {
+                'chamados': armazenamento_snapshot.meses_das_datas(delta_chamados['dtchamado']),
+                'acompanhamentos': armazenamento_snapshot.meses_das_datas(delta_acompanhamentos['dtacompanhamento']),
+            }
+            if not delta_acompanhamentos.empty:
+                meses_alterados['acompanhamentos'] |= armazenamento_snapshot.meses_das_datas([ultima_data])
+            estado = self._estado
+            self.armazenamento.salvar(estado.chamados, estado.acompanhamentos, self.versao, meses_alterados)
+        return True
+
+    def _buscar_chamados(self, conn, marcas, inicio):
+        query, parametros = consultas.montar_consulta_chamados_delta(
+            marcas['ultimo_cdchamado'], marcas['ultimo_termino'],
+            marcas['menor_aberto'], self.codigos_equipes, inicio)
+        return consultas.executar_consulta_chamados(
+            conn, query, parametros, estatisticas=self.estatisticas['chamados'])
+
+    def _buscar_acompanhamentos(self, conn, marcas, inicio):
+        query, parametros = consultas.montar_consulta_acompanhamentos_delta(
+            marcas['ultima_data_acompanhamento'], self.operadores, inicio)
+        return consultas.executar_consulta_acompanhamentos(
+            conn, query, parametros, estatisticas=self.estatisticas['acompanhamentos'])
+
+    # As duas tabelas são buscadas em paralelo, cada uma com uma conexão do
+    # pool; "inicio" (por padrão, o do histórico) limita as datas no SQL
+    def _buscar_tabelas(self, marcas, inicio=None):
+        inicio = inicio or self.inicio
+        return self.pool.executar_em_paralelo([
+            lambda conn: self._buscar_chamados(conn, marcas, inicio),
+            lambda conn: self._buscar_acompanhamentos(conn, marcas, inicio),
+        ])
+
+    # Carga completa na primeira vez (e periodicamente, para refletir exclusões);
+    # nas demais, apenas o delta desde as marcas d'água
+    def _atualizar(self):
+        # Mesmo em caso de falha, a próxima tentativa espera o intervalo
+        agora = relogio.time()
+        situacao = dict(self.situacao, erro=None)
+        try:
+            # Um snapshot ilegível (ex.: arquivo corrompido) é descartado: a
+            # carga completa abaixo busca tudo no banco e o regrava
+            if self.marcas is None and self.armazenamento is not None and self.armazenamento.existe():
+                try:
+                    self.carregar_do_disco()
+                except Exception as e:
+                    logger.exception("snapshot em disco ilegível; carga completa do banco")
+                    situacao['erro_snapshot'] = str(e)
+
+            # Sem snapshot, ou com outros filtros, busca tudo; depois, o delta
+            # a cada intervalo e a reconciliação da janela a cada intervalo_completo
+            if self.marcas is None or self.ultima_carga_completa is None:
+                self.carregar_completo()
+                alterado = True
+            elif agora - self.ultima_carga_completa >= self.intervalo_completo:
+                self.reconciliar()
+                alterado = True
+            else:
+                alterado = self.carregar_delta()
+            estado = self._estado
+            situacao.update(atualizado_em=agora, duracao=relogio.time() - agora,
+                            linhas_chamados=len(estado.chamados),
+                            linhas_acompanhamentos=len(estado.acompanhamentos))
+            if self.publicador is not None:
+                if self.publicador.versao_publicada != estado.versao:
+                    self.publicador.publicar(estado, situacao, self.estatisticas)
+                else:
+                    self.publicador.publicar_situacao(situacao, self.estatisticas)
+            return alterado
+        except Exception as e:
+            situacao['erro'] = str(e)
+            if self.publicador is not None:
+                self.publicador.publicar_situacao(situacao, self.estatisticas)
+            raise
+        finally:
+            self.ultima_sincronizacao = agora
+            self.situacao = situacao
+
+    def atualizar(self):
+        with self._trava:
+            return self._atualizar()
+
+    def _vencido(self):
+        return (self.ultima_sincronizacao is None
+                or relogio.time() - self.ultima_sincronizacao >= self.intervalo)
+
+    # Várias sessões podem chamar ao mesmo tempo; só a primeira sincroniza
+    def atualizar_se_necessario(self):
+        if not self._vencido():
+            return False
+        with self._trava:
+            if not self._vencido():
+                return False
+            return self._atualizar()
+
+    # ======================================
+    # ATUALIZAÇÃO EM SEGUNDO PLANO
+    # ======================================
+    # Uma thread do processo sincroniza a cada "intervalo"; as sessões apenas
+    # leem o último estado publicado, sem esperar pelo banco
+
+    def _executar_periodicamente(self):
+        while not self._parar.is_set():
+            try:
+                self.atualizar_se_necessario()
+            except Exception:
+                pass  # o erro fica registrado em self.situacao
+            finally:
+                self._primeira_tentativa.set()
+            self._parar.wait(self.intervalo)
+
+    def iniciar_em_segundo_plano(self):
+        with self._trava:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar_periodicamente,
+                                            name='sincronizacao', daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    # Na partida, espera a primeira tentativa de carga (com ou sem sucesso)
+    def aguardar_primeira_carga(self, timeout=None):
+        return self._primeira_tentativa.wait(timeout)
@@ -0,0 +1,235 @@
+import argparse
+import asyncio
+import random
+import time as relogio
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from tornado.websocket import websocket_connect
+
+import precalculo
+
+# ======================================
+# TESTE DE CARGA DO PAINEL
+# ======================================
+# Simula N sessões do navegador ao mesmo tempo contra um painel em execução
+# ("streamlit run Dashboardchamados.py"), trocando os filtros da barra
+# lateral, e mede a vazão e a latência da página inteira: cada execução vai
+# do pedido (como o navegador o faz, pelo websocket /_stcore/stream) até o
+# fim do script, com todas as seções desenhadas.
+#
+#   DASHCHAMADOS_FONTE=sqlite streamlit run Dashboardchamados.py --server.headless true
+#   python teste_carga.py --sessoes 20 --duracao 120 --saida carga.csv
+#
+# Sem o SQL Server, use o banco SQLite sintético (ver fonte_dados.py). A
+# maioria das trocas de filtro usa os períodos padrão (os pré-calculados, ver
+# precalculo.py), com todas as equipes ou parte delas; as demais, um período
+# aleatório de até MAXIMO_DIAS dias. O cliente roda num único processo
+# (asyncio): com muitas sessões, confira se ele não é o gargalo (CPU deste
+# processo perto de 100%).
+
+MAXIMO_DIAS = 92
+FRACAO_PADRAO = 0.8
+
+# Rótulos dos filtros na barra lateral do painel
+ROTULO_DATA_INICIAL = "Data inicial"
+ROTULO_DATA_FINAL = "Data final"
+ROTULO_EQUIPES = "Selecione as equipes:"
+
+FORMATO_DATA = '%Y/%m/%d'  # datas dos widgets no protocolo do Streamlit
+PERCENTIS = (50, 95, 99)
+
+
+class FalhaSessao(Exception):
+    pass
+
+
+# Filtros da barra lateral, lidos da primeira execução de cada sessão
+class Filtros:
+    def __init__(self):
+        self.widgets = {}
+
+    def registrar(self, elemento):
+        tipo = elemento.WhichOneof('type')
+        if tipo in ('date_input', 'multiselect'):
+            widget = getattr(elemento, tipo)
+            self.widgets[widget.label] = widget
+
+    def widget(self, rotulo):
+        if rotulo not in self.widgets:
+            raise FalhaSessao(f"filtro '{rotulo}' não encontrado na página")
+        return self.widgets[rotulo]
+
+    def limites(self):
+        widget = self.widget(ROTULO_DATA_INICIAL)
+        return (datetime.strptime(widget.min, FORMATO_DATA).date(),
+                datetime.strptime(widget.max, FORMATO_DATA).date())
+
+    def equipes(self):
+        return list(self.widget(ROTULO_EQUIPES).options)
+
+
+# Período e equipes (índices das opções) de uma troca de filtros
+def sortear_filtros(sorteio, limites, quantidade_equipes, hoje):
+    data_minima, data_maxima = limites
+    if sorteio.random() < FRACAO_PADRAO:
+        tipo = 'padrao'
+        data_inicio, data_fim = sorteio.choice(list(precalculo.periodos_padrao(hoje, data_maxima).values()))
+        data_inicio = max(data_inicio, data_minima)
+    else:
+        tipo = 'aleatorio'
+        dias = (data_maxima - data_minima).days
+        data_inicio = data_minima + timedelta(days=sorteio.randint(0, dias))
+        data_fim = min(data_maxima, data_inicio + timedelta(days=sorteio.randint(0, MAXIMO_DIAS)))
+
+    if sorteio.random() < 0.5:
+        equipes = list(range(quantidade_equipes))
+    else:
+        equipes = sorted(sorteio.sample(range(quantidade_equipes), sorteio.randint(1, quantidade_equipes)))
+    return tipo, data_inicio, data_fim, equipes
+
+
+class Sessao:
+    def __init__(self, url, numero):
+        self.url = url
+        self.numero = numero
+        self.filtros = Filtros()
+        self._conexao = None
+
+    async def conectar(self):
+        self._conexao = await websocket_connect(self.url, max_message_size=1024 ** 3)
+
+    def fechar(self):
+        if self._conexao is not None:
+            self._conexao.close()
+
+    # Pede uma execução do script com os valores dos filtros e espera o fim.
+    # Devolve (segundos, bytes recebidos, erros desenhados na página)
+    async def executar(self, valores=None):
+        mensagem = BackMsg()
+        estado = mensagem.rerun_script
+        estado.query_string = ''
+        for rotulo, preencher in (valores or {}).items():
+            widget = estado.widget_states.widgets.add()
+            widget.id = self.filtros.widget(rotulo).id
+            preencher(widget)
+
+        inicio = relogio.perf_counter()
+        await self._conexao.write_message(mensagem.SerializeToString(), binary=True)
+        recebidos = 0
+        erros = 0
+        while True:
+            dados = await self._conexao.read_message()
+            if dados is None:
+                raise FalhaSessao("conexão encerrada pelo painel")
+            recebidos += len(dados)
+            resposta = ForwardMsg()
+            resposta.ParseFromString(dados)
+            tipo = resposta.WhichOneof('type')
+            if tipo == 'delta' and resposta.delta.WhichOneof('type') == 'new_element':
+                elemento = resposta.delta.new_element
+                self.filtros.registrar(elemento)
+                if elemento.WhichOneof('type') == 'exception':
+                    erros += 1
+            elif tipo == 'script_finished':
+                if resposta.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise FalhaSessao("erro de compilação no script do painel")
+                if resposta.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY:
+                    return relogio.perf_counter() - inicio, recebidos, erros
+
+
+def _datas(data):
+    return lambda widget: widget.string_array_value.data.append(data.strftime(FORMATO_DATA))
+
+
+def _indices(indices):
+    return lambda widget: widget.int_array_value.data.extend(indices)
+
+
+async def simular_sessao(url, numero, fim, pausa, sorteio, resultados):
+    sessao = Sessao(url, numero)
+    try:
+        await sessao.conectar()
+        # Primeira carga da página (filtros padrão)
+        segundos, recebidos, erros = await sessao.executar()
+        resultados.append({'sessao': numero, 'tipo': 'inicial', 'data_inicio': None, 'data_fim': None,
+                           'equipes': None, 'segundos': segundos, 'bytes': recebidos, 'erros': erros})
+        limites = sessao.filtros.limites()
+        quantidade_equipes = len(sessao.filtros.equipes())
+        hoje = date.today()
+
+        while relogio.perf_counter() < fim:
+            if pausa:
+                await asyncio.sleep(sorteio.expovariate(1 / pausa))
+            tipo, data_inicio, data_fim, equipes = sortear_filtros(sorteio, limites, quantidade_equipes, hoje)
+            segundos, recebidos, erros = await sessao.executar({
+                ROTULO_DATA_INICIAL: _datas(data_inicio),
+                ROTULO_DATA_FINAL: _datas(data_fim),
+                ROTULO_EQUIPES: _indices(equipes),
+            })
+            resultados.append({'sessao': numero, 'tipo': tipo, 'data_inicio': data_inicio,
+                               'data_fim': data_fim, 'equipes': len(equipes), 'segundos': segundos,
+                               'bytes': recebidos, 'erros': erros})
+    finally:
+        sessao.fechar()
+
+
+async def executar(url, sessoes, duracao, pausa=0.0, semente=0):
+    resultados = []
+    inicio = relogio.perf_counter()
+    tarefas = [simular_sessao(url, numero, inicio + duracao, pausa, random.Random(semente + numero), resultados)
+               for numero in range(sessoes)]
+    falhas = [falha for falha in await asyncio.gather(*tarefas, return_exceptions=True) if falha is not None]
+    return pd.DataFrame(resultados), relogio.perf_counter() - inicio, falhas
+
+
+# Execuções, vazão (execuções por segundo) e latência em ms por tipo de troca
+# de filtros e no total
+def resumir(resultados, segundos):
+    def resumo(grupo):
+        latencias = grupo['segundos'].to_numpy() * 1000
+        return pd.Series({
+            'execucoes': len(grupo),
+            'por_segundo': len(grupo) / segundos,
+            'media_ms': latencias.mean(),
+            **{f"p{percentil}_ms": valor for percentil, valor in zip(PERCENTIS, np.percentile(latencias, PERCENTIS))},
+            'max_ms': latencias.max(),
+            'kb_por_execucao': grupo['bytes'].mean() / 1024,
+            'erros': int(grupo['erros'].sum()),
+        })
+
+    if resultados.empty:
+        return pd.DataFrame()
+    tabela = {tipo: resumo(grupo) for tipo, grupo in resultados.groupby('tipo')}
+    tabela['total'] = resumo(resultados[resultados['tipo'] != 'inicial'])
+    return pd.DataFrame(tabela).T
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do painel de chamados")
+    parser.add_argument('--url', default='http://localhost:8501', help="endereço do painel")
+    parser.add_argument('--sessoes', type=int, default=10, help="sessões simultâneas")
+    parser.add_argument('--duracao', type=float, default=60, help="segundos de teste")
+    parser.add_argument('--pausa', type=float, default=0.0,
+                        help="pausa média (s) entre as trocas de filtro de cada sessão")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', help="grava cada execução neste CSV")
+    argumentos = parser.parse_args()
+
+    url = argumentos.url.rstrip('/').replace('http', 'ws', 1) + '/_stcore/stream'
+    resultados, segundos, falhas = asyncio.run(
+        executar(url, argumentos.sessoes, argumentos.duracao, argumentos.pausa, argumentos.semente))
+
+    if argumentos.saida:
+        resultados.to_csv(argumentos.saida, index=False)
+    for falha in falhas:
+        print(f"sessão com falha: {falha!r}")
+    print(f"{argumentos.sessoes} sessões, {segundos:,.1f} s")
+    print(resumir(resultados, segundos).to_string(float_format=lambda valor: f"{valor:,.1f}"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+from datetime import date, datetime
+from io import BytesIO
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import api
+import cache_compartilhado
+import dimensoes
+import exportacao
+import gerador_sintetico
+import sincronizacao
+
+EQUIPES = {1: "Equipe 1", 3: "Equipe 3"}
+OPERADORES = gerador_sintetico.OPERADORES_PADRAO
+
+
+@pytest.fixture
+def cliente():
+    df_chamados, df_acompanhamentos = gerador_sintetico.gerar(
+        3000, inicio=datetime(2025, 1, 1), fim=datetime(2025, 4, 1))
+    estado = sincronizacao.montar_estado(df_chamados, df_acompanhamentos, OPERADORES)
+    tabelas = dimensoes.montar_tabelas(
+        EQUIPES, {codigo: (f"Operador {codigo}", 1) for codigo in OPERADORES}, {"Telefone": [1]})
+    exportacoes = exportacao.PedidosExportacao()
+    app = api.criar_app(SimpleNamespace(estado=lambda: estado), cache_compartilhado.CacheCompartilhado(),
+                        SimpleNamespace(atual=lambda: tabelas), exportacoes=exportacoes)
+    return app.test_client(), exportacoes, estado
+
+
+def test_exportacao_de_linhas_so_com_link_do_painel(cliente):
+    cliente, exportacoes, estado = cliente
+    pedido = {'data_inicio': date(2025, 2, 1), 'data_fim': date(2025, 2, 28), 'codigos_equipes': (1, 3),
+              'tabela': 'chamados', 'formato': 'parquet'}
+
+    assert cliente.get('/api/exportar/qualquer-coisa').status_code == 404
+
+    resposta = cliente.get(f"/api/exportar/{exportacoes.emitir(pedido)}")
+    assert resposta.status_code == 200
+    assert 'chamados_20250201_20250228.parquet' in resposta.headers['Content-Disposition']
+    linhas = pd.read_parquet(BytesIO(resposta.data))
+    fevereiro = estado.chamados['dtchamado'].between('2025-02-01', '2025-03-01', inclusive='left')
+    assert len(linhas) == fevereiro.sum()
+
+
+def test_link_de_exportacao_vence():
+    exportacoes = exportacao.PedidosExportacao(validade=0)
+    assert exportacoes.resgatar(exportacoes.emitir({'tabela': 'chamados'})) is None
+
+
+@pytest.mark.parametrize('parametros', ['inicio=2025-01-01&fim=9999-12-31', 'inicio=0001-01-01',
+                                        'inicio=2025-03-01&fim=2025-02-01', 'inicio=01/02/2025'])
+def test_datas_invalidas_dao_400(cliente, parametros):
+    cliente, _, _ = cliente
+    resposta = cliente.get(f"/api/operadores?{parametros}")
+    assert resposta.status_code == 400
+    assert 'erro' in resposta.get_json()
+
+
+def test_etag_por_codificacao(cliente):
+    cliente, _, _ = cliente
+    url = '/api/operadores?inicio=2025-01-01&fim=2025-03-31'
+    compactada = cliente.get(url, headers={'Accept-Encoding': 'gzip'})
+    normal = cliente.get(url)
+    assert compactada.headers['Content-Encoding'] == 'gzip'
+    assert compactada.headers['ETag'] != normal.headers['ETag']
+
+    # O ETag de uma codificação não vale para a outra
+    assert cliente.get(url, headers={'Accept-Encoding': 'gzip',
+                                     'If-None-Match': compactada.headers['ETag']}).status_code == 304
+    assert cliente.get(url, headers={'If-None-Match': compactada.headers['ETag']}).status_code == 200
@@ -0,0 +1,37 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+
+import armazenamento
+import gerador_sintetico
+import periodo
+
+
+def _frames():
+    df_chamados, df_acompanhamentos = gerador_sintetico.gerar(
+        3000, inicio=datetime(2025, 1, 1), fim=datetime(2025, 4, 1))
+    df_chamados.loc[[3, 7], 'dtchamado'] = pd.NaT
+    return (periodo.ordenar_por_data(df_chamados, 'dtchamado'),
+            periodo.ordenar_por_data(df_acompanhamentos, 'dtacompanhamento'))
+
+
+def test_delta_regrava_so_os_meses_tocados(tmp_path):
+    df_chamados, df_acompanhamentos = _frames()
+    snapshot = armazenamento.ArmazenamentoSnapshot(str(tmp_path))
+    snapshot.salvar(df_chamados, df_acompanhamentos, 1)
+    assert snapshot.meses('chamados') == ['2025-01', '2025-02', '2025-03', armazenamento.SEM_DATA]
+
+    gravados_em = {mes: os.path.getmtime(snapshot._arquivo('chamados', mes)) for mes in snapshot.meses('chamados')}
+    os.utime(snapshot._arquivo('chamados', '2025-01'), (0, 0))
+    alterados = df_chamados.copy()
+    fevereiro = alterados['dtchamado'].dt.month == 2
+    alterados.loc[fevereiro, 'cdsituacao'] = 7
+    snapshot.salvar(alterados, df_acompanhamentos, 2, {'chamados': {'2025-02'}})
+
+    # Janeiro não foi regravado; fevereiro sim
+    assert os.path.getmtime(snapshot._arquivo('chamados', '2025-01')) == 0
+    assert os.path.getmtime(snapshot._arquivo('chamados', '2025-02')) >= gravados_em['2025-02']
+    chamados, acompanhamentos = snapshot.ler()
+    pd.testing.assert_frame_equal(chamados, alterados.reset_index(drop=True))
+    assert len(acompanhamentos) == len(df_acompanhamentos)
@@ -0,0 +1,19 @@
+import cache_compartilhado
+
+
+def test_invalidar_so_avanca_a_versao():
+    cache = cache_compartilhado.CacheCompartilhado()
+    cache.invalidar((2, 'a'))
+    cache.obter((2, 'a'), 'mes', lambda: 'novo')
+
+    # Sessão com o estado anterior, ou com as dimensões anteriores
+    cache.invalidar((1, 'a'))
+    cache.invalidar((2, 'b'))
+    cache.invalidar((2, 'a'))
+    cache.obter((2, 'b'), 'mes', lambda: 'dimensoes novas')
+    cache.invalidar((2, 'a'))
+    assert cache.obter((2, 'b'), 'mes', lambda: 'recalculado') == 'dimensoes novas'
+    assert cache.estatisticas()['entradas'] == 1
+
+    cache.invalidar((3, 'a'))
+    assert cache.estatisticas()['entradas'] == 0
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import consultas
+import fonte_dados
+import gerador_sintetico
+import sincronizacao
+
+INICIO = datetime(2025, 1, 1)
+FIM = datetime(2025, 3, 1)
+# Depois de todos os términos gerados
+FINAL = datetime(2026, 1, 1)
+CORTE = datetime(2025, 2, 15)
+
+
+@pytest.fixture
+def banco(tmp_path):
+    df_chamados, df_acompanhamentos = gerador_sintetico.gerar(3000, inicio=INICIO, fim=FIM)
+    caminho = str(tmp_path / fonte_dados.ARQUIVO_BANCO)
+    fonte_dados.criar_banco(caminho, df_chamados, df_acompanhamentos, CORTE)
+    conn = fonte_dados.conectar_sqlite(caminho)
+    yield conn, df_chamados, df_acompanhamentos
+    conn.close()
+
+
+# Carga completa como a da sincronização, pelas consultas de consultas.py
+def _ler_tudo(conn):
+    marcas = sincronizacao.calcular_marcas(pd.DataFrame(), pd.DataFrame())
+    query, parametros = consultas.montar_consulta_chamados_delta(
+        marcas['ultimo_cdchamado'], marcas['ultimo_termino'], marcas['menor_aberto'])
+    df_chamados = consultas.executar_consulta_chamados(conn, query, parametros)
+    query, parametros = consultas.montar_consulta_acompanhamentos_delta(marcas['ultima_data_acompanhamento'])
+    df_acompanhamentos = consultas.executar_consulta_acompanhamentos(conn, query, parametros)
+    return (df_chamados.sort_values('cdchamado', ignore_index=True),
+            df_acompanhamentos.sort_values(['dtacompanhamento', 'cdchamado'], ignore_index=True))
+
+
+def test_consultas_do_painel_rodam_no_sqlite_ate_o_corte(banco):
+    conn, df_chamados, df_acompanhamentos = banco
+
+    chamados, acompanhamentos = _ler_tudo(conn)
+
+    assert list(chamados.columns) == list(consultas.TIPOS_CHAMADOS)
+    assert chamados['cdchamado'].dtype == 'Int64'
+    assert chamados['dtchamado'].dtype == 'datetime64[ns]'
+    esperados = df_chamados[df_chamados['dtchamado'] <= CORTE]
+    assert chamados['cdchamado'].tolist() == esperados['cdchamado'].tolist()
+    # Encerrados depois do corte continuam abertos
+    abertos = chamados['cdchamado'].isin(esperados.loc[esperados['dttermino'] > CORTE, 'cdchamado'])
+    assert abertos.any()
+    assert chamados.loc[abertos, 'dttermino'].isna().all()
+    assert (chamados.loc[abertos, 'cdsituacao'] == fonte_dados.SITUACAO_ABERTO).all()
+
+    assert len(acompanhamentos) == (df_acompanhamentos['dtacompanhamento'] <= CORTE).sum()
+    assert acompanhamentos['em_atendimento'].sum() == (
+        df_acompanhamentos['em_atendimento'] & (df_acompanhamentos['dtacompanhamento'] <= CORTE)).sum()
+
+
+def test_avancar_libera_o_restante(banco):
+    conn, df_chamados, df_acompanhamentos = banco
+
+    # Como "reproduzir", pelo mesmo banco que o painel lê
+    assert fonte_dados.avancar(conn, FINAL) > 0
+    chamados, acompanhamentos = _ler_tudo(conn)
+
+    esperados = df_chamados.sort_values('cdchamado', ignore_index=True)
+    pd.testing.assert_frame_equal(chamados, esperados[list(consultas.TIPOS_CHAMADOS)])
+    assert len(acompanhamentos) == len(df_acompanhamentos)
+
+
+def test_leitura_em_lotes_pequenos_da_o_mesmo_frame(banco):
+    conn, _, _ = banco
+    query, parametros = consultas.montar_consulta_acompanhamentos_delta(None)
+    estatisticas = {}
+
+    em_lotes = consultas.ler_em_lotes(conn, query, parametros, consultas.TIPOS_ACOMPANHAMENTOS,
+                                      tamanho_lote=97, estatisticas=estatisticas)
+
+    inteiro = consultas.ler_em_lotes(conn, query, parametros, consultas.TIPOS_ACOMPANHAMENTOS,
+                                     tamanho_lote=10 ** 6)
+    pd.testing.assert_frame_equal(em_lotes, inteiro)
+    assert estatisticas['linhas'] == len(inteiro)
+    assert {'memoria_mb', 'pico_memoria_mb'} <= set(estatisticas)
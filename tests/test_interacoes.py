@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+import interacoes
+import metricas
+
+OPERADORES = {10: "Operador A", 20: "Operador B"}
+OUTRO_USUARIO = 99
+
+
+def _chamados(linhas):
+    return pd.DataFrame({
+        'cdchamado': pd.array([linha[0] for linha in linhas], dtype='Int64'),
+        'dtchamado': pd.to_datetime([linha[1] for linha in linhas]),
+        'cdequipe': pd.array([1] * len(linhas), dtype='Int16'),
+    })
+
+
+def _acompanhamentos(linhas):
+    df = pd.DataFrame({
+        'cdchamado': pd.array([linha[0] for linha in linhas], dtype='Int64'),
+        'dtacompanhamento': pd.to_datetime([linha[1] for linha in linhas]),
+        'cdusuario': pd.array([linha[2] for linha in linhas], dtype='Int32'),
+    })
+    return df.sort_values('dtacompanhamento', kind='stable').reset_index(drop=True)
+
+
+# Como a sincronização: só os acompanhamentos dos operadores cadastrados
+def _como_no_snapshot(df_acompanhamentos):
+    return df_acompanhamentos[df_acompanhamentos['cdusuario'].isin(list(OPERADORES))].reset_index(drop=True)
+
+
+def test_primeira_resposta_e_trocas_so_de_operadores_cadastrados():
+    chamados = _chamados([(1, '2025-01-01 08:00')])
+    acompanhamentos = _como_no_snapshot(_acompanhamentos([
+        (1, '2025-01-01 08:30', OUTRO_USUARIO),
+        (1, '2025-01-01 09:00', 10),
+        (1, '2025-01-01 10:00', OUTRO_USUARIO),
+        (1, '2025-01-01 11:00', 10),
+        (1, '2025-01-01 12:00', 20),
+    ]))
+
+    resultado = interacoes.por_chamado(chamados, acompanhamentos).iloc[0]
+
+    # A resposta de outro usuário às 08:30 não conta
+    assert resultado['dtprimeiro_acompanhamento'] == pd.Timestamp('2025-01-01 09:00')
+    assert resultado['primeiro_operador'] == 10
+    assert resultado['acompanhamentos'] == 3
+    # A, outro, A não é troca; A -> B é
+    assert resultado['trocas'] == 1
+
+    espera = metricas.primeira_resposta_por_operador(
+        interacoes.por_chamado(chamados, acompanhamentos), OPERADORES)
+    assert espera['cdusuario'].tolist() == [10]
+    assert espera['p50_horas'].iloc[0] == 1.0
+
+
+def test_primeira_resposta_ignora_chamado_sem_data_de_abertura():
+    chamados = _chamados([(1, '2025-01-01 08:00'), (2, None)])
+    acompanhamentos = _acompanhamentos([
+        (1, '2025-01-01 10:00', 10),
+        (2, '2025-01-01 09:00', 10),
+    ])
+
+    espera = metricas.primeira_resposta_por_operador(
+        interacoes.por_chamado(chamados, acompanhamentos), OPERADORES)
+
+    assert espera['chamados'].tolist() == [1]
+    assert np.allclose(espera[['media_horas', 'p50_horas', 'p90_horas', 'p95_horas']].iloc[0], 2.0)
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pandas as pd
+
+import dimensoes
+import gerador_sintetico
+import memoria_compartilhada
+import sincronizacao
+
+OPERADORES = gerador_sintetico.OPERADORES_PADRAO
+
+
+def _tabelas(equipes):
+    return dimensoes.montar_tabelas(
+        equipes, {codigo: (f"Operador {codigo}", 1) for codigo in OPERADORES}, {"Telefone": [1, 2]})
+
+
+def test_replica_usa_estado_e_dimensoes_do_carregador(tmp_path):
+    df_chamados, df_acompanhamentos = gerador_sintetico.gerar(
+        3000, inicio=datetime(2025, 1, 1), fim=datetime(2025, 3, 1))
+    estado = sincronizacao.montar_estado(df_chamados, df_acompanhamentos, OPERADORES)
+    publicador = memoria_compartilhada.PublicadorEstado(str(tmp_path))
+    leitor = memoria_compartilhada.LeitorEstado(str(tmp_path), intervalo_verificacao=0)
+    publicadas = memoria_compartilhada.DimensoesPublicadas(leitor)
+
+    # Tabelas com as "consultas" ao banco: diferentes das do arquivo da réplica
+    tabelas = _tabelas({1: "Suporte (banco)", 3: "Redes (banco)"})
+    publicador.definir_dimensoes(tabelas)
+    publicador.publicar(estado, {'erro': None})
+
+    pd.testing.assert_frame_equal(leitor.estado().chamados, estado.chamados.reset_index(drop=True))
+    assert publicadas.atual() == tabelas
+
+    # Novo cadastro sem dados novos: só o ponteiro muda
+    novas = _tabelas({1: "Suporte", 3: "Redes", 5: "Sistemas"})
+    publicador.definir_dimensoes(novas)
+    assert publicadas.atual() == novas
+    assert leitor.versao == 1
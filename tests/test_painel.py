@@ -0,0 +1,47 @@
+import os
+import sys
+from datetime import timedelta
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import fonte_dados
+import teste_carga
+
+PAINEL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Dashboardchamados.py')
+
+
+# Painel inteiro sobre o banco SQLite sintético (como no teste de carga), com
+# o snapshot numa pasta temporária
+@pytest.fixture
+def painel(tmp_path, monkeypatch):
+    fonte_dados.gerar(str(tmp_path / 'fixtures'), 3000, dias=90)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DASHCHAMADOS_FONTE', 'sqlite')
+    monkeypatch.setenv('DASHCHAMADOS_SQLITE', str(tmp_path / 'fixtures' / fonte_dados.ARQUIVO_BANCO))
+    monkeypatch.delitem(sys.modules, 'configuracao', raising=False)
+    app = AppTest.from_file(PAINEL, default_timeout=120)
+    app.run()
+    return app
+
+
+def test_painel_roda_sobre_o_banco_sintetico(painel):
+    assert not painel.exception
+    assert not painel.error
+    # Carga completa do banco sintético (3000 acompanhamentos, ~1000 chamados)
+    assert "acompanhamentos" in painel.sidebar.caption[0].value
+    assert "Tempo de resolução por equipe" in [subtitulo.value for subtitulo in painel.subheader]
+
+    # Os filtros que teste_carga.py procura na página
+    rotulos = {widget.label for widget in painel.sidebar.date_input}
+    assert {teste_carga.ROTULO_DATA_INICIAL, teste_carga.ROTULO_DATA_FINAL} <= rotulos
+    equipes = painel.sidebar.multiselect[0]
+    assert equipes.label == teste_carga.ROTULO_EQUIPES
+    assert painel.sidebar.button(key='gerar_chamados')
+
+    # Troca de filtros, como as sessões do teste de carga
+    data_final = painel.sidebar.date_input[1].value
+    painel.sidebar.date_input[0].set_value(data_final - timedelta(days=30))
+    equipes.set_value(equipes.value[:1])
+    painel.run()
+    assert not painel.exception
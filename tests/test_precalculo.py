@@ -0,0 +1,54 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import cache_compartilhado
+import dimensoes
+import gerador_sintetico
+import precalculo
+import sincronizacao
+
+HOJE = date(2025, 6, 15)
+EQUIPES = {1: "Equipe 1", 2: "Equipe 2", 3: "Equipe 3"}
+OPERADORES = gerador_sintetico.OPERADORES_PADRAO
+
+
+def _precalculador(max_entradas):
+    df_chamados, df_acompanhamentos = gerador_sintetico.gerar(
+        3000, inicio=datetime(2025, 1, 1), fim=datetime(2025, 6, 16), equipes=list(EQUIPES))
+    estado = sincronizacao.montar_estado(df_chamados, df_acompanhamentos, OPERADORES)
+    tabelas = dimensoes.montar_tabelas(
+        EQUIPES, {codigo: (f"Operador {codigo}", 1) for codigo in OPERADORES}, {"Telefone": [1]})
+    cache = cache_compartilhado.CacheCompartilhado(max_entradas=max_entradas)
+    fonte = SimpleNamespace(estado=lambda: estado)
+    return precalculo.Precalculador(fonte, cache, SimpleNamespace(atual=lambda: tabelas)), estado, tabelas
+
+
+# Visão inicial do painel (mês atual, todas as equipes), como a primeira
+# execução da página a pede ao cache; devolve quantos agregados faltaram
+def _faltas_na_visao_inicial(precalculador, estado, tabelas):
+    data_inicio, data_fim = precalculo.periodos_padrao(HOJE, HOJE)['mes_atual']
+    filtro = precalculo.Filtro(estado, tabelas, data_inicio, data_fim, tuple(EQUIPES))
+    versao = (estado.versao, tabelas.versao)
+    faltas = precalculador.cache.faltas
+    for nome in precalculo.AGREGADOS:
+        precalculo.obter_agregado(precalculador.cache, versao, filtro, nome)
+    return precalculador.cache.faltas - faltas
+
+
+def test_precalculo_de_tres_equipes_cabe_no_cache_do_painel():
+    # 3 períodos x 7 combinações de equipes
+    assert precalculo.entradas_precalculadas(EQUIPES) == 21 * len(precalculo.AGREGADOS)
+
+    precalculador, estado, tabelas = _precalculador(precalculo.entradas_precalculadas(EQUIPES) + 512)
+    assert precalculador.precalcular(HOJE)
+    assert precalculador.situacao['filtros'] == 21
+
+    assert _faltas_na_visao_inicial(precalculador, estado, tabelas) == 0
+
+
+def test_visao_inicial_sai_por_ultimo_do_cache():
+    # Cache que só comporta um filtro: o da visão inicial, calculado por último
+    precalculador, estado, tabelas = _precalculador(len(precalculo.AGREGADOS))
+    assert precalculador.precalcular(HOJE)
+
+    assert _faltas_na_visao_inicial(precalculador, estado, tabelas) == 0
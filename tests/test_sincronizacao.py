@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import armazenamento
+import conexao
+import cubo
+import fonte_dados
+import gerador_sintetico
+import sincronizacao
+
+INICIO = datetime(2025, 1, 1)
+FIM = datetime(2025, 4, 1)
+EQUIPES = gerador_sintetico.EQUIPES_PADRAO
+# Só parte dos operadores: os demais caem em cubo.OUTROS
+OPERADORES = gerador_sintetico.OPERADORES_PADRAO[:6]
+
+
+@pytest.fixture
+def banco(tmp_path):
+    df_chamados, df_acompanhamentos = gerador_sintetico.gerar(6000, inicio=INICIO, fim=FIM)
+    caminho = str(tmp_path / fonte_dados.ARQUIVO_BANCO)
+    fonte_dados.criar_banco(caminho, df_chamados, df_acompanhamentos, FIM - timedelta(days=20))
+    pool = conexao.PoolConexoes(lambda: fonte_dados.conectar_sqlite(caminho), tamanho_maximo=2)
+    yield caminho, pool
+    pool.fechar()
+
+
+def _sincronizador(pool, diretorio=None, **opcoes):
+    return sincronizacao.Sincronizador(
+        pool, codigos_equipes=EQUIPES, operadores=OPERADORES,
+        armazenamento=armazenamento.ArmazenamentoSnapshot(str(diretorio)) if diretorio else None, **opcoes)
+
+
+def _ordenar(df, colunas):
+    return df.sort_values(colunas, ignore_index=True)
+
+
+def _assert_mesmo_estado(estado, esperado):
+    pd.testing.assert_frame_equal(_ordenar(estado.chamados, ['cdchamado']),
+                                  _ordenar(esperado.chamados, ['cdchamado']))
+    colunas = ['dtacompanhamento', 'cdchamado', 'cdusuario', 'cdtipoacompanhamento']
+    pd.testing.assert_frame_equal(_ordenar(estado.acompanhamentos, colunas),
+                                  _ordenar(esperado.acompanhamentos, colunas))
+    # Cubos: as mesmas contagens, sem linhas zeradas deixadas pelo delta
+    for atual, novo, dimensoes in ((estado.cubo_chamados, esperado.cubo_chamados, cubo.DIMENSOES_CHAMADOS),
+                                   (estado.cubo_acompanhamentos, esperado.cubo_acompanhamentos,
+                                    cubo.DIMENSOES_ACOMPANHAMENTOS)):
+        pd.testing.assert_frame_equal(_ordenar(atual, dimensoes), _ordenar(novo, dimensoes))
+    pd.testing.assert_frame_equal(_ordenar(estado.eventos_atendimento, list(estado.eventos_atendimento.columns)),
+                                  _ordenar(esperado.eventos_atendimento, list(esperado.eventos_atendimento.columns)))
+
+
+def test_deltas_chegam_ao_mesmo_estado_da_carga_completa(banco, tmp_path):
+    caminho, pool = banco
+    sincronizador = _sincronizador(pool, tmp_path / 'snapshot')
+    sincronizador.carregar_completo()
+
+    # Vinte dias liberados aos poucos, como "fonte_dados.py reproduzir":
+    # chamados novos, chamados encerrados e acompanhamentos
+    gravacao = fonte_dados.conectar_sqlite(caminho)
+    try:
+        corte = FIM - timedelta(days=20)
+        while corte < FIM + timedelta(days=30):
+            corte += timedelta(days=2)
+            fonte_dados.avancar(gravacao, corte)
+            sincronizador.carregar_delta()
+    finally:
+        gravacao.close()
+
+    completo = _sincronizador(pool)
+    completo.carregar_completo()
+    _assert_mesmo_estado(sincronizador.estado(), completo.estado())
+    assert sincronizador.marcas == completo.marcas
+
+    # O snapshot em disco, regravado só nos meses tocados, também
+    do_disco = _sincronizador(pool, tmp_path / 'snapshot')
+    do_disco.carregar_do_disco()
+    _assert_mesmo_estado(do_disco.estado(), completo.estado())
+
+
+def test_reconciliacao_rele_so_a_janela(banco, tmp_path, monkeypatch):
+    caminho, pool = banco
+    # Janela contada a partir do fim dos dados sintéticos: março em diante
+    inicio_historico = sincronizacao.inicio_historico
+    monkeypatch.setattr(sincronizacao, 'inicio_historico', lambda meses: inicio_historico(meses, FIM))
+    janela = datetime(2025, 3, 1)
+    sincronizador = _sincronizador(pool, tmp_path / 'snapshot', meses_reconciliacao=1)
+    sincronizador.carregar_completo()
+
+    # Exclusões na janela, que os deltas não veem
+    gravacao = fonte_dados.conectar_sqlite(caminho)
+    try:
+        with gravacao:
+            gravacao.execute("DELETE FROM hd_chamado WHERE cdchamado IN "
+                             "(SELECT cdchamado FROM hd_chamado WHERE dtchamado >= ? LIMIT 20)", (janela,))
+            gravacao.execute("DELETE FROM hd_acompanhamento WHERE rowid IN "
+                             "(SELECT rowid FROM hd_acompanhamento WHERE dtacompanhamento >= ? LIMIT 20)",
+                             (janela,))
+    finally:
+        gravacao.close()
+
+    sincronizador.reconciliar()
+
+    completo = _sincronizador(pool)
+    completo.carregar_completo()
+    _assert_mesmo_estado(sincronizador.estado(), completo.estado())
+    assert sincronizador.marcas == completo.marcas
+    # Só a janela veio do banco
+    chamados = sincronizador.estado().chamados
+    assert sincronizador.estatisticas['chamados']['linhas'] == (chamados['dtchamado'] >= janela).sum()
+
+    do_disco = _sincronizador(pool, tmp_path / 'snapshot')
+    do_disco.carregar_do_disco()
+    _assert_mesmo_estado(do_disco.estado(), completo.estado())